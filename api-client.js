@@ -93,6 +93,26 @@ class ApiClient {
         return this.request('/api/databases');
     }
 
+    /**
+     * ポケモン名の入力補完
+     * @param {string} query - 入力中の名前（ひらがな・カタカナどちらでも可）
+     * @param {number} limit - 最大件数
+     * @returns {Promise<object>} - レスポンス
+     */
+    async completePokemonName(query, limit = 10) {
+        const queryString = new URLSearchParams({ q: query, limit }).toString();
+        return this.request(`/api/pokedex/autocomplete?${queryString}`);
+    }
+
+    /**
+     * 図鑑Noでポケモンを検索
+     * @param {number} dexNo - 全国図鑑No
+     * @returns {Promise<object>} - レスポンス
+     */
+    async lookupPokedex(dexNo) {
+        return this.request(`/api/pokedex/${parseInt(dexNo, 10)}`);
+    }
+
     /**
      * ヘルスチェック
      * @returns {Promise<object>} - レスポンス
@@ -0,0 +1,171 @@
+"""
+変更履歴（変更フィード）
+作成・削除をデータベースごとに追記し、トークン以降の変更だけを返す
+（履歴はプロセス内にのみ保持するため、再起動後はタイムスタンプで走査する）
+"""
+
+import base64
+import itertools
+import json
+import secrets
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+CREATE = "create"
+DELETE = "delete"
+
+
+@dataclass(frozen=True)
+class Change:
+    """1件の変更"""
+
+    seq: int
+    op: str
+    item_id: str
+    # 作成時のレコード（削除はNone）
+    record: Optional[dict[str, Any]] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        change: dict[str, Any] = {"op": self.op, "id": self.item_id}
+        if self.record is not None:
+            change["record"] = self.record
+        return change
+
+
+@dataclass(frozen=True)
+class ChangeToken:
+    """変更フィードの位置
+
+    ``epoch`` は変更履歴を作ったプロセス、``seq`` はそのプロセスでの
+    変更の通し番号（Noneなら走査の途中）、``watermark`` はスナップショットの
+    走査で受け取り済みのレコードの最も新しいタイムスタンプ（変更履歴から
+    受け取った作成では進めない）。
+    """
+
+    epoch: str
+    seq: Optional[int]
+    watermark: Optional[str]
+
+    def encode(self) -> str:
+        payload = json.dumps({"e": self.epoch, "s": self.seq, "t": self.watermark})
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @classmethod
+    def decode(cls, token: str) -> "ChangeToken":
+        """トークン文字列を戻す
+
+        Raises:
+            ValueError: 不正なトークン
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+            epoch = str(payload["e"])
+            seq = payload["s"]
+            watermark = payload["t"]
+            if seq is not None:
+                seq = int(seq)
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError("不正なトークンです") from e
+        if watermark is not None and not isinstance(watermark, str):
+            raise ValueError("不正なトークンです")
+        return cls(epoch, seq, watermark)
+
+
+def scan_lower_bound(watermark: Optional[str], overlap: float) -> Optional[str]:
+    """走査の下限（書き込みの完了順とタイムスタンプ順のずれを overlap 秒分見込む）"""
+    if watermark is None:
+        return None
+    try:
+        start = datetime.fromisoformat(watermark) - timedelta(seconds=overlap)
+    except ValueError:
+        return watermark
+    return start.isoformat(timespec="microseconds")
+
+
+def _forget(created: dict[str, int], change: Change) -> None:
+    """履歴から押し出される作成を数え直す"""
+    if change.op != CREATE:
+        return
+    count = created.get(change.item_id, 0) - 1
+    if count > 0:
+        created[change.item_id] = count
+    else:
+        created.pop(change.item_id, None)
+
+
+class ChangeLog:
+    """データベースごとの追記専用の変更履歴
+
+    直近 ``capacity`` 件だけを保持し、それより古いトークンは
+    ``since()`` がNoneを返す（呼び出し側でタイムスタンプの走査に切り替える）。
+    通し番号はプロセスごとの ``epoch`` と組にして、別のプロセス
+    （再起動後・別インスタンス）のトークンと区別する。
+    """
+
+    def __init__(self, capacity: int = 10000, epoch: Optional[str] = None) -> None:
+        self.capacity = capacity
+        self.epoch = epoch or secrets.token_hex(8)
+        self._changes: dict[str, deque[Change]] = {}
+        self._heads: dict[str, int] = {}
+        # 履歴に残っている作成の 管理ID → 件数
+        self._created: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def append(
+        self,
+        db_name: str,
+        op: str,
+        items: list[tuple[str, Optional[dict[str, Any]]]],
+    ) -> None:
+        """変更を追記（items は (管理ID, レコード) のリスト）"""
+        with self._lock:
+            changes = self._changes.get(db_name)
+            if changes is None:
+                changes = self._changes[db_name] = deque(maxlen=self.capacity)
+            created = self._created.setdefault(db_name, {})
+            head = self._heads.get(db_name, 0)
+            for item_id, record in items:
+                head += 1
+                if len(changes) == changes.maxlen:
+                    _forget(created, changes[0])
+                changes.append(Change(head, op, item_id, record))
+                if op == CREATE:
+                    created[item_id] = created.get(item_id, 0) + 1
+            self._heads[db_name] = head
+
+    def head(self, db_name: str) -> int:
+        """最新の変更の通し番号"""
+        with self._lock:
+            return self._heads.get(db_name, 0)
+
+    def created(self, db_name: str, item_ids: list[str]) -> set[str]:
+        """item_ids のうち、このプロセスが作成して履歴に残っている管理ID"""
+        with self._lock:
+            created = self._created.get(db_name, {})
+            return {item_id for item_id in item_ids if item_id in created}
+
+    def since(self, db_name: str, seq: int) -> Optional[list[Change]]:
+        """通し番号 seq より後の変更（履歴に残っていなければNone）"""
+        with self._lock:
+            head = self._heads.get(db_name, 0)
+            if seq < 0 or seq > head:
+                return None
+            if seq == head:
+                return []
+            changes = self._changes[db_name]
+            if seq < changes[0].seq - 1:
+                return None
+            # 新しい側から必要な件数だけ取り出す（コストは変更の件数に比例）
+            recent = list(itertools.islice(reversed(changes), head - seq))
+        recent.reverse()
+        return recent
+
+    def clear(self) -> None:
+        """全ての変更履歴を破棄"""
+        with self._lock:
+            self._changes.clear()
+            self._heads.clear()
+            self._created.clear()
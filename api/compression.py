@@ -0,0 +1,236 @@
+"""
+レスポンスの圧縮
+Accept-Encoding に応じてAPIのレスポンスをgzip / Brotliで圧縮する
+（静的なデータは起動時に1度だけ圧縮した内容を返す）
+"""
+
+import hashlib
+import threading
+import zlib
+from pathlib import Path
+from typing import Optional, Union
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Brotliは任意の依存（pip install brotli）
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+# 圧縮するContent-Type（画像などは圧縮済みのため対象外）
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson")
+
+
+def available_encodings() -> tuple[str, ...]:
+    """このプロセスで使える圧縮形式（q値が同じなら先にあるものを使う）"""
+    return (BROTLI, GZIP) if brotli is not None else (GZIP,)
+
+
+def negotiate_encoding(
+    accept_encoding: str, available: tuple[str, ...]
+) -> Optional[str]:
+    """Accept-Encoding のq値が最も高い圧縮形式（使えなければNone）"""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[name] = weight
+
+    best: Optional[str] = None
+    best_weight = 0.0
+    for encoding in available:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.lower().startswith(_COMPRESSIBLE_TYPES)
+
+
+class _Compressor:
+    """gzip / Brotli の逐次圧縮"""
+
+    def __init__(self, encoding: str, level: int) -> None:
+        self.encoding = encoding
+        if encoding == BROTLI:
+            self._brotli = brotli.Compressor(quality=level)
+        else:
+            # wbits=31 でgzipヘッダー付きのストリームになる
+            self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == BROTLI:
+            processed: bytes = self._brotli.process(data)
+            return processed
+        return self._zlib.compress(data)
+
+    def finish(self) -> bytes:
+        if self.encoding == BROTLI:
+            finished: bytes = self._brotli.finish()
+            return finished
+        return self._zlib.flush()
+
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    """データ全体を圧縮"""
+    compressor = _Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+class CompressionMiddleware:
+    """レスポンスを gzip / Brotli で圧縮するASGIミドルウェア
+
+    ``minimum_size`` バイト未満のレスポンス、圧縮済み（Content-Encoding付き）の
+    レスポンス、圧縮の効かないContent-Typeはそのまま返す。
+    ストリーミングレスポンスはチャンクごとに逐次圧縮する。
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {GZIP: gzip_level, BROTLI: brotli_quality}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(
+            Headers(scope=scope).get("accept-encoding", ""), available_encodings()
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(
+            send, encoding, self.levels[encoding], self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, level: int, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self._start: Optional[Message] = None
+        self._compressor: Optional[_Compressor] = None
+        # 最初の本文で圧縮するかどうかを決める
+        self._decided = False
+
+    @property
+    def start(self) -> Message:
+        """保留中の http.response.start メッセージ"""
+        assert self._start is not None, "http.response.start を受け取っていません"
+        return self._start
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self._decided:
+            self._decided = True
+            if self._should_compress(body, more_body):
+                message = self._begin(message, body, more_body)
+            await self._send(self.start)
+        elif self._compressor is not None:
+            data = self._compressor.compress(body)
+            if not more_body:
+                data += self._compressor.finish()
+            message = {**message, "body": data}
+        await self._send(message)
+
+    def _begin(self, message: Message, body: bytes, more_body: bool) -> Message:
+        """圧縮を開始し、ヘッダーと最初の本文を書き換える"""
+        self._compressor = _Compressor(self.encoding, self.level)
+        headers = MutableHeaders(raw=self.start["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        data = self._compressor.compress(body)
+        if more_body:
+            # 全体の長さは送信し終えるまでわからない
+            if "content-length" in headers:
+                del headers["content-length"]
+        else:
+            data += self._compressor.finish()
+            headers["Content-Length"] = str(len(data))
+        return {**message, "body": data}
+
+    def _should_compress(self, body: bytes, more_body: bool) -> bool:
+        headers = Headers(raw=self.start["headers"])
+        if "content-encoding" in headers:
+            return False
+        if self.start["status"] < 200 or self.start["status"] in (204, 304):
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+
+class StaticAsset:
+    """静的なデータを圧縮形式ごとに1度だけ圧縮して保持する
+
+    リクエストのたびに圧縮しないよう、最大の圧縮率で圧縮した結果を
+    再利用する（``prepare()`` で起動時にまとめて圧縮できる）。
+    """
+
+    # 1度しか圧縮しないため最大の圧縮率を使う
+    LEVELS = {GZIP: 9, BROTLI: 11}
+
+    def __init__(self, body: bytes, media_type: str) -> None:
+        self.body = body
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._encoded: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], media_type: str) -> "StaticAsset":
+        return cls(Path(path).read_bytes(), media_type)
+
+    def prepare(self) -> None:
+        """使える全ての形式で圧縮しておく"""
+        for encoding in available_encodings():
+            self.encoded(encoding)
+
+    def encoded(self, encoding: str) -> bytes:
+        """圧縮済みの内容（初回のみ圧縮）"""
+        with self._lock:
+            if encoding not in self._encoded:
+                level = self.LEVELS[encoding]
+                self._encoded[encoding] = compress(self.body, encoding, level)
+            return self._encoded[encoding]
+
+    def select(self, accept_encoding: str) -> tuple[Optional[str], bytes]:
+        """Accept-Encoding に応じた (圧縮形式, 内容)（圧縮しない場合はNone）"""
+        encoding = negotiate_encoding(accept_encoding, available_encodings())
+        if encoding is None:
+            return None, self.body
+        return encoding, self.encoded(encoding)
@@ -0,0 +1,42 @@
+"""
+条件付きGET（ETag / If-None-Match）
+レスポンス内容のハッシュをETagとし、一致すれば304を返す
+"""
+
+import hashlib
+import json
+from typing import Any, Optional
+
+# キャッシュしてよいが、使う前に必ず再検証させる
+CACHE_CONTROL = "private, no-cache"
+
+# スナップショットごとに覚えておくETagの件数
+MAX_MEMOIZED_ETAGS = 256
+
+
+def compute_etag(payload: Any) -> str:
+    """レスポンス内容からETagを計算"""
+    body = json.dumps(
+        payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str
+    )
+    return '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Matchヘッダーが現在のETagに一致するか（弱い比較）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def memoized_etag(memo: dict[Any, str], key: Any, payload: Any) -> str:
+    """同じスナップショット・同じ条件のETagは再計算しない"""
+    etag = memo.get(key)
+    if etag is None:
+        if len(memo) >= MAX_MEMOIZED_ETAGS:
+            memo.clear()
+        etag = memo[key] = compute_etag(payload)
+    return etag
@@ -0,0 +1,78 @@
+"""
+データベースのエクスポート
+レコードを一定件数ずつ NDJSON / CSV に変換して逐次送信する（必要に応じてgzip圧縮）
+"""
+
+import csv
+import io
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterable, Sequence
+from typing import Any
+
+# 形式 → (Content-Type, 拡張子)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+# ExcelでUTF-8として開けるようCSVの先頭に付ける
+_UTF8_BOM = "\ufeff"
+
+
+def encode_ndjson(records: Iterable[dict[str, Any]]) -> bytes:
+    """レコードを1行1件のJSONに変換"""
+    return "".join(
+        json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records
+    ).encode("utf-8")
+
+
+class CsvEncoder:
+    """列順を固定したCSVエンコーダー"""
+
+    def __init__(self, headers: Sequence[str]) -> None:
+        self.headers = list(headers)
+
+    def header(self) -> bytes:
+        """BOMとヘッダー行"""
+        return (_UTF8_BOM + self._encode([self.headers])).encode("utf-8")
+
+    def encode(self, records: Iterable[dict[str, Any]]) -> bytes:
+        rows = ([record.get(h, "") for h in self.headers] for record in records)
+        return self._encode(rows).encode("utf-8")
+
+    @staticmethod
+    def _encode(rows: Iterable[Sequence[Any]]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\r\n").writerows(rows)
+        return buffer.getvalue()
+
+
+async def stream_export(
+    chunks: AsyncIterator[list[dict[str, Any]]],
+    fmt: str,
+    headers: Sequence[str],
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """レコードのチャンクを順に変換して送信する
+
+    保持するのは1チャンク分のレコードと圧縮状態だけなので、
+    使用メモリはシートの行数によらず一定になる。
+    """
+    csv_encoder = CsvEncoder(headers) if fmt == "csv" else None
+    # wbits=31 でgzipヘッダー付きのストリームになる
+    gzip = zlib.compressobj(wbits=31) if compress else None
+
+    def output(body: bytes) -> bytes:
+        return gzip.compress(body) if gzip is not None else body
+
+    # 0件でもCSVのヘッダー行は出力する
+    if csv_encoder is not None:
+        yield output(csv_encoder.header())
+    async for records in chunks:
+        body = csv_encoder.encode(records) if csv_encoder else encode_ndjson(records)
+        body = output(body)
+        if body:
+            yield body
+    if gzip is not None:
+        yield gzip.flush()
@@ -0,0 +1,45 @@
+"""
+ヘッダー行の確認結果のキャッシュ
+書き込みのたびに1行目を読み込まないよう、確認済みのシートを記録する
+"""
+
+import threading
+import time
+from typing import Callable
+
+
+class HeaderGuard:
+    """データベースごとのヘッダー確認時刻を保持する
+
+    確認から ``interval`` 秒経過するか、書き込みに失敗して
+    ``invalidate()`` されるまで再確認しない。
+    """
+
+    def __init__(
+        self, interval: float = 3600, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.interval = interval
+        self._clock = clock
+        self._verified_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def needs_check(self, db_name: str) -> bool:
+        """ヘッダー行の確認が必要かどうか"""
+        with self._lock:
+            verified_at = self._verified_at.get(db_name)
+        return verified_at is None or verified_at + self.interval <= self._clock()
+
+    def mark_verified(self, db_name: str) -> None:
+        """ヘッダー行を確認済みとして記録"""
+        with self._lock:
+            self._verified_at[db_name] = self._clock()
+
+    def invalidate(self, db_name: str) -> None:
+        """次回の書き込みで再確認させる"""
+        with self._lock:
+            self._verified_at.pop(db_name, None)
+
+    def clear(self) -> None:
+        """全ての確認結果を破棄"""
+        with self._lock:
+            self._verified_at.clear()
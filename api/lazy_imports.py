@@ -0,0 +1,34 @@
+"""
+重い依存の遅延読み込み
+gspread・oauth2client（と、それらが読み込むrequests・google-auth）は読み込みに
+時間がかかるため、起動時には読み込まず、Sheets APIを初めて使うときに読み込む
+"""
+
+import sys
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from gspread.exceptions import APIError
+
+# 起動時（api.main の読み込み時）に読み込まないモジュール
+DEFERRED_MODULES = ("gspread", "oauth2client", "requests", "google.auth")
+
+
+def is_error(exc: BaseException, module: str, *names: str) -> bool:
+    """exc が module の例外クラス names のいずれかかどうかを判定
+
+    モジュールが読み込まれていなければ、その例外が発生していることはないため、
+    判定のためだけに読み込むことはしない。
+    """
+    loaded = sys.modules.get(module)
+    if loaded is None:
+        return False
+    return isinstance(exc, tuple(getattr(loaded, name) for name in names))
+
+
+def as_api_error(exc: BaseException) -> Optional["APIError"]:
+    """exc がgspreadのAPIErrorならそのまま返す（それ以外はNone）"""
+    module = sys.modules.get("gspread.exceptions")
+    if module is not None and isinstance(exc, module.APIError):
+        return exc
+    return None
@@ -3,26 +3,83 @@
 Google Sheets APIを使用してデータを管理するFastAPIサーバー
 """
 
-import json
 import logging
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Optional
+from functools import partial
+from typing import Any, Optional, TypedDict
 
-import gspread
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from oauth2client.service_account import ServiceAccountCredentials
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError, model_validator
+
+from api.change_log import (
+    CREATE,
+    DELETE,
+    Change,
+    ChangeLog,
+    ChangeToken,
+    scan_lower_bound,
+)
+from api.compression import CompressionMiddleware, StaticAsset
+from api.etag import CACHE_CONTROL, compute_etag, etag_matches, memoized_etag
+from api.export import EXPORT_FORMATS, stream_export
+from api.header_guard import HeaderGuard
+from api.metrics import MetricsMiddleware, TimedJSONResponse, registry
+from api.pagination import decode_cursor, encode_cursor
+from api.pk_index import FIRST_DATA_ROW, PrimaryKeyIndex, appended_row_number
+from api.pokedex import DEFAULT_POKEDEX_PATH, load_pokedex
+from api.prewarm import Prewarm, Step
+from api.quota import READ, WRITE, is_retryable, is_transient_error, retry_after
+from api.record_cache import RecordCache, Snapshot, row_to_record
+from api.schema import SHEET_HEADERS, pokemon_to_row, record_to_row
+from api.search_index import SearchIndexes
+from api.secondary_index import EQUALITY_COLUMNS, RANGE_COLUMNS, date_key
+from api.sheets_client import client_manager, is_auth_error, sheets_scheduler
+from api.sheets_io import SheetsExecutor
+from api.storage import BackendRegistry, SheetMirror, SqliteBackend, StorageBackend
+from api.worksheet_cache import WorksheetCache, is_stale_worksheet_error
+from api.write_behind import PendingRow, new_buffer_from_env
 
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """起動・終了処理"""
+    if write_buffer is not None:
+        # 前回のプロセスで書き込めなかった行を引き継ぐ
+        write_buffer.start()
+    # SQLiteのデータベースを開き、シートへの未反映分の反映を再開する
+    for db_name, config in DATABASES.items():
+        if config.get("backend") == SqliteBackend.kind:
+            await run_in_threadpool(storage_backends.get, db_name)
+    # 静的な図鑑データはリクエストごとに圧縮しないよう、ここで圧縮しておく
+    if pokedex_asset is not None:
+        await run_in_threadpool(pokedex_asset.prepare)
+    # 認証・ワークシートのオープン・キャッシュの構築を最初のリクエストより前に済ませる
+    if SHEETS_PREWARM:
+        prewarm.start(prewarm_steps())
+    yield
+    await prewarm.stop()
+    if write_buffer is not None:
+        write_buffer.stop()
+    storage_backends.clear()
+    sheets_executor.shutdown()
+
+
 app = FastAPI(
     title="ポケモン配信データ管理API",
     description="Google Sheetsを使用した配信ポケモンデータの管理システム",
     version="1.0.0",
+    lifespan=lifespan,
+    # JSONへの変換時間を Server-Timing に含める
+    default_response_class=TimedJSONResponse,
 )
 
 # CORS設定
@@ -34,11 +91,36 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンスの圧縮（gzip / Brotli）
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", "1024")),
+)
+
+
+class DatabaseConfig(TypedDict, total=False):
+    """データベースごとの設定"""
+
+    sheet_id: str
+    sheet_name: str
+    backend: str
+    sqlite_path: str
+    sheet_mirror: bool
+
+
 # データベース設定（複数シート対応）
-DATABASES = {
+DATABASES: dict[str, DatabaseConfig] = {
     "pokemon": {
-        "sheet_id": os.getenv("POKEMON_SHEET_ID", "115LHiKGpPtVAGGaV2tS2HchnZLeCFlBcRu0ZXZxJ_NQ"),
+        "sheet_id": os.getenv(
+            "POKEMON_SHEET_ID", "115LHiKGpPtVAGGaV2tS2HchnZLeCFlBcRu0ZXZxJ_NQ"
+        ),
         "sheet_name": "Sheet1",
+        # 保存先: "sheets"（シートを直接読み書き）または "sqlite"
+        "backend": os.getenv("POKEMON_BACKEND", "sheets"),
+        "sqlite_path": os.getenv("POKEMON_SQLITE_PATH", "data/pokemon.sqlite3"),
+        # SQLiteの変更をシートへ非同期で反映するか
+        "sheet_mirror": os.getenv("POKEMON_SHEET_MIRROR", "").lower()
+        in ("1", "true", "yes"),
     },
     # 他のデータベースを追加可能
     # "cards": {
@@ -47,45 +129,88 @@ DATABASES = {
     # }
 }
 
+# リクエスト数・処理時間の計測（圧縮を含む全体を計測するため最後に追加）
+app.add_middleware(MetricsMiddleware, databases=DATABASES)
+
+# Sheets I/Oを実行するスレッドプール
+sheets_executor = SheetsExecutor(
+    max_workers=int(os.getenv("SHEETS_IO_WORKERS", "16")),
+    per_db_limit=int(os.getenv("SHEETS_IO_PER_DB_LIMIT", "8")),
+)
+
+# Spreadsheet/Worksheetハンドルのキャッシュ
+worksheet_cache = WorksheetCache(ttl=float(os.getenv("WORKSHEET_CACHE_TTL", "600")))
+
+# レコードスナップショットのキャッシュ
+record_cache = RecordCache(ttl=float(os.getenv("RECORD_CACHE_TTL", "60")))
+
+# この行数以下のデータベースは、通常の読み取りでもスナップショットを読み込む
+RECORD_CACHE_MAX_ROWS = int(os.getenv("RECORD_CACHE_MAX_ROWS", "5000"))
+
+# 管理ID → 行番号のインデックス
+pk_index = PrimaryKeyIndex(
+    ttl=float(os.getenv("PK_INDEX_TTL", "300")),
+    # インデックスにない管理IDで再構築する最短の間隔（秒）
+    miss_rebuild_interval=float(os.getenv("PK_INDEX_MISS_REBUILD_INTERVAL", "5")),
+)
+
+# ヘッダー行の確認結果
+header_guard = HeaderGuard(interval=float(os.getenv("HEADER_CHECK_INTERVAL", "3600")))
+
+# 全文検索用のN-gramインデックス
+search_indexes = SearchIndexes()
+
+# 作成・削除の変更履歴（変更フィード用、直近 CHANGE_LOG_SIZE 件を保持）
+change_log = ChangeLog(capacity=int(os.getenv("CHANGE_LOG_SIZE", "10000")))
+
+# 変更フィードをタイムスタンプで走査するとき、前回の位置からさかのぼる秒数
+CHANGE_SCAN_OVERLAP = float(os.getenv("CHANGE_SCAN_OVERLAP", "60"))
+
+# 変更フィードの1回の最大件数
+MAX_CHANGES_LIMIT = int(os.getenv("MAX_CHANGES_LIMIT", "1000"))
+
+# ポケモン図鑑データ（入力補完・ポケモン名と図鑑Noの照合）
+POKEDEX_PATH = os.getenv("POKEDEX_PATH", str(DEFAULT_POKEDEX_PATH))
+pokedex = load_pokedex(POKEDEX_PATH)
+
+# 図鑑データのJSONファイル（圧縮済みの内容をそのまま配信する）
+pokedex_asset = (
+    StaticAsset.from_file(POKEDEX_PATH, "application/json")
+    if os.path.exists(POKEDEX_PATH)
+    else None
+)
+
+# 登録時にポケモン名・図鑑Noを図鑑データと照合するか（"0" で無効）
+POKEDEX_VALIDATION = os.getenv("POKEDEX_VALIDATION", "1") != "0"
+
+# 一括登録の最大件数
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+# 起動時に認証・ワークシートのオープン・キャッシュの構築を済ませるか
+SHEETS_PREWARM = os.getenv("SHEETS_PREWARM", "").lower() in ("1", "true", "yes")
+
+# 起動時の事前準備（完了までは /health が503を返す）
+prewarm = Prewarm()
+
+# エクスポートで1回に読み込む行数
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+
+# SQLiteからシートへ変更を反映する間隔（秒）
+SHEET_MIRROR_INTERVAL = float(os.getenv("SHEET_MIRROR_INTERVAL", "2.0"))
+
 
 # Google Sheets認証設定
 def get_google_sheets_client():
-    """Google Sheets APIクライアントを取得"""
+    """Google Sheets APIクライアントを取得（プロセス内で共有）"""
     try:
-        # サービスアカウントキーファイルのパス
-        creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH", "credentials.json")
-
-        if os.path.exists(creds_path):
-            # ファイルから認証情報を読み込み
-            scope = [
-                "https://spreadsheets.google.com/feeds",
-                "https://www.googleapis.com/auth/drive",
-            ]
-            creds = ServiceAccountCredentials.from_json_keyfile_name(creds_path, scope)
-        else:
-            # 環境変数から認証情報を読み込み（Vercel用）
-            creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
-            if creds_json:
-                creds_dict = json.loads(creds_json)
-                scope = [
-                    "https://spreadsheets.google.com/feeds",
-                    "https://www.googleapis.com/auth/drive",
-                ]
-                creds = ServiceAccountCredentials.from_json_keyfile_dict(
-                    creds_dict, scope
-                )
-            else:
-                raise ValueError("Google認証情報が見つかりません")
-
-        client = gspread.authorize(creds)
-        return client
+        return client_manager.get_client()
     except Exception as e:
         logger.error(f"Google Sheets認証エラー: {e}")
         raise HTTPException(status_code=500, detail="Google Sheets認証に失敗しました") from e
 
 
 def get_sheet(db_name: str, sheet_name: str = None):
-    """指定されたデータベースのシートを取得"""
+    """指定されたデータベースのシートを取得（ハンドルはキャッシュ）"""
     if db_name not in DATABASES:
         raise HTTPException(status_code=404, detail=f"データベース '{db_name}' が見つかりません")
 
@@ -93,14 +218,489 @@ def get_sheet(db_name: str, sheet_name: str = None):
     db_config = DATABASES[db_name]
 
     try:
-        spreadsheet = client.open_by_key(db_config["sheet_id"])
-        sheet = spreadsheet.worksheet(sheet_name or db_config["sheet_name"])
-        return sheet
+        return worksheet_cache.get_worksheet(
+            client,
+            db_name,
+            db_config["sheet_id"],
+            sheet_name or db_config["sheet_name"],
+        )
     except Exception as e:
+        handle_sheets_error(db_name, e)
         logger.error(f"シート取得エラー: {e}")
         raise HTTPException(status_code=500, detail="シートの取得に失敗しました") from e
 
 
+async def run_sheets_io(db_name: str, func, *args, **kwargs):
+    """Sheets呼び出しをスレッドプールで実行（イベントループをブロックしない）"""
+    return await sheets_executor.run(db_name, func, *args, **kwargs)
+
+
+async def run_sheets_write(db_name: str, func, *args, **kwargs):
+    """書き込みのSheets呼び出しを、待機中の読み取りより優先して実行"""
+    return await sheets_executor.run_write(db_name, func, *args, **kwargs)
+
+
+async def load_records(db_name: str) -> tuple[Snapshot, bool]:
+    """全レコードのスナップショットを取得（キャッシュがあればメモリから返す）
+
+    Returns:
+        (スナップショット, キャッシュヒットしたかどうか)
+    """
+    snapshot = record_cache.get(db_name)
+    if snapshot is not None:
+        return snapshot, True
+
+    # 読み取りのクォータを使い切っている間は、期限切れのスナップショットで応答する
+    if sheets_scheduler.congested(READ):
+        snapshot = record_cache.peek(db_name)
+        if snapshot is not None:
+            logger.info(f"Sheets APIの混雑中のため期限切れのデータを返します: {db_name}")
+            return snapshot, True
+
+    backend = get_backend(db_name)
+    records = await run_sheets_io(db_name, backend.load_all)
+    return record_cache.put(db_name, records), False
+
+
+async def read_snapshot(
+    db_name: str, request: Request
+) -> tuple[Optional[Snapshot], bool]:
+    """絞り込みのない読み取りに使うスナップショットを取得
+
+    保持していなければ、行数が ``RECORD_CACHE_MAX_ROWS`` 以下のデータベースと
+    条件付きGETは全件を読み込む（以降の読み取りはメモリから返す）。
+    それより大きいデータベースはNoneを返し、要求範囲の行だけを読み込ませる。
+
+    Returns:
+        (スナップショット, キャッシュヒットしたかどうか)
+    """
+    snapshot = record_cache.get(db_name)
+    if snapshot is not None:
+        return snapshot, True
+    if not request.headers.get("if-none-match"):
+        backend = get_backend(db_name)
+        if await run_sheets_io(db_name, backend.count) > RECORD_CACHE_MAX_ROWS:
+            return None, False
+    return await load_records(db_name)
+
+
+def fetch_record_by_id(db_name: str, item_id: str) -> Optional[dict[str, Any]]:
+    """主キーインデックスで行を特定し、その1行だけを読み込む"""
+    sheet = get_sheet(db_name)
+    fetched: dict[int, list[Any]] = {}
+
+    def verify(row: int) -> bool:
+        fetched[row] = sheet.row_values(row)
+        return bool(fetched[row]) and str(fetched[row][0]) == item_id
+
+    row = pk_index.resolve(db_name, sheet, item_id, verify)
+    if row is None:
+        return None
+    headers = pk_index.get(db_name, sheet).headers
+    return row_to_record(headers, fetched[row])
+
+
+def ensure_headers(db_name: str, sheet) -> None:
+    """ヘッダー行を確認し、空のシートにはヘッダー行を作成"""
+    if not header_guard.needs_check(db_name):
+        return
+
+    with pk_index.lock(db_name):
+        first_row = sheet.row_values(1) if sheet.row_count > 0 else []
+        if not first_row:
+            sheet.append_row(list(SHEET_HEADERS))
+            record_cache.invalidate(db_name)
+            pk_index.invalidate(db_name)
+            search_indexes.invalidate(db_name)
+        elif first_row != list(SHEET_HEADERS):
+            # 既存データを消さないよう、自動で作り直さない
+            logger.error(f"ヘッダー行が一致しません: {db_name} {first_row}")
+            raise HTTPException(status_code=409, detail="シートのヘッダー行が想定と異なります")
+        header_guard.mark_verified(db_name)
+
+
+def fetch_record_window(
+    db_name: str,
+    offset: int,
+    limit: int,
+    after_id: Optional[str] = None,
+    cursor_row: Optional[int] = None,
+) -> tuple[list[dict[str, Any]], int, int]:
+    """要求されたページの行範囲だけを読み込む
+
+    総件数とヘッダーは主キーインデックスのキャッシュから取得する。
+
+    Returns:
+        (レコードのリスト, 総件数, 先頭レコードの位置)
+    """
+    sheet = get_sheet(db_name)
+    index = pk_index.get(db_name, sheet)
+
+    start_row = FIRST_DATA_ROW + offset
+    if cursor_row is not None:
+        start_row = cursor_row
+        # 前のページ以降に削除があってもずれないよう管理IDで位置を合わせる
+        after_row = index.lookup(after_id) if after_id is not None else None
+        if after_row is not None:
+            start_row = after_row + 1
+
+    total = index.row_count
+    end_row = min(start_row + limit - 1, FIRST_DATA_ROW + total - 1)
+    if limit == 0 or start_row > end_row or not index.headers:
+        return [], total, start_row - FIRST_DATA_ROW
+
+    records = fetch_rows(sheet, index.headers, start_row, end_row)
+    return records, total, start_row - FIRST_DATA_ROW
+
+
+def fetch_rows(
+    sheet, headers: list[str], start_row: int, end_row: int
+) -> list[dict[str, Any]]:
+    """start_row〜end_row の行だけを読み込む（シートの末尾以降の行は返らない）"""
+    from gspread.utils import rowcol_to_a1
+
+    first_cell = rowcol_to_a1(start_row, 1)
+    last_cell = rowcol_to_a1(end_row, len(headers))
+    values = sheet.get_values(f"{first_cell}:{last_cell}")
+    return [row_to_record(headers, row) for row in values]
+
+
+def append_record_row(db_name: str, sheet, row_data: list[Any]) -> None:
+    """行を追加し、追加先の行番号をインデックスに反映"""
+    with pk_index.lock(db_name):
+        response = sheet.append_row(row_data)
+        pk_index.on_append(db_name, str(row_data[0]), appended_row_number(response))
+
+
+def append_record_rows(db_name: str, sheet, rows: list[list[Any]]) -> None:
+    """複数行を1回のappend_rowsで追加し、インデックスに反映"""
+    with pk_index.lock(db_name):
+        try:
+            response = sheet.append_rows(rows)
+        except Exception:
+            # 反映済みで例外になった場合は行番号がずれているため破棄する
+            pk_index.invalidate(db_name)
+            raise
+        item_ids = [str(row[0]) for row in rows]
+        pk_index.on_append_rows(db_name, item_ids, appended_row_number(response))
+
+
+def delete_record_row(db_name: str, item_id: str) -> bool:
+    """管理IDの行だけを削除（見つからなければFalse）"""
+    sheet = get_sheet(db_name)
+
+    def verify(row: int) -> bool:
+        return str(sheet.cell(row, 1).value) == item_id
+
+    with pk_index.lock(db_name):
+        row = pk_index.resolve(db_name, sheet, item_id, verify)
+        if row is None:
+            return False
+        sheet.delete_rows(row)
+        pk_index.on_delete(db_name, row)
+    return True
+
+
+def delete_record_rows(db_name: str, item_ids: list[str]) -> list[str]:
+    """複数の管理IDの行を1回のbatchUpdateで削除し、見つからなかった管理IDを返す
+
+    行番号は削除の直前に管理ID列を読み直して一度に解決する。
+    下の行から削除すれば、削除済みの行で残りの行番号がずれない。
+    """
+    sheet = get_sheet(db_name)
+    missing: list[str] = []
+    rows: list[int] = []
+
+    with pk_index.lock(db_name):
+        index = pk_index.build(db_name, sheet)
+        for item_id in dict.fromkeys(item_ids):
+            row = index.lookup(item_id)
+            if row is None:
+                missing.append(item_id)
+            else:
+                rows.append(row)
+        if rows:
+            requests = [
+                {
+                    "deleteDimension": {
+                        "range": {
+                            "sheetId": sheet.id,
+                            "dimension": "ROWS",
+                            "startIndex": first - 1,
+                            "endIndex": last,
+                        }
+                    }
+                }
+                for first, last in descending_row_ranges(rows)
+            ]
+            sheet.spreadsheet.batch_update({"requests": requests})
+            pk_index.on_delete_rows(db_name, rows)
+    return missing
+
+
+def descending_row_ranges(rows: list[int]) -> list[tuple[int, int]]:
+    """行番号を連続する範囲 (先頭行, 末尾行) にまとめ、下の範囲から並べる"""
+    ranges: list[tuple[int, int]] = []
+    for row in sorted(set(rows), reverse=True):
+        if ranges and ranges[-1][0] == row + 1:
+            ranges[-1] = (row, ranges[-1][1])
+        else:
+            ranges.append((row, row))
+    return ranges
+
+
+def flush_pending_rows(db_name: str, items: list[PendingRow]) -> None:
+    """書き込みバッファの行をまとめてシートへ書き込む"""
+    sheet = get_sheet(db_name)
+    ensure_headers(db_name, sheet)
+
+    rows: list[list[Any]] = []
+    written: list[list[Any]] = []
+    index = None
+    if any(item.recovered for item in items):
+        # 前回のプロセス・失敗した書き込みで反映済みになっていた行は重複させない
+        index = pk_index.build(db_name, sheet)
+    for item in items:
+        if (
+            index is not None
+            and item.recovered
+            and index.lookup(str(item.row[0])) is not None
+        ):
+            written.append(item.row)
+        else:
+            rows.append(item.row)
+    if written:
+        # 例外の後に反映されていた行はキャッシュにないため、次回読み直す
+        record_cache.invalidate(db_name)
+        search_indexes.invalidate(db_name)
+        apply_created(db_name, written)
+    if rows:
+        append_record_rows(db_name, sheet, rows)
+        apply_created(db_name, rows)
+
+
+def apply_created(db_name: str, rows: list[list[Any]]) -> None:
+    """シートに追加した行をメモリ上のキャッシュ・索引に反映"""
+    records = [row_to_record(SHEET_HEADERS, row) for row in rows]
+    record_cache.extend(db_name, records)
+    search_indexes.on_create(db_name, records)
+    change_log.append(db_name, CREATE, [(str(r.get("管理ID")), r) for r in records])
+
+
+def apply_deleted(db_name: str, item_ids: list[str]) -> None:
+    """シートから削除した行をメモリ上のキャッシュ・索引に反映"""
+    record_cache.remove_many(db_name, item_ids)
+    for item_id in item_ids:
+        search_indexes.on_delete(db_name, item_id)
+    change_log.append(db_name, DELETE, [(item_id, None) for item_id in item_ids])
+
+
+def conditional_response(
+    request: Request, response: Response, payload: dict[str, Any], etag: str
+):
+    """ETagを付与し、If-None-Matchが一致すれば本文なしの304を返す"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if "X-Cache" in response.headers:
+            headers["X-Cache"] = response.headers["X-Cache"]
+        return Response(status_code=304, headers=headers)
+    return payload
+
+
+def handle_sheets_error(db_name: str, exc: BaseException, kind: str = READ) -> None:
+    """Sheets呼び出しの失敗内容に応じてクライアント・ハンドルを破棄
+
+    レート制限などの一時的なエラーで再試行しきれなかった場合は、
+    Retry-After付きの503として送出する。書き込みの5xx・接続エラーは
+    シートに反映済みの可能性があり再送すると重複するため、
+    再試行を促さない502として送出する。
+    """
+    if is_auth_error(exc):
+        client_manager.invalidate()
+        worksheet_cache.clear()
+    elif is_stale_worksheet_error(exc):
+        worksheet_cache.invalidate(db_name)
+    elif kind == WRITE and is_transient_error(exc) and not is_retryable(kind, exc):
+        logger.warning(f"Sheets APIへの書き込み結果が不明です: {db_name} {exc}")
+        raise HTTPException(
+            status_code=502,
+            detail="Google Sheetsへの書き込み結果を確認できませんでした。"
+            "反映されている可能性があるため、登録状況を確認してから再送してください",
+        ) from exc
+    elif is_transient_error(exc):
+        seconds = retry_after(exc) or sheets_scheduler.seconds_until_available()
+        logger.warning(f"Sheets APIの一時的なエラー: {db_name} {exc}")
+        raise HTTPException(
+            status_code=503,
+            detail="Google Sheetsが混雑しています。しばらくしてから再試行してください",
+            headers={"Retry-After": str(max(1, round(seconds)))},
+        ) from exc
+
+
+class SheetsBackend(StorageBackend):
+    """Google Sheetsを直接読み書きするバックエンド"""
+
+    kind = "sheets"
+
+    def headers(self) -> list[str]:
+        return pk_index.get(self.db_name, get_sheet(self.db_name)).headers
+
+    def load_all(self) -> list[dict[str, Any]]:
+        records: list[dict[str, Any]] = get_sheet(self.db_name).get_all_records()
+        return records
+
+    def read_window(
+        self,
+        offset: int,
+        limit: int,
+        after_id: Optional[str] = None,
+        cursor_row: Optional[int] = None,
+    ) -> tuple[list[dict[str, Any]], int, int]:
+        return fetch_record_window(self.db_name, offset, limit, after_id, cursor_row)
+
+    def read_by_id(self, item_id: str) -> Optional[dict[str, Any]]:
+        return fetch_record_by_id(self.db_name, item_id)
+
+    def count(self) -> int:
+        return pk_index.get(self.db_name, get_sheet(self.db_name)).row_count
+
+    def read_rows(self, start: int, size: int) -> list[dict[str, Any]]:
+        if size <= 0:
+            return []
+        sheet = get_sheet(self.db_name)
+        headers = pk_index.get(self.db_name, sheet).headers
+        if not headers:
+            return []
+        start_row = FIRST_DATA_ROW + start
+        return fetch_rows(sheet, headers, start_row, start_row + size - 1)
+
+    def append_rows(self, rows: list[list[Any]]) -> None:
+        sheet = get_sheet(self.db_name)
+        # ヘッダー行を確認（確認済みならシートを読まない）
+        ensure_headers(self.db_name, sheet)
+        if len(rows) == 1:
+            append_record_row(self.db_name, sheet, rows[0])
+        else:
+            append_record_rows(self.db_name, sheet, rows)
+
+    def delete(self, item_id: str) -> bool:
+        return delete_record_row(self.db_name, item_id)
+
+    def delete_many(self, item_ids: list[str]) -> list[str]:
+        return delete_record_rows(self.db_name, item_ids)
+
+
+def create_backend(db_name: str) -> StorageBackend:
+    """データベースの設定に応じたバックエンドを作成"""
+    config = DATABASES[db_name]
+    if config.get("backend", SheetsBackend.kind) != SqliteBackend.kind:
+        return SheetsBackend(db_name)
+
+    mirror_enabled = config.get("sheet_mirror", False)
+    backend = SqliteBackend(
+        db_name,
+        config.get("sqlite_path", f"data/{db_name}.sqlite3"),
+        SHEET_HEADERS,
+        mirror_enabled=mirror_enabled,
+    )
+    if mirror_enabled:
+        sheets = SheetsBackend(db_name)
+        if backend.is_empty():
+            # 初回はシートの既存データを取り込む
+            records = sheets.load_all()
+            backend.import_rows([record_to_row(r) for r in records])
+            logger.info(f"シートのデータを取り込みました: {db_name} ({len(records)}件)")
+        backend.mirror = SheetMirror(
+            backend,
+            lambda _, rows: sheets.append_rows(rows),
+            lambda _, item_ids: sheets.delete_many(item_ids),
+            interval=SHEET_MIRROR_INTERVAL,
+            existing_ids=lambda _: set(
+                pk_index.build(db_name, get_sheet(db_name)).rows
+            ),
+        )
+        backend.mirror.start()
+    return backend
+
+
+# データベースごとの保存先
+storage_backends = BackendRegistry(create_backend)
+
+
+def get_backend(db_name: str) -> StorageBackend:
+    """指定されたデータベースのバックエンドを取得"""
+    if db_name not in DATABASES:
+        raise HTTPException(status_code=404, detail=f"データベース '{db_name}' が見つかりません")
+    return storage_backends.get(db_name)
+
+
+# 書き込みバッファ（WRITE_BEHIND_ENABLED=1 の場合のみ）
+write_buffer = new_buffer_from_env(flush_pending_rows)
+
+
+def _executor_gauges(field: str):
+    def collect():
+        databases = sheets_executor.stats()["databases"]
+        return [({"db": db}, counts[field]) for db, counts in databases.items()]
+
+    return collect
+
+
+def _quota_gauges(field: str):
+    def collect():
+        stats = sheets_scheduler.stats()
+        return [({"kind": kind}, counts[field]) for kind, counts in stats.items()]
+
+    return collect
+
+
+# /metrics の出力時に現在値を取得するゲージ
+registry.add_gauge_callback(
+    "sheets_io_waiting",
+    "Sheets I/Oの実行枠を待っている呼び出し数",
+    ("db",),
+    _executor_gauges("waiting"),
+)
+registry.add_gauge_callback(
+    "sheets_io_running",
+    "実行中のSheets I/O呼び出し数",
+    ("db",),
+    _executor_gauges("running"),
+)
+registry.add_gauge_callback(
+    "sheets_quota_waiting",
+    "クォータの回復を待っているSheets API呼び出し数",
+    ("kind",),
+    _quota_gauges("waiting"),
+)
+registry.add_gauge_callback(
+    "sheets_quota_tokens",
+    "Sheets APIクォータの残りトークン数",
+    ("kind",),
+    _quota_gauges("tokens"),
+)
+
+
+def prime_index(db_name: str) -> None:
+    """ワークシートを開き、主キーインデックス（ヘッダー・行数）を構築"""
+    pk_index.get(db_name, get_sheet(db_name))
+
+
+def prewarm_steps() -> list[Step]:
+    """起動時の事前準備（認証 → データベースごとにインデックス・スナップショット）"""
+    steps: list[Step] = [
+        ("auth", partial(run_in_threadpool, client_manager.get_client))
+    ]
+    for db_name, config in DATABASES.items():
+        if config.get("backend") == SheetsBackend.kind:
+            prime = partial(run_sheets_io, db_name, prime_index, db_name)
+            steps.append((f"{db_name}.index", prime))
+        steps.append((f"{db_name}.records", partial(load_records, db_name)))
+    return steps
+
+
 # Pydanticモデル定義
 class PokemonDistribution(BaseModel):
     method: str
@@ -138,6 +738,15 @@ class PokemonData(BaseModel):
     other_info: Optional[str] = ""
     timestamp: Optional[str] = None
 
+    @model_validator(mode="after")
+    def check_pokedex(self) -> "PokemonData":
+        """ポケモン名と図鑑Noが図鑑データと一致するか確認"""
+        if POKEDEX_VALIDATION and len(pokedex):
+            error = pokedex.validate(self.name.ja, self.dex_no)
+            if error:
+                raise ValueError(error)
+        return self
+
 
 class ApiResponse(BaseModel):
     success: bool
@@ -155,8 +764,27 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """ヘルスチェック"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    """ヘルスチェック（起動時の事前準備中は503）"""
+    health = {
+        "status": "healthy" if prewarm.ready else "starting",
+        "timestamp": datetime.now().isoformat(),
+        "sheets_io": sheets_executor.stats(),
+        "quota": sheets_scheduler.stats(),
+        "storage": storage_backends.stats(),
+    }
+    if write_buffer is not None:
+        health["write_behind"] = write_buffer.stats()
+    if SHEETS_PREWARM:
+        health["prewarm"] = prewarm.stats()
+    if not prewarm.ready:
+        return TimedJSONResponse(status_code=503, content=health)
+    return health
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus形式のメトリクス"""
+    return Response(registry.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/api/databases")
@@ -165,164 +793,599 @@ async def get_databases():
     return {"databases": list(DATABASES.keys())}
 
 
+@app.get("/pokemon_data.json")
+async def get_pokedex_json(request: Request):
+    """図鑑データのJSON（Accept-Encodingに応じて圧縮済みの内容を返す）"""
+    if pokedex_asset is None:
+        raise HTTPException(status_code=404, detail="図鑑データが見つかりません")
+    headers = {
+        "ETag": pokedex_asset.etag,
+        "Cache-Control": "public, max-age=3600",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("if-none-match"), pokedex_asset.etag):
+        return Response(status_code=304, headers=headers)
+    encoding, body = pokedex_asset.select(request.headers.get("accept-encoding", ""))
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type=pokedex_asset.media_type, headers=headers)
+
+
+@app.get("/api/pokedex/autocomplete")
+async def autocomplete_pokemon(q: str, limit: int = 10):
+    """ポケモン名の入力補完（前方一致、カタカナ/ひらがなを区別しない）"""
+    entries = pokedex.complete(q, min(max(limit, 0), 100))
+    return {"success": True, "data": [entry.to_dict() for entry in entries]}
+
+
+@app.get("/api/pokedex/{dex_no}")
+async def lookup_pokedex(dex_no: int):
+    """図鑑Noのポケモン（メガシンカ・フォルム違いを含む）"""
+    entries = pokedex.lookup(dex_no)
+    if not entries:
+        raise HTTPException(status_code=404, detail=f"図鑑No {dex_no} が見つかりません")
+    return {"success": True, "data": [entry.to_dict() for entry in entries]}
+
+
 @app.post("/api/{db_name}/data", response_model=ApiResponse)
 async def create_data(db_name: str, data: PokemonData):
     """データを作成"""
     try:
-        sheet = get_sheet(db_name)
-
         # タイムスタンプを現在時刻に設定
         if not data.timestamp:
             data.timestamp = datetime.now().isoformat()
 
-        # ヘッダー行を確認・作成
-        headers = [
-            "管理ID",
-            "ポケモン名",
-            "色違い",
-            "全国図鑑No",
-            "世代",
-            "ゲーム",
-            "配信イベント名",
-            "配信方法",
-            "配信場所",
-            "配信開始日",
-            "配信終了日",
-            "おやめい",
-            "ID",
-            "出会った場所",
-            "ボール",
-            "レベル",
-            "せいべつ",
-            "とくせい",
-            "せいかく",
-            "キョダイマックス",
-            "テラスタイプ",
-            "持ち物",
-            "技1",
-            "技2",
-            "技3",
-            "技4",
-            "リボン1",
-            "リボン2",
-            "リボン3",
-            "その他特記事項",
-            "タイムスタンプ",
-        ]
-
-        # 最初の行がヘッダーかチェック
-        if sheet.row_count == 0 or sheet.row_values(1) != headers:
-            if sheet.row_count > 0:
-                sheet.clear()
-            sheet.append_row(headers)
-
-        # データ行を準備
-        moves = data.moves or []
-        ribbons = data.ribbons or []
-
-        row_data = [
-            data.id,
-            data.name.ja,
-            data.shiny,
-            data.dex_no,
-            data.generation,
-            data.game,
-            data.event_name,
-            data.distribution.method,
-            data.distribution.location,
-            data.distribution.start_date,
-            data.distribution.end_date or "",
-            data.ot_name,
-            data.trainer_id,
-            data.met_location,
-            data.ball,
-            data.level,
-            data.gender,
-            data.ability,
-            data.nature,
-            data.gigantamax,
-            data.terastallize,
-            data.held_item,
-            moves[0] if len(moves) > 0 else "",
-            moves[1] if len(moves) > 1 else "",
-            moves[2] if len(moves) > 2 else "",
-            moves[3] if len(moves) > 3 else "",
-            ribbons[0] if len(ribbons) > 0 else "",
-            ribbons[1] if len(ribbons) > 1 else "",
-            ribbons[2] if len(ribbons) > 2 else "",
-            data.other_info,
-            data.timestamp,
-        ]
+        backend = get_backend(db_name)
+
+        # ライトビハインドが有効な場合は受け付けだけ行う（シートに直接書く場合のみ）
+        if write_buffer is not None and isinstance(backend, SheetsBackend):
+            ticket = await run_in_threadpool(
+                write_buffer.submit, db_name, pokemon_to_row(data)
+            )
+            logger.info(f"データ受付: {data.id} ({ticket})")
+            accepted = ApiResponse(
+                success=True,
+                message="データを受け付けました",
+                data={"ticket": ticket, "status": "pending"},
+            )
+            return TimedJSONResponse(status_code=202, content=accepted.model_dump())
 
         # データを追加
-        sheet.append_row(row_data)
+        row_data = pokemon_to_row(data)
+        await run_sheets_write(db_name, backend.append_rows, [row_data])
+        apply_created(db_name, [row_data])
 
         logger.info(f"データ作成成功: {data.id}")
         return ApiResponse(success=True, message="データが正常に保存されました")
 
+    except HTTPException:
+        raise
     except Exception as e:
+        header_guard.invalidate(db_name)
+        handle_sheets_error(db_name, e, WRITE)
         logger.error(f"データ作成エラー: {e}")
         raise HTTPException(status_code=500, detail=f"データの保存に失敗しました: {str(e)}") from e
 
 
+@app.post("/api/{db_name}/data/batch", response_model=ApiResponse)
+async def create_data_batch(db_name: str, items: list[dict[str, Any]]):
+    """データを一括作成（検証に通った行を1回のappend_rowsで書き込む）"""
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"一括登録は{MAX_BATCH_SIZE}件までです")
+
+    # 1件ずつ検証し、失敗した行は結果に記録して残りを書き込む
+    results: list[dict[str, Any]] = []
+    rows: list[list[Any]] = []
+    seen_ids: set[str] = set()
+    timestamp = datetime.now().isoformat()
+    for index, item in enumerate(items):
+        try:
+            data = PokemonData.model_validate(item)
+        except ValidationError as e:
+            results.append(
+                {
+                    "index": index,
+                    "id": item.get("id"),
+                    "success": False,
+                    "errors": [
+                        f"{'.'.join(map(str, err['loc']))}: {err['msg']}"
+                        for err in e.errors()
+                    ],
+                }
+            )
+            continue
+        if data.id in seen_ids:
+            results.append(
+                {
+                    "index": index,
+                    "id": data.id,
+                    "success": False,
+                    "errors": ["管理IDがバッチ内で重複しています"],
+                }
+            )
+            continue
+        seen_ids.add(data.id)
+        if not data.timestamp:
+            data.timestamp = timestamp
+        rows.append(pokemon_to_row(data))
+        results.append({"index": index, "id": data.id, "success": True, "errors": []})
+
+    try:
+        if rows:
+            backend = get_backend(db_name)
+            await run_sheets_write(db_name, backend.append_rows, rows)
+            apply_created(db_name, rows)
+    except HTTPException:
+        raise
+    except Exception as e:
+        header_guard.invalidate(db_name)
+        handle_sheets_error(db_name, e, WRITE)
+        logger.error(f"一括データ作成エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"データの保存に失敗しました: {str(e)}") from e
+
+    failed = len(items) - len(rows)
+    logger.info(f"一括データ作成: 成功 {len(rows)}, 失敗 {failed}")
+    return ApiResponse(
+        success=failed == 0,
+        message=f"{len(rows)}件のデータを保存しました（失敗 {failed}件）",
+        data={"saved": len(rows), "failed": failed, "results": results},
+    )
+
+
+@app.post("/api/{db_name}/data/batch-delete", response_model=ApiResponse)
+async def delete_data_batch(db_name: str, item_ids: list[str]):
+    """複数の管理IDのデータを一括削除（シートへは1回のbatchUpdate）"""
+    if len(item_ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"一括削除は{MAX_BATCH_SIZE}件までです")
+
+    try:
+        backend = get_backend(db_name)
+        missing = await run_sheets_write(db_name, backend.delete_many, item_ids)
+    except HTTPException:
+        raise
+    except Exception as e:
+        handle_sheets_error(db_name, e, WRITE)
+        logger.error(f"一括データ削除エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"データの削除に失敗しました: {str(e)}") from e
+
+    not_found = set(missing)
+    deleted = [i for i in dict.fromkeys(item_ids) if i not in not_found]
+    if deleted:
+        apply_deleted(db_name, deleted)
+
+    logger.info(f"一括データ削除: 削除 {len(deleted)}, 該当なし {len(missing)}")
+    return ApiResponse(
+        success=not missing,
+        message=f"{len(deleted)}件のデータを削除しました（該当なし {len(missing)}件）",
+        data={"deleted": deleted, "missing": missing},
+    )
+
+
+@app.get("/api/{db_name}/writes/{ticket}")
+async def get_write_status(db_name: str, ticket: str):
+    """書き込みバッファに受け付けたデータの状態を取得"""
+    status = write_buffer.status(ticket) if write_buffer is not None else None
+    if status is None:
+        raise HTTPException(status_code=404, detail="受付番号が見つかりません")
+    return {"success": True, "data": status}
+
+
+def _parse_filters(
+    equals: dict[str, Any], ranges: dict[str, tuple[Optional[str], Optional[str]]]
+) -> tuple[dict[str, Any], dict[str, tuple[Optional[str], Optional[str]]]]:
+    """クエリパラメータを列名ごとの検索条件に変換"""
+    column_equals = {
+        EQUALITY_COLUMNS[name]: value
+        for name, value in equals.items()
+        if value is not None and value != ""
+    }
+    column_ranges = {}
+    for name, bounds in ranges.items():
+        if not any(bounds):
+            continue
+        lower, upper = (date_key(b) if b else None for b in bounds)
+        if any(b and key is None for b, key in zip(bounds, (lower, upper))):
+            raise ValueError("日付は YYYY-MM-DD 形式で指定してください")
+        column_ranges[RANGE_COLUMNS[name]] = (lower, upper)
+    return column_equals, column_ranges
+
+
+async def query_data(
+    db_name: str,
+    request: Request,
+    response: Response,
+    equals: dict[str, Any],
+    ranges: dict[str, tuple[Optional[str], Optional[str]]],
+    limit: int,
+    offset: int,
+):
+    """スナップショットのインデックスで絞り込んだデータを取得"""
+    try:
+        snapshot, hit = await load_records(db_name)
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+
+        positions = snapshot.indexes.query(equals, ranges)
+        start = max(offset, 0)
+        records = [snapshot.records[p] for p in positions[start : start + limit]]
+        payload = {
+            "success": True,
+            "data": records,
+            "total": len(positions),
+            "offset": start,
+            "limit": limit,
+            "next_cursor": None,
+        }
+        key = ("query", tuple(equals.items()), tuple(ranges.items()), start, limit)
+        etag = memoized_etag(snapshot.etags, key, payload)
+        return conditional_response(request, response, payload, etag)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        handle_sheets_error(db_name, e)
+        logger.error(f"データ検索エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}") from e
+
+
 @app.get("/api/{db_name}/data")
-async def get_data(db_name: str, limit: int = 100, offset: int = 0):
-    """データを取得"""
+async def get_data(
+    db_name: str,
+    request: Request,
+    response: Response,
+    limit: int = 100,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    generation: Optional[int] = None,
+    game: Optional[str] = None,
+    dex_no: Optional[str] = None,
+    start_from: Optional[str] = None,
+    start_to: Optional[str] = None,
+    end_from: Optional[str] = None,
+    end_to: Optional[str] = None,
+):
+    """データを取得（大きいデータベースでスナップショットがなければ要求範囲の行だけを読み込む）
+
+    世代・ゲーム・全国図鑑No・配信開始日/配信終了日の範囲を指定した場合は
+    スナップショットのインデックスで絞り込む。
+    """
+    limit = max(limit, 0)
     try:
-        sheet = get_sheet(db_name)
+        after_id, cursor_row = decode_cursor(cursor) if cursor else (None, None)
+        equals, ranges = _parse_filters(
+            {"generation": generation, "game": game, "dex_no": dex_no},
+            {"start": (start_from, start_to), "end": (end_from, end_to)},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
 
-        # 全データを取得
-        all_records = sheet.get_all_records()
+    if equals or ranges:
+        return await query_data(
+            db_name, request, response, equals, ranges, limit, offset
+        )
 
-        # ページネーション
-        start = offset
-        end = start + limit
-        records = all_records[start:end]
+    try:
+        snapshot, hit = await read_snapshot(db_name, request)
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
 
-        return {
+        if snapshot is not None:
+            start = max(offset, 0)
+            if cursor_row is not None:
+                start = cursor_row - FIRST_DATA_ROW
+                # 前のページ以降に削除があってもずれないよう管理IDで位置を合わせる
+                if after_id in snapshot.positions:
+                    start = snapshot.positions[after_id] + 1
+            records = snapshot.records[start : start + limit]
+            total = len(snapshot.records)
+        else:
+            backend = get_backend(db_name)
+            records, total, start = await run_sheets_io(
+                db_name,
+                backend.read_window,
+                max(offset, 0),
+                limit,
+                after_id,
+                cursor_row,
+            )
+
+        next_offset = start + len(records)
+        next_cursor = None
+        if records and next_offset < total:
+            last_id = str(records[-1].get("管理ID"))
+            next_cursor = encode_cursor(last_id, FIRST_DATA_ROW + next_offset)
+
+        payload = {
             "success": True,
             "data": records,
-            "total": len(all_records),
-            "offset": offset,
+            "total": total,
+            "offset": start,
             "limit": limit,
+            "next_cursor": next_cursor,
         }
+        if snapshot is not None:
+            etag = memoized_etag(snapshot.etags, ("data", start, limit), payload)
+        else:
+            etag = compute_etag(payload)
+        return conditional_response(request, response, payload, etag)
 
+    except HTTPException:
+        raise
     except Exception as e:
+        handle_sheets_error(db_name, e)
         logger.error(f"データ取得エラー: {e}")
         raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}") from e
 
 
+@app.get("/api/{db_name}/search")
+async def search_data(
+    db_name: str, q: str, response: Response, limit: int = 100, offset: int = 0
+):
+    """ポケモン名・配信イベント名・出会った場所・その他特記事項の部分一致検索"""
+    try:
+        snapshot, hit = await load_records(db_name)
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
+
+        index = search_indexes.get(db_name, snapshot.records, snapshot.loaded_at)
+        # シートの行順に並べる
+        order = snapshot.positions
+        matched = sorted(
+            order[item_id] for item_id in index.search(q) if item_id in order
+        )
+        start = max(offset, 0)
+        records = [snapshot.records[p] for p in matched[start : start + max(limit, 0)]]
+        return {
+            "success": True,
+            "data": records,
+            "total": len(matched),
+            "offset": start,
+            "limit": limit,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        handle_sheets_error(db_name, e)
+        logger.error(f"データ検索エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"データの検索に失敗しました: {str(e)}") from e
+
+
+async def snapshot_chunks(snapshot: Snapshot):
+    """スナップショットのレコードをエクスポート用に分割"""
+    for start in range(0, len(snapshot.records), EXPORT_CHUNK_SIZE):
+        yield snapshot.records[start : start + EXPORT_CHUNK_SIZE]
+
+
+async def backend_chunks(db_name: str, backend: StorageBackend):
+    """保存先から EXPORT_CHUNK_SIZE 件ずつ読み込む（短いチャンクが返れば終了）"""
+    start = 0
+    try:
+        while True:
+            records = await run_sheets_io(
+                db_name, backend.read_rows, start, EXPORT_CHUNK_SIZE
+            )
+            if records:
+                yield records
+            if len(records) < EXPORT_CHUNK_SIZE:
+                return
+            start += EXPORT_CHUNK_SIZE
+    except Exception as e:
+        # 送信開始後はステータスを変えられないため、ログを残して接続を切る
+        logger.error(f"エクスポートエラー: {db_name} {start}件目 {e}")
+        handle_sheets_error(db_name, e)
+        raise
+
+
+@app.get("/api/{db_name}/export")
+async def export_data(db_name: str, format: str = "ndjson", gzip: bool = False):
+    """データベース全体を NDJSON / CSV でエクスポート
+
+    保存先を一定行数ずつ読み込んで逐次送信するため、行数が増えても
+    使用メモリは変わらない。``gzip=true`` で圧縮して送信する。
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"形式は {', '.join(EXPORT_FORMATS)} のいずれかを指定してください",
+        )
+
+    try:
+        snapshot = record_cache.get(db_name)
+        if snapshot is not None:
+            headers = list(snapshot.records[0]) if snapshot.records else []
+            chunks = snapshot_chunks(snapshot)
+        else:
+            backend = get_backend(db_name)
+            headers = await run_sheets_io(db_name, backend.headers)
+            chunks = backend_chunks(db_name, backend)
+    except HTTPException:
+        raise
+    except Exception as e:
+        handle_sheets_error(db_name, e)
+        logger.error(f"エクスポートエラー: {e}")
+        raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}") from e
+
+    media_type, extension = EXPORT_FORMATS[format]
+    response_headers = {
+        "Content-Disposition": f'attachment; filename="{db_name}.{extension}"',
+        "X-Cache": "HIT" if snapshot is not None else "MISS",
+    }
+    if gzip:
+        response_headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_export(chunks, format, headers or list(SHEET_HEADERS), compress=gzip),
+        media_type=media_type,
+        headers=response_headers,
+    )
+
+
 @app.get("/api/{db_name}/data/{item_id}")
-async def get_data_by_id(db_name: str, item_id: str):
+async def get_data_by_id(
+    db_name: str, item_id: str, request: Request, response: Response
+):
     """IDでデータを取得"""
     try:
-        sheet = get_sheet(db_name)
-        records = sheet.get_all_records()
+        snapshot, hit = await read_snapshot(db_name, request)
+        response.headers["X-Cache"] = "HIT" if hit else "MISS"
 
-        # IDで検索
-        for record in records:
-            if record.get("管理ID") == item_id:
-                return {"success": True, "data": record}
+        # 大きいデータベースでスナップショットがなければ該当行だけを読み込む
+        if snapshot is not None:
+            record = snapshot.by_id.get(item_id)
+        else:
+            backend = get_backend(db_name)
+            record = await run_sheets_io(db_name, backend.read_by_id, item_id)
+        if record is not None:
+            payload = {"success": True, "data": record}
+            if snapshot is not None:
+                etag = memoized_etag(snapshot.etags, ("id", item_id), payload)
+            else:
+                etag = compute_etag(payload)
+            return conditional_response(request, response, payload, etag)
 
         raise HTTPException(status_code=404, detail="データが見つかりません")
 
     except HTTPException:
         raise
     except Exception as e:
+        handle_sheets_error(db_name, e)
         logger.error(f"データ取得エラー: {e}")
         raise HTTPException(status_code=500, detail=f"データの取得に失敗しました: {str(e)}") from e
 
 
+def scan_changes(
+    snapshot: Snapshot, token: Optional[ChangeToken], head: int, limit: int
+) -> dict[str, Any]:
+    """タイムスタンプ順の走査で変更フィードを組み立てる（再起動後・履歴切れ）
+
+    削除は走査では分からないため、最後のページに現在の全管理IDを付け、
+    利用側で手元にないIDを削除できるようにする。
+    """
+    if token is None:
+        lower = None
+    elif token.seq is None:
+        # 前のページの続き
+        lower = token.watermark
+    else:
+        lower = scan_lower_bound(token.watermark, CHANGE_SCAN_OVERLAP)
+    entries = snapshot.timestamps.after(lower)
+    end = min(limit, len(entries))
+    # 同じタイムスタンプのレコードはページをまたがせない（続きは次の時刻から走査する）
+    while 0 < end < len(entries) and entries[end][0] == entries[end - 1][0]:
+        end += 1
+    page = entries[:end]
+    has_more = end < len(entries)
+
+    watermark = token.watermark if token else None
+    if page and (watermark is None or page[-1][0] > watermark):
+        watermark = page[-1][0]
+    data: dict[str, Any] = {
+        "changes": [
+            {
+                "op": CREATE,
+                "id": str(snapshot.records[p].get("管理ID")),
+                "record": snapshot.records[p],
+            }
+            for _, p in page
+        ],
+        "mode": "scan",
+        "has_more": has_more,
+    }
+    if has_more:
+        data["next"] = ChangeToken(change_log.epoch, None, page[-1][0]).encode()
+    else:
+        data["next"] = ChangeToken(change_log.epoch, head, watermark).encode()
+        data["ids"] = list(snapshot.positions)
+    return data
+
+
+def log_changes(
+    db_name: str,
+    snapshot: Snapshot,
+    token: ChangeToken,
+    changes: list[Change],
+    limit: int,
+) -> dict[str, Any]:
+    """変更履歴で変更フィードを組み立てる
+
+    履歴にあるのはこのプロセスの書き込みだけなので、別インスタンスや
+    シートへの直接の追加は、スナップショットのうちトークンの watermark
+    より後で履歴にない行から補う。
+    """
+    page = changes[:limit]
+    entries = snapshot.timestamps.after(token.watermark)
+    ids = [str(snapshot.records[p].get("管理ID")) for _, p in entries]
+    local = change_log.created(db_name, ids)
+    others = [
+        (entry, item_id) for entry, item_id in zip(entries, ids) if item_id not in local
+    ]
+    end = min(limit - len(page), len(others))
+    # 同じタイムスタンプのレコードはページをまたがせない（続きは次の時刻から補う）
+    while 0 < end < len(others) and others[end][0][0] == others[end - 1][0][0]:
+        end += 1
+    merged = others[:end]
+
+    seq = page[-1].seq if page else token.seq
+    watermark = merged[-1][0][0] if merged else token.watermark
+    return {
+        "changes": [c.to_dict() for c in page]
+        + [
+            {"op": CREATE, "id": item_id, "record": snapshot.records[p]}
+            for (_, p), item_id in merged
+        ],
+        "mode": "log",
+        "has_more": len(changes) > limit or end < len(others),
+        "next": ChangeToken(change_log.epoch, seq, watermark).encode(),
+    }
+
+
+@app.get("/api/{db_name}/changes")
+async def get_changes(db_name: str, since: Optional[str] = None, limit: int = 1000):
+    """トークン以降に作成・削除されたデータを取得
+
+    同じプロセスの変更履歴に残っている範囲は履歴から返し（別インスタンスや
+    シートへの直接の追加はスナップショットから補う）、再起動後・別インスタンス・
+    履歴切れのトークンはタイムスタンプで走査する。
+    """
+    if db_name not in DATABASES:
+        raise HTTPException(status_code=404, detail=f"データベース '{db_name}' が見つかりません")
+    limit = min(max(limit, 1), MAX_CHANGES_LIMIT)
+    try:
+        token = ChangeToken.decode(since) if since else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    try:
+        # 走査より後の変更は履歴から返せるよう、読み込む前に位置を控える
+        head = change_log.head(db_name)
+        changes = None
+        if (
+            token is not None
+            and token.epoch == change_log.epoch
+            and token.seq is not None
+        ):
+            changes = change_log.since(db_name, token.seq)
+        snapshot, _ = await load_records(db_name)
+        if token is not None and changes is not None:
+            data = log_changes(db_name, snapshot, token, changes, limit)
+        else:
+            data = scan_changes(snapshot, token, head, limit)
+        return {"success": True, "data": data}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        handle_sheets_error(db_name, e)
+        logger.error(f"変更フィード取得エラー: {e}")
+        raise HTTPException(status_code=500, detail=f"変更の取得に失敗しました: {str(e)}") from e
+
+
 @app.delete("/api/{db_name}/data/{item_id}")
 async def delete_data(db_name: str, item_id: str):
     """データを削除"""
     try:
-        sheet = get_sheet(db_name)
-
-        # 該当行を検索
-        cell = sheet.find(item_id)
-        if cell:
-            sheet.delete_rows(cell.row)
+        # 管理IDの行を特定して削除
+        backend = get_backend(db_name)
+        deleted = await run_sheets_write(db_name, backend.delete, item_id)
+        if deleted:
+            apply_deleted(db_name, [item_id])
             return ApiResponse(success=True, message="データが削除されました")
         else:
             raise HTTPException(status_code=404, detail="削除するデータが見つかりません")
@@ -330,6 +1393,7 @@ async def delete_data(db_name: str, item_id: str):
     except HTTPException:
         raise
     except Exception as e:
+        handle_sheets_error(db_name, e, WRITE)
         logger.error(f"データ削除エラー: {e}")
         raise HTTPException(status_code=500, detail=f"データの削除に失敗しました: {str(e)}") from e
 
@@ -337,13 +1401,20 @@ async def delete_data(db_name: str, item_id: str):
 # エラーハンドラー
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    return {"success": False, "message": exc.detail}
+    return TimedJSONResponse(
+        status_code=exc.status_code,
+        content={"success": False, "message": exc.detail},
+        headers=exc.headers,
+    )
 
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     logger.error(f"予期しないエラー: {exc}")
-    return {"success": False, "message": "内部サーバーエラーが発生しました"}
+    return TimedJSONResponse(
+        status_code=500,
+        content={"success": False, "message": "内部サーバーエラーが発生しました"},
+    )
 
 
 if __name__ == "__main__":
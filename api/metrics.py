@@ -0,0 +1,381 @@
+"""
+メトリクス
+リクエスト・Sheets API呼び出しの件数と所要時間を集計し、Prometheusのテキスト形式で出力する
+（リクエストごとの内訳は Server-Timing ヘッダーで返す）
+"""
+
+import contextvars
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Collection, Iterable, Sequence
+from typing import Any, Callable, Optional
+from urllib.parse import urlsplit
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# 所要時間のヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[Any]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric(ABC):
+    """ラベルの組み合わせごとに値を持つメトリクス"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, Any]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> list[str]:
+        """値の行（テキスト形式）"""
+
+
+class Counter(Metric):
+    """増加だけする値"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: defaultdict[tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] += amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """増減する値"""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """値の分布（区切りごとの累積件数・合計・件数）"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # ラベル → (区切りごとの件数, 合計, 件数)
+        self._values: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+            return entry[2] if entry else 0
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(
+                (key, [list(counts), total, count])
+                for key, (counts, total, count) in self._values.items()
+            )
+        names = (*self.labelnames, "le")
+        lines: list[str] = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                labels = _labels(names, (*key, _number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _labels(names, (*key, "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+# 出力時に値を取得するゲージ: () → [(ラベル, 値)]
+GaugeCallback = Callable[[], Iterable[tuple[dict[str, Any], float]]]
+
+
+class MetricsRegistry:
+    """メトリクスを登録し、まとめてテキスト形式で出力する"""
+
+    def __init__(self) -> None:
+        self._metrics: list[Metric] = []
+        self._callbacks: list[tuple[str, str, tuple[str, ...], GaugeCallback]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Any:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_gauge_callback(
+        self, name: str, help: str, labelnames: Sequence[str], callback: GaugeCallback
+    ) -> None:
+        """出力時に callback で値を取得するゲージを登録"""
+        with self._lock:
+            self._callbacks.append((name, help, tuple(labelnames), callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            callbacks = list(self._callbacks)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, help, labelnames, callback in callbacks:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in callback():
+                key = [labels.get(n, "") for n in labelnames]
+                lines.append(f"{name}{_labels(labelnames, key)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# プロセス全体で共有するメトリクス
+registry = MetricsRegistry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTPリクエスト数",
+        ("method", "route", "db", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTPリクエストの処理時間",
+        ("method", "route", "db"),
+    )
+)
+http_in_flight = registry.register(Gauge("http_requests_in_flight", "処理中のHTTPリクエスト数"))
+cache_lookups = registry.register(
+    Counter(
+        "cache_lookups_total",
+        "スナップショットキャッシュの参照数（X-Cache）",
+        ("route", "result"),
+    )
+)
+sheets_calls = registry.register(
+    Counter(
+        "sheets_api_calls_total",
+        "Google Sheets / Drive API の呼び出し数",
+        ("operation", "status"),
+    )
+)
+sheets_call_duration = registry.register(
+    Histogram(
+        "sheets_api_call_duration_seconds",
+        "Google Sheets / Drive API の呼び出し時間",
+        ("operation",),
+    )
+)
+
+
+class RequestTiming:
+    """1リクエストの処理時間の内訳（Server-Timing）"""
+
+    def __init__(self) -> None:
+        self._durations: dict[str, float] = {}
+        self._counts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self._durations[name] = self._durations.get(name, 0.0) + seconds
+            self._counts[name] = self._counts.get(name, 0) + 1
+
+    def header(self, total: float) -> str:
+        with self._lock:
+            items = list(self._durations.items())
+            counts = dict(self._counts)
+        entries = [f"total;dur={total * 1000:.1f}"]
+        for name, seconds in items:
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if counts[name] > 1:
+                entry += f';desc="x{counts[name]}"'
+            entries.append(entry)
+        return ", ".join(entries)
+
+
+# 処理中のリクエストの内訳（スレッドへは SheetsExecutor がコンテキストごと渡す）
+_current_timing: contextvars.ContextVar[
+    Optional[RequestTiming]
+] = contextvars.ContextVar("request_timing", default=None)
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """処理中のリクエストの内訳に所要時間を加算（リクエスト外では何もしない）"""
+    timing = _current_timing.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+class TimedJSONResponse(JSONResponse):
+    """本文のJSONへの変換時間を Server-Timing の ``serialize`` に記録するレスポンス"""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        body = super().render(content)
+        record_timing("serialize", time.perf_counter() - start)
+        return body
+
+
+_ACTION = re.compile(r":([a-z][A-Za-z]*)$")
+
+
+def sheets_operation(method: str, url: str) -> str:
+    """APIリクエストのURLから操作名を判定（例: values.get, values.append）"""
+    parts = urlsplit(url)
+    path = parts.path
+    if "/v4/spreadsheets" not in path:
+        return "drive" if "drive" in path else "other"
+    # 範囲（Sheet1!A1:Z10）の ":" と区別するため、小文字で始まるものだけを操作名とする
+    action = _ACTION.search(path)
+    if action:
+        name = action.group(1)
+        return f"values.{name}" if "/values" in path else name
+    if "/values/" in path:
+        return f"values.{method.lower()}"
+    return f"spreadsheets.{method.lower()}"
+
+
+def observe_sheets_call(operation: str, seconds: float, status: str) -> None:
+    """Sheets API呼び出し1回の結果を記録"""
+    sheets_calls.inc(operation=operation, status=status)
+    sheets_call_duration.observe(seconds, operation=operation)
+    record_timing(f"sheets.{operation}", seconds)
+
+
+_ROUTE_PARAM = re.compile(r"{([^}:]+)(:[^}]+)?}")
+
+
+class MetricsMiddleware:
+    """リクエストの件数・処理時間を記録し、Server-Timing ヘッダーを付与する
+
+    ``db`` ラベルは ``databases`` に含まれる名前だけを使い、それ以外は
+    "unknown" にまとめる（任意のパスで系列が増え続けないようにする）。
+    """
+
+    def __init__(self, app: ASGIApp, databases: Collection[str] = ()) -> None:
+        self.app = app
+        self.databases = databases
+        self._routes: dict[Any, str] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        start = time.perf_counter()
+        status = 500
+        http_in_flight.inc()
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Server-Timing", timing.header(time.perf_counter() - start)
+                )
+                cache = headers.get("x-cache")
+                if cache:
+                    cache_lookups.inc(route=self._route(scope), result=cache.lower())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timing.reset(token)
+            http_in_flight.dec()
+            route = self._route(scope)
+            db = self._db(scope)
+            labels = {"method": scope["method"], "route": route, "db": db}
+            http_requests.inc(status=status, **labels)
+            http_request_duration.observe(time.perf_counter() - start, **labels)
+
+    def _db(self, scope: Scope) -> str:
+        db = scope.get("path_params", {}).get("db_name")
+        if db is None:
+            return ""
+        return db if db in self.databases else "unknown"
+
+    def _route(self, scope: Scope) -> str:
+        """ルートのパステンプレート（例: /api/{db_name}/data）"""
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._routes:
+            app = scope.get("app")
+            for route in getattr(app, "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = _ROUTE_PARAM.sub(r"{\1}", route.path)
+                    self._routes[endpoint] = path
+                    break
+            else:
+                self._routes[endpoint] = getattr(endpoint, "__name__", "unknown")
+        return self._routes[endpoint]
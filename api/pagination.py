@@ -0,0 +1,31 @@
+"""
+ページネーション用カーソル
+次ページの開始行と直前の管理IDを不透明な文字列にまとめる
+"""
+
+import base64
+import json
+from typing import Optional
+
+
+def encode_cursor(after_id: str, next_row: int) -> str:
+    """カーソル文字列を作成"""
+    payload = json.dumps({"a": after_id, "r": next_row}, ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[str], int]:
+    """カーソル文字列を (直前の管理ID, 次ページの開始行) に戻す
+
+    Raises:
+        ValueError: 不正なカーソル
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        next_row = int(payload["r"])
+        after_id = payload.get("a")
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("不正なカーソルです") from e
+    if next_row < 2:
+        raise ValueError("不正なカーソルです")
+    return (str(after_id) if after_id is not None else None), next_row
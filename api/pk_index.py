@@ -0,0 +1,178 @@
+"""
+管理IDの主キーインデックス
+管理ID → シートの行番号を保持し、取得・削除で対象行だけを読み書きする
+"""
+
+import bisect
+import logging
+import re
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# ヘッダー行の次がデータの先頭行
+FIRST_DATA_ROW = 2
+
+_UPDATED_RANGE = re.compile(r"!?[A-Z]+(\d+)(?::[A-Z]+\d+)?$")
+
+
+def appended_row_number(response: Any) -> Optional[int]:
+    """append_row のレスポンスから追加された行番号を取得"""
+    try:
+        updated_range = response["updates"]["updatedRange"]
+    except (TypeError, KeyError):
+        return None
+    match = _UPDATED_RANGE.search(str(updated_range))
+    return int(match.group(1)) if match else None
+
+
+class KeyIndex:
+    """あるデータベースの 管理ID → 行番号 の対応"""
+
+    def __init__(self, headers: list[str], ids: list[str], built_at: float) -> None:
+        self.headers = headers
+        self.built_at = built_at
+        # ヘッダー行を除いたデータ行数
+        self.row_count = len(ids)
+        self.rows: dict[str, int] = {}
+        for offset, item_id in enumerate(ids):
+            if item_id:
+                self.rows.setdefault(item_id, FIRST_DATA_ROW + offset)
+
+    def lookup(self, item_id: str) -> Optional[int]:
+        return self.rows.get(item_id)
+
+    def add(self, item_id: str, row: int) -> None:
+        self.rows[item_id] = row
+        self.row_count = max(self.row_count, row - FIRST_DATA_ROW + 1)
+
+    def remove_row(self, row: int) -> None:
+        """行の削除を反映（以降の行番号を1つ詰める）"""
+        self.remove_rows([row])
+
+    def remove_rows(self, rows: list[int]) -> None:
+        """複数行の削除を反映（以降の行番号を削除した行数ぶん詰める）"""
+        removed = sorted(set(rows))
+        self.row_count = max(self.row_count - len(removed), 0)
+        self.rows = {
+            item_id: r - bisect.bisect_left(removed, r)
+            for item_id, r in self.rows.items()
+            if not _contains(removed, r)
+        }
+
+
+def _contains(sorted_rows: list[int], row: int) -> bool:
+    i = bisect.bisect_left(sorted_rows, row)
+    return i < len(sorted_rows) and sorted_rows[i] == row
+
+
+class PrimaryKeyIndex:
+    """データベースごとの KeyIndex をTTL付きで保持する
+
+    行番号は削除で前詰めされるため、書き込みは ``lock(db_name)`` を
+    取得した状態でシート操作とインデックス更新をまとめて行う。
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300,
+        clock: Callable[[], float] = time.monotonic,
+        miss_rebuild_interval: float = 5,
+    ) -> None:
+        self.ttl = ttl
+        self.miss_rebuild_interval = miss_rebuild_interval
+        self._clock = clock
+        self._indexes: dict[str, KeyIndex] = {}
+        self._locks: dict[str, threading.RLock] = {}
+        self._lock = threading.Lock()
+
+    def lock(self, db_name: str) -> threading.RLock:
+        """指定データベースの書き込みロックを取得"""
+        with self._lock:
+            return self._locks.setdefault(db_name, threading.RLock())
+
+    def get(self, db_name: str, sheet: Any) -> KeyIndex:
+        """インデックスを取得（未構築・期限切れならA列から構築）"""
+        with self._lock:
+            index = self._indexes.get(db_name)
+        if index is not None and index.built_at + self.ttl > self._clock():
+            return index
+        return self.build(db_name, sheet)
+
+    def build(self, db_name: str, sheet: Any) -> KeyIndex:
+        """ヘッダー行と管理ID列を1回のbatch_getで読み込んで構築"""
+        header_range, id_range = sheet.batch_get(["1:1", "A:A"])
+        headers = list(header_range[0]) if header_range else []
+        ids = [str(row[0]) if row else "" for row in id_range[1:]]
+        index = KeyIndex(headers, ids, self._clock())
+        with self._lock:
+            self._indexes[db_name] = index
+        logger.info(f"主キーインデックスを構築しました: {db_name} ({len(index.rows)}件)")
+        return index
+
+    def resolve(
+        self, db_name: str, sheet: Any, item_id: str, verify: Callable[[int], bool]
+    ) -> Optional[int]:
+        """管理IDの行番号を解決
+
+        ``verify`` で対象行が本当にその管理IDかを確認し、シートが外部で
+        編集されていた場合は1度だけインデックスを再構築してやり直す。
+        インデックスに無い管理IDは、別インスタンスやシートへの直接の追加を
+        反映するため再構築して確認する。ただし再構築は ``miss_rebuild_interval``
+        秒に1回までとし、その間の未登録の管理IDは再構築せずにNoneを返す。
+        """
+        with self._lock:
+            cached = self._indexes.get(db_name)
+        now = self._clock()
+        if cached is not None and cached.built_at + self.ttl > now:
+            row = cached.lookup(item_id)
+            if row is None and cached.built_at + self.miss_rebuild_interval > now:
+                return None
+            if row is not None and verify(row):
+                return row
+
+        row = self.build(db_name, sheet).lookup(item_id)
+        if row is not None and verify(row):
+            return row
+        return None
+
+    def on_append(self, db_name: str, item_id: str, row: Optional[int]) -> None:
+        """行の追加を反映（行番号が不明な場合は破棄）"""
+        self.on_append_rows(db_name, [item_id], row)
+
+    def on_append_rows(
+        self, db_name: str, item_ids: list[str], first_row: Optional[int]
+    ) -> None:
+        """連続した複数行の追加を反映（行番号が不明な場合は破棄）"""
+        with self._lock:
+            index = self._indexes.get(db_name)
+            if index is None:
+                return
+            if first_row is None:
+                del self._indexes[db_name]
+                return
+            for offset, item_id in enumerate(item_ids):
+                index.add(item_id, first_row + offset)
+
+    def on_delete(self, db_name: str, row: int) -> None:
+        """行の削除を反映"""
+        self.on_delete_rows(db_name, [row])
+
+    def on_delete_rows(self, db_name: str, rows: list[int]) -> None:
+        """複数行の削除を反映（行番号は削除前のもの）"""
+        with self._lock:
+            index = self._indexes.get(db_name)
+            if index is not None:
+                index.remove_rows(rows)
+
+    def invalidate(self, db_name: str) -> None:
+        """指定データベースのインデックスを破棄"""
+        with self._lock:
+            self._indexes.pop(db_name, None)
+
+    def clear(self) -> None:
+        """全てのインデックスを破棄"""
+        with self._lock:
+            self._indexes.clear()
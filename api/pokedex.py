@@ -0,0 +1,116 @@
+"""
+ポケモン図鑑データ
+pokemon_data.json を起動時に1度だけ読み込み、名前の前方一致検索（入力補完）と
+ポケモン名・図鑑Noの照合に使う
+"""
+
+import bisect
+import json
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional, Union
+
+from api.search_index import normalize
+
+logger = logging.getLogger(__name__)
+
+# リポジトリ直下の図鑑データ
+DEFAULT_POKEDEX_PATH = Path(__file__).resolve().parent.parent / "pokemon_data.json"
+
+
+@dataclass(frozen=True)
+class DexEntry:
+    """図鑑の1項目（メガシンカ・フォルム違いは別項目）"""
+
+    dex_no: int
+    name: str
+    generation: str
+
+    def to_dict(self) -> dict[str, Any]:
+        # シートと同じ4桁ゼロ埋め
+        return {
+            "dex_no": f"{self.dex_no:04d}",
+            "name": self.name,
+            "generation": self.generation,
+        }
+
+
+class Pokedex:
+    """図鑑データの索引
+
+    正規化した名前（カタカナ・ひらがな、全角・半角を区別しない）の
+    ソート済み配列を持ち、前方一致は二分探索で範囲を求める。
+    名前・図鑑Noでの照合は辞書で引く。
+    """
+
+    def __init__(self, entries: Iterable[DexEntry]) -> None:
+        self.entries = list(entries)
+        self._by_name: dict[str, list[DexEntry]] = {}
+        self._by_dex_no: dict[int, list[DexEntry]] = {}
+        for entry in self.entries:
+            self._by_name.setdefault(normalize(entry.name), []).append(entry)
+            self._by_dex_no.setdefault(entry.dex_no, []).append(entry)
+        # 正規化した名前の順に並べ、名前だけの配列で二分探索する
+        self._sorted = sorted(self.entries, key=lambda e: (normalize(e.name), e.dex_no))
+        self._names = [normalize(e.name) for e in self._sorted]
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "Pokedex":
+        """pokemon_data.json 形式のファイルから読み込む"""
+        with open(path, encoding="utf-8") as f:
+            items = json.load(f)
+        pokedex = cls(
+            DexEntry(int(item["dexno"]), item["name"], item.get("gen", ""))
+            for item in items
+        )
+        logger.info(f"図鑑データを読み込みました: {path} ({len(pokedex)}件)")
+        return pokedex
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def complete(self, prefix: str, limit: int = 10) -> list[DexEntry]:
+        """名前が前方一致する項目（名前順）"""
+        needle = normalize(prefix).strip()
+        if not needle or limit <= 0:
+            return []
+        start = bisect.bisect_left(self._names, needle)
+        end = start
+        while end < len(self._names) and end - start < limit:
+            if not self._names[end].startswith(needle):
+                break
+            end += 1
+        return self._sorted[start:end]
+
+    def find(self, name: str) -> list[DexEntry]:
+        """名前が一致する項目"""
+        return self._by_name.get(normalize(name).strip(), [])
+
+    def lookup(self, dex_no: int) -> list[DexEntry]:
+        """図鑑Noの項目（フォルム違いを含む）"""
+        return self._by_dex_no.get(dex_no, [])
+
+    def validate(self, name: str, dex_no: str) -> Optional[str]:
+        """ポケモン名と図鑑Noが図鑑と一致するか確認し、不一致ならエラー内容を返す"""
+        entries = self.find(name)
+        if not entries:
+            return f"図鑑にないポケモン名です: {name}"
+        try:
+            number = int(str(dex_no).strip())
+        except ValueError:
+            return f"図鑑Noが数値ではありません: {dex_no}"
+        if all(entry.dex_no != number for entry in entries):
+            expected = "/".join(sorted({f"{e.dex_no:04d}" for e in entries}))
+            return f"{name}の図鑑Noは{expected}です（指定: {dex_no}）"
+        return None
+
+
+def load_pokedex(path: Union[str, Path]) -> Pokedex:
+    """図鑑データを読み込む（ファイルがなければ空の図鑑）"""
+    try:
+        return Pokedex.from_file(path)
+    except FileNotFoundError:
+        logger.warning(f"図鑑データが見つかりません: {path}")
+        return Pokedex([])
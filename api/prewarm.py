@@ -0,0 +1,84 @@
+"""
+起動時の事前準備
+認証・ワークシートのオープン・キャッシュの構築を起動直後に済ませ、
+最初のリクエストがその時間を負担しないようにする（完了までは /health が準備中を返す）
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Sequence
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# (名前, 処理)
+Step = tuple[str, Callable[[], Awaitable[Any]]]
+
+
+class Prewarm:
+    """事前準備の処理を順に実行し、進み具合を保持する
+
+    失敗した処理があっても残りは続け、最後まで終えたら準備完了とする
+    （失敗した分は最初のリクエストで改めて実行される）。
+    """
+
+    IDLE = "idle"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter) -> None:
+        self._clock = clock
+        self._task: Optional[asyncio.Task[None]] = None
+        self.state = self.IDLE
+        self.durations: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+
+    @property
+    def ready(self) -> bool:
+        """リクエストを受け付けてよいかどうか（事前準備中のみFalse）"""
+        return self.state != self.RUNNING
+
+    def start(self, steps: Sequence[Step]) -> None:
+        """バックグラウンドで事前準備を始める"""
+        self.state = self.RUNNING
+        self._task = asyncio.create_task(self.run(steps))
+
+    async def run(self, steps: Sequence[Step]) -> None:
+        self.state = self.RUNNING
+        self.durations.clear()
+        self.errors.clear()
+        for name, step in steps:
+            start = self._clock()
+            try:
+                await step()
+            except Exception as e:
+                logger.warning(f"事前準備に失敗しました: {name} {e}")
+                self.errors[name] = str(e) or type(e).__name__
+            finally:
+                self.durations[name] = self._clock() - start
+        self.state = self.FAILED if self.errors else self.DONE
+        total = sum(self.durations.values())
+        logger.info(f"事前準備が完了しました: {total:.2f}秒 ({self.state})")
+
+    async def wait(self) -> None:
+        """事前準備の完了を待つ"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def stop(self) -> None:
+        """実行中の事前準備を中止"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+        self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "durations": {k: round(v, 3) for k, v in self.durations.items()},
+            "errors": dict(self.errors),
+        }
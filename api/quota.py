@@ -0,0 +1,232 @@
+"""
+Sheets APIのクォータ管理
+読み取り・書き込みの1分あたりの上限をトークンバケットで守り、
+一時的なエラーは間隔を空けて再試行する
+"""
+
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Optional, TypeVar
+
+from api.lazy_imports import as_api_error, is_error
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# リクエストの種類（クォータは読み取りと書き込みで別枠）
+READ = "read"
+WRITE = "write"
+
+# 再試行するステータスコード
+TRANSIENT_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def api_error_status(exc: BaseException) -> Optional[int]:
+    """gspreadのAPIErrorのステータスコード（それ以外はNone）"""
+    error = as_api_error(exc)
+    if error is None:
+        return None
+    status = getattr(error.response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """時間をおけば成功する可能性がある例外かどうかを判定"""
+    if api_error_status(exc) in TRANSIENT_STATUSES:
+        return True
+    return is_error(exc, "requests.exceptions", "ConnectionError", "Timeout")
+
+
+def is_retryable(kind: str, exc: BaseException) -> bool:
+    """再試行してよい例外かどうかを判定
+
+    書き込みはレート制限（429）で拒否された場合だけ再試行する。
+    5xxや接続エラーではシートに反映済みの可能性があり、
+    再送すると行が重複するため。
+    """
+    if kind == WRITE:
+        return api_error_status(exc) == 429
+    return is_transient_error(exc)
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """レスポンスのRetry-Afterヘッダー（秒）"""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    value = headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    cap: float = 32.0,
+    rng: Callable[[], float] = random.random,
+) -> float:
+    """attempt回目の再試行までの待ち時間（上限付き指数バックオフ・フルジッター）
+
+    待ち時間を0〜上限の一様乱数にすることで、同時に失敗した
+    リクエストの再試行が同じ時刻に集中しないようにする。
+    """
+    return rng() * min(cap, base * 2.0**attempt)
+
+
+class TokenBucket:
+    """1分あたり ``per_minute`` 件のトークンバケット
+
+    最大 ``burst`` 件まで連続して取得でき、以降は一定の間隔で補充される。
+    トークンは取得時に予約するため（残数が負になりうる）、
+    同時に待つスレッドは到着順に間隔を空けて実行される。
+    """
+
+    def __init__(
+        self,
+        per_minute: float,
+        burst: float = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, burst)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """トークンを1つ予約し、使えるようになるまでの秒数を返す"""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def drain(self) -> None:
+        """残りのトークンを破棄（レート制限を受けた場合）"""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0.0)
+
+    def available(self) -> float:
+        """現在使えるトークン数（予約済みの分は差し引く）"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+
+class QuotaScheduler:
+    """全てのSheets APIリクエストを通すスケジューラー
+
+    リクエストごとに種類別のトークンを取得してから実行し、
+    一時的なエラーは ``max_retries`` 回まで指数バックオフで再試行する。
+    待機中のリクエスト数を ``stats()`` で確認できる。
+    """
+
+    def __init__(
+        self,
+        read_per_minute: float = 60,
+        write_per_minute: float = 60,
+        burst: float = 10,
+        max_retries: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 32.0,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: Callable[[], float] = random.random,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._sleep = sleep
+        self._rng = rng
+        self._buckets = {
+            READ: TokenBucket(read_per_minute, burst, clock),
+            WRITE: TokenBucket(write_per_minute, burst, clock),
+        }
+        self._counts_lock = threading.Lock()
+        self._waiting: defaultdict[str, int] = defaultdict(int)
+        self._requests: defaultdict[str, int] = defaultdict(int)
+        self._retries: defaultdict[str, int] = defaultdict(int)
+        self._throttled: defaultdict[str, int] = defaultdict(int)
+
+    def call(self, kind: str, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """クォータの範囲内でfuncを実行（一時的なエラーは再試行）"""
+        bucket = self._buckets[kind]
+        attempt = 0
+        while True:
+            self._wait(kind, bucket.reserve())
+            self._add(self._requests, kind)
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                status = api_error_status(e)
+                if status == 429:
+                    self._add(self._throttled, kind)
+                    # 上限に達しているため、溜まっていたトークンも使わない
+                    bucket.drain()
+                if attempt >= self.max_retries or not is_retryable(kind, e):
+                    raise
+                delay = backoff_delay(
+                    attempt, self.base_delay, self.max_delay, self._rng
+                )
+                delay = max(delay, retry_after(e) or 0.0)
+                self._add(self._retries, kind)
+                logger.warning(
+                    f"Sheets APIの一時的なエラー（{kind}, {status or type(e).__name__}）: "
+                    f"{delay:.1f}秒後に再試行します（{attempt + 1}/{self.max_retries}）"
+                )
+                self._wait(kind, delay)
+                attempt += 1
+
+    def congested(self, kind: str = READ) -> bool:
+        """新しいリクエストがトークン待ちになる状態かどうか"""
+        with self._counts_lock:
+            waiting = self._waiting[kind]
+        return waiting > 0 or self._buckets[kind].available() < 1
+
+    def seconds_until_available(self, kind: str = READ) -> int:
+        """トークンが使えるようになるまでの目安（秒、最低1秒）"""
+        bucket = self._buckets[kind]
+        shortage = 1 - bucket.available()
+        return max(1, math.ceil(shortage / bucket.rate))
+
+    def stats(self) -> dict[str, Any]:
+        """種類ごとの待機数・残りトークン・再試行数を取得"""
+        with self._counts_lock:
+            counts: dict[str, dict[str, float]] = {
+                kind: {
+                    "waiting": self._waiting[kind],
+                    "requests": self._requests[kind],
+                    "retries": self._retries[kind],
+                    "throttled": self._throttled[kind],
+                }
+                for kind in self._buckets
+            }
+        for kind, bucket in self._buckets.items():
+            counts[kind]["per_minute"] = bucket.rate * 60
+            counts[kind]["tokens"] = round(bucket.available(), 2)
+        return counts
+
+    def _wait(self, kind: str, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        self._add(self._waiting, kind)
+        try:
+            self._sleep(seconds)
+        finally:
+            self._add(self._waiting, kind, -1)
+
+    def _add(self, table: defaultdict[str, int], kind: str, delta: int = 1) -> None:
+        with self._counts_lock:
+            table[kind] += delta
@@ -0,0 +1,204 @@
+"""
+レコードスナップショットのキャッシュ
+get_all_records の結果をデータベースごとにメモリ上へ保持し、書き込み時に更新する
+"""
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Callable, Optional
+
+from api.secondary_index import RecordIndexes, TimestampIndex
+
+logger = logging.getLogger(__name__)
+
+
+def row_to_record(headers: Sequence[str], row: Sequence[Any]) -> dict[str, Any]:
+    """シートの行を get_all_records と同じ形式のレコードに変換"""
+    # gspreadは起動時に読み込まない（読み込み済みなら参照するだけで済む）
+    from gspread.utils import numericise_all
+
+    values = ["" if value is None else str(value) for value in row]
+    # 末尾の空セルはAPIから返らないため補完する
+    values += [""] * (len(headers) - len(values))
+    return dict(zip(headers, numericise_all(values)))
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """あるデータベースの全レコード（シートの行順）"""
+
+    records: list[dict[str, Any]]
+    loaded_at: float
+
+    @cached_property
+    def positions(self) -> dict[str, int]:
+        """管理ID → records内の位置"""
+        positions: dict[str, int] = {}
+        for i, record in enumerate(self.records):
+            positions.setdefault(str(record.get("管理ID")), i)
+        return positions
+
+    @cached_property
+    def by_id(self) -> dict[str, dict[str, Any]]:
+        """管理ID → レコード"""
+        return {item_id: self.records[i] for item_id, i in self.positions.items()}
+
+    @cached_property
+    def etags(self) -> dict[Any, str]:
+        """このスナップショットから返したレスポンスのETag（条件ごと）"""
+        return {}
+
+    @cached_property
+    def indexes(self) -> RecordIndexes:
+        """絞り込み検索用のインデックス（最初の検索時に構築）"""
+        return RecordIndexes(self.records)
+
+    @cached_property
+    def timestamps(self) -> TimestampIndex:
+        """タイムスタンプ順のインデックス（変更フィードの走査時に構築）"""
+        return TimestampIndex(self.records)
+
+    def extended(self, records: list[dict[str, Any]]) -> "Snapshot":
+        """末尾にレコードを追加したスナップショット
+
+        構築済みのインデックスは追加した行だけを反映して引き継ぐ。
+        """
+        start = len(self.records)
+        snapshot = Snapshot(records=[*self.records, *records], loaded_at=self.loaded_at)
+        built = self.__dict__
+        if "positions" in built:
+            positions = dict(self.positions)
+            for i, record in enumerate(records, start):
+                positions.setdefault(str(record.get("管理ID")), i)
+            snapshot.__dict__["positions"] = positions
+        if "by_id" in built:
+            by_id = dict(self.by_id)
+            for record in records:
+                by_id.setdefault(str(record.get("管理ID")), record)
+            snapshot.__dict__["by_id"] = by_id
+        if "indexes" in built:
+            snapshot.__dict__["indexes"] = self.indexes.extended(
+                snapshot.records, start
+            )
+        if "timestamps" in built:
+            snapshot.__dict__["timestamps"] = self.timestamps.extended(
+                snapshot.records, start
+            )
+        return snapshot
+
+    def without(self, item_ids: set[str]) -> "Snapshot":
+        """管理IDのレコードを除いたスナップショット
+
+        構築済みのインデックスは削除した行を除き、残りの位置を詰めて引き継ぐ。
+        """
+        records: list[dict[str, Any]] = []
+        removed: list[int] = []
+        for i, record in enumerate(self.records):
+            if str(record.get("管理ID")) in item_ids:
+                removed.append(i)
+            else:
+                records.append(record)
+        snapshot = Snapshot(records=records, loaded_at=self.loaded_at)
+        built = self.__dict__
+        if "positions" in built:
+            snapshot.__dict__["positions"] = {
+                item_id: i - bisect_left(removed, i)
+                for item_id, i in self.positions.items()
+                if item_id not in item_ids
+            }
+        if "by_id" in built:
+            snapshot.__dict__["by_id"] = {
+                item_id: record
+                for item_id, record in self.by_id.items()
+                if item_id not in item_ids
+            }
+        if "indexes" in built:
+            snapshot.__dict__["indexes"] = self.indexes.removed(records, removed)
+        if "timestamps" in built:
+            snapshot.__dict__["timestamps"] = self.timestamps.removed(removed)
+        return snapshot
+
+
+class RecordCache:
+    """データベースごとのスナップショットをTTL付きで保持する
+
+    スナップショットのリストは書き換えず、更新時は新しいリストに
+    置き換える（読み取り中のリクエストに影響しない）。
+    """
+
+    def __init__(
+        self, ttl: float = 60, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._snapshots: dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_name: str) -> Optional[Snapshot]:
+        """有効なスナップショットを取得（期限切れ・未取得ならNone）"""
+        with self._lock:
+            snapshot = self._snapshots.get(db_name)
+            if snapshot is None:
+                return None
+            if snapshot.loaded_at + self.ttl <= self._clock():
+                return None
+            return snapshot
+
+    def peek(self, db_name: str) -> Optional[Snapshot]:
+        """期限切れを含めて保持しているスナップショットを取得"""
+        with self._lock:
+            return self._snapshots.get(db_name)
+
+    def put(self, db_name: str, records: list[dict[str, Any]]) -> Snapshot:
+        """シートから読み込んだレコードでスナップショットを置き換え"""
+        snapshot = Snapshot(records=list(records), loaded_at=self._clock())
+        with self._lock:
+            self._snapshots[db_name] = snapshot
+        return snapshot
+
+    def append(self, db_name: str, record: dict[str, Any]) -> None:
+        """追加されたレコードをスナップショットの末尾に反映"""
+        self.extend(db_name, [record])
+
+    def extend(self, db_name: str, records: list[dict[str, Any]]) -> None:
+        """追加された複数のレコードをスナップショットの末尾に反映"""
+        with self._lock:
+            snapshot = self._snapshots.get(db_name)
+            if snapshot is None:
+                return
+            self._snapshots[db_name] = snapshot.extended(records)
+
+    def remove(self, db_name: str, item_id: str) -> None:
+        """削除されたレコードをスナップショットから除外"""
+        self.remove_many(db_name, [item_id])
+
+    def remove_many(self, db_name: str, item_ids: list[str]) -> None:
+        """削除された複数のレコードをスナップショットから除外
+
+        該当レコードが見つからない場合はスナップショットがシートと
+        ずれているため破棄する。
+        """
+        removed = set(item_ids)
+        with self._lock:
+            snapshot = self._snapshots.get(db_name)
+            if snapshot is None:
+                return
+            if not removed.issubset(snapshot.by_id):
+                del self._snapshots[db_name]
+                return
+            self._snapshots[db_name] = snapshot.without(removed)
+
+    def invalidate(self, db_name: str) -> None:
+        """指定データベースのスナップショットを破棄"""
+        with self._lock:
+            self._snapshots.pop(db_name, None)
+
+    def clear(self) -> None:
+        """全てのスナップショットを破棄"""
+        with self._lock:
+            self._snapshots.clear()
@@ -0,0 +1,54 @@
+"""
+クォータを守るgspreadクライアント
+全てのAPIリクエストを QuotaScheduler 経由で送り、呼び出しごとの所要時間を記録する
+"""
+
+import time
+from typing import Any
+
+import gspread
+
+from api.metrics import observe_sheets_call, record_timing, sheets_operation
+from api.quota import READ, WRITE, QuotaScheduler, api_error_status
+
+
+class ScheduledClient(gspread.Client):  # type: ignore[misc]
+    """全てのAPIリクエストを QuotaScheduler 経由で送るクライアント
+
+    GETを読み取り、それ以外を書き込みとしてクォータを数える。
+    呼び出しごとの所要時間は操作名（values.get など）ごとにメトリクスへ記録する。
+    """
+
+    def __init__(self, auth: Any, scheduler: QuotaScheduler, **kwargs: Any) -> None:
+        super().__init__(auth, **kwargs)
+        self.scheduler = scheduler
+
+    def request(self, method: str, endpoint: str, *args: Any, **kwargs: Any) -> Any:
+        kind = READ if method.lower() == "get" else WRITE
+        operation = sheets_operation(method, endpoint)
+        send = super().request
+        elapsed = 0.0
+
+        def attempt() -> Any:
+            nonlocal elapsed
+            status = "error"
+            start = time.perf_counter()
+            try:
+                response = send(method, endpoint, *args, **kwargs)
+                status = str(getattr(response, "status_code", "ok"))
+                return response
+            except Exception as e:
+                status = str(api_error_status(e) or type(e).__name__)
+                raise
+            finally:
+                seconds = time.perf_counter() - start
+                elapsed += seconds
+                observe_sheets_call(operation, seconds, status)
+
+        start = time.perf_counter()
+        try:
+            return self.scheduler.call(kind, attempt)
+        finally:
+            # クォータ待ち・再試行までの待ち時間
+            waited = time.perf_counter() - start - elapsed
+            record_timing("sheets.wait", max(0.0, waited))
@@ -0,0 +1,195 @@
+"""
+シートの列定義
+列とPokemonDataの対応をここで一元管理し、行との相互変換関数を組み立てる
+（API・移行ツールはこの定義から生成した関数だけを使う）
+"""
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Optional
+
+# 技・リボンの列数
+MOVE_SLOTS = 4
+RIBBON_SLOTS = 3
+
+
+@dataclass(frozen=True)
+class Column:
+    """シートの1列とPokemonDataのフィールドの対応"""
+
+    # シートの列名
+    header: str
+    # PokemonDataのフィールド（入れ子は "distribution.start_date" のようにドット区切り）
+    field: str
+    # 値の種類: "str" / "int" / "dex"（4桁ゼロ埋め）/ "optional"（空ならNone）
+    kind: str = "str"
+    # "int" の値が空の場合の既定値
+    default: Any = None
+    # リストのフィールド（技・リボン）の要素番号
+    slot: Optional[int] = None
+
+
+COLUMNS: tuple[Column, ...] = (
+    Column("管理ID", "id"),
+    Column("ポケモン名", "name.ja"),
+    Column("色違い", "shiny"),
+    Column("全国図鑑No", "dex_no", kind="dex"),
+    Column("世代", "generation", kind="int", default=0),
+    Column("ゲーム", "game"),
+    Column("配信イベント名", "event_name"),
+    Column("配信方法", "distribution.method"),
+    Column("配信場所", "distribution.location"),
+    Column("配信開始日", "distribution.start_date"),
+    Column("配信終了日", "distribution.end_date", kind="optional"),
+    Column("おやめい", "ot_name"),
+    Column("ID", "trainer_id"),
+    Column("出会った場所", "met_location"),
+    Column("ボール", "ball"),
+    Column("レベル", "level", kind="int", default=1),
+    Column("せいべつ", "gender"),
+    Column("とくせい", "ability"),
+    Column("せいかく", "nature"),
+    Column("キョダイマックス", "gigantamax"),
+    Column("テラスタイプ", "terastallize"),
+    Column("持ち物", "held_item"),
+    *(Column(f"技{i + 1}", "moves", slot=i) for i in range(MOVE_SLOTS)),
+    *(Column(f"リボン{i + 1}", "ribbons", slot=i) for i in range(RIBBON_SLOTS)),
+    Column("その他特記事項", "other_info"),
+    Column("タイムスタンプ", "timestamp", kind="optional"),
+)
+
+SHEET_HEADERS: tuple[str, ...] = tuple(column.header for column in COLUMNS)
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def _int(value: Any, default: int) -> int:
+    text = _text(value).strip()
+    return int(text) if text else default
+
+
+def _dex(value: Any) -> str:
+    text = _text(value).strip()
+    return text.zfill(4) if text else ""
+
+
+def _slot(values: Optional[Sequence[Any]], index: int) -> Any:
+    return values[index] if values is not None and index < len(values) else ""
+
+
+# 行（セルの値のリスト）から値を取り出す関数
+Getter = Callable[[Sequence[Any]], Any]
+
+
+def _encoder(column: Column) -> Callable[[Any], Any]:
+    """PokemonData → 1列分の値 の変換関数"""
+    get = attrgetter(column.field)
+    if column.slot is not None:
+        slot = column.slot
+        return lambda data: _slot(get(data), slot)
+    if column.kind == "optional":
+        return lambda data: get(data) or ""
+    if column.kind == "str":
+        return lambda data: _text(get(data))
+    return get
+
+
+_ENCODERS = tuple(_encoder(column) for column in COLUMNS)
+
+
+def pokemon_to_row(data: Any) -> list[Any]:
+    """PokemonDataをヘッダー順の行データに変換"""
+    return [encode(data) for encode in _ENCODERS]
+
+
+def _cell(position: Optional[int]) -> Getter:
+    """行の position 番目の値を取り出す関数（列がなければ空）"""
+    if position is None:
+        return lambda row: ""
+    return itemgetter(position)
+
+
+def _field(column: Column, cell: Getter) -> Getter:
+    """行 → 1フィールド分の値 の変換関数"""
+    if column.kind == "int":
+        default = column.default
+        return lambda row: _int(cell(row), default)
+    if column.kind == "dex":
+        return lambda row: _dex(cell(row))
+    if column.kind == "optional":
+        return lambda row: _text(cell(row)) or None
+    return lambda row: _text(cell(row))
+
+
+def _list_field(cells: list[Getter]) -> Getter:
+    """行 → 技・リボンのリスト（空の列は除く） の変換関数"""
+
+    def decode(row: Sequence[Any]) -> list[str]:
+        texts = (_text(cell(row)).strip() for cell in cells)
+        return [text for text in texts if text]
+
+    return decode
+
+
+def _mapping(tree: dict[str, Any]) -> Callable[[Sequence[Any]], dict[str, Any]]:
+    """{キー: 変換関数 or 入れ子の辞書} → 行を辞書に変換する関数"""
+    items = [
+        (key, _mapping(node) if isinstance(node, dict) else node)
+        for key, node in tree.items()
+    ]
+
+    def decode(row: Sequence[Any]) -> dict[str, Any]:
+        return {key: get(row) for key, get in items}
+
+    return decode
+
+
+def compile_decoder(
+    headers: Sequence[str],
+) -> Callable[[Sequence[Any]], dict[str, Any]]:
+    """列順が ``headers`` のシート行 → PokemonData形式の辞書 の変換関数を生成
+
+    列の位置は生成時に解決するため、変換時は行の要素を位置で
+    読むだけになる（列名で引く処理がない）。``headers`` にない列は空とみなす。
+    """
+    positions: dict[str, int] = {}
+    for index, header in enumerate(headers):
+        positions.setdefault(header, index)
+
+    tree: dict[str, Any] = {}
+    slots: dict[str, list[Getter]] = {}
+    for column in COLUMNS:
+        cell = _cell(positions.get(column.header))
+        if column.slot is not None:
+            slots.setdefault(column.field, []).append(cell)
+            continue
+        *parents, key = column.field.split(".")
+        node = tree
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[key] = _field(column, cell)
+    for field, cells in slots.items():
+        tree[field] = _list_field(cells)
+
+    build = _mapping(tree)
+    width = len(headers)
+
+    def decode(row: Sequence[Any]) -> dict[str, Any]:
+        # 末尾の空セルはAPIから返らないため補完する
+        if len(row) < width:
+            row = [*row, *[""] * (width - len(row))]
+        return build(row)
+
+    return decode
+
+
+# SHEET_HEADERS の列順の行 → PokemonData形式の辞書
+row_to_pokemon = compile_decoder(SHEET_HEADERS)
+
+
+def record_to_row(record: Mapping[str, Any]) -> list[Any]:
+    """get_all_records 形式のレコードを SHEET_HEADERS の列順の行に変換"""
+    return [record.get(header, "") for header in SHEET_HEADERS]
@@ -0,0 +1,154 @@
+"""
+全文検索用のN-gramインデックス
+ポケモン名・配信イベント名などを文字単位のユニグラム/バイグラムで索引する
+（形態素解析器に依存せず、かな・漢字混じりの部分一致に対応する）
+"""
+
+import threading
+import unicodedata
+from collections import defaultdict
+from collections.abc import Iterable
+from typing import Any, Optional
+
+# 検索対象の列
+SEARCH_COLUMNS = ("ポケモン名", "配信イベント名", "出会った場所", "その他特記事項")
+
+# 列の区切り（この文字をまたぐN-gramは作らない）
+_SEPARATOR = "\n"
+
+# カタカナ → ひらがな
+_KATA_TO_HIRA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+
+
+def normalize(text: str) -> str:
+    """全角・半角、大文字・小文字、カタカナ・ひらがなの違いをなくす"""
+    return unicodedata.normalize("NFKC", text).lower().translate(_KATA_TO_HIRA)
+
+
+def ngrams(text: str) -> set[str]:
+    """文字のユニグラムとバイグラム"""
+    grams = {c for c in text if c != _SEPARATOR and not c.isspace()}
+    grams.update(
+        text[i : i + 2]
+        for i in range(len(text) - 1)
+        if _SEPARATOR not in text[i : i + 2]
+    )
+    return grams
+
+
+def _query_grams(query: str) -> set[str]:
+    if len(query) == 1:
+        return {query}
+    return {query[i : i + 2] for i in range(len(query) - 1)}
+
+
+def document_text(record: dict[str, Any]) -> str:
+    """検索対象の列を正規化して連結"""
+    return _SEPARATOR.join(normalize(str(record.get(c, ""))) for c in SEARCH_COLUMNS)
+
+
+class SearchIndex:
+    """あるデータベースの 管理ID 単位の転置インデックス"""
+
+    def __init__(self, records: Iterable[dict[str, Any]], source: float) -> None:
+        # 構築元スナップショットの読み込み時刻
+        self.source = source
+        self._docs: dict[str, str] = {}
+        self._postings: defaultdict[str, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        for record in records:
+            self._add(record)
+
+    def add(self, record: dict[str, Any]) -> None:
+        """レコードを索引に追加"""
+        with self._lock:
+            self._add(record)
+
+    def remove(self, item_id: str) -> None:
+        """レコードを索引から削除"""
+        with self._lock:
+            self._remove(item_id)
+
+    def search(self, query: str) -> list[str]:
+        """部分一致する管理ID（順不同）"""
+        needle = normalize(query).strip()
+        if not needle:
+            return []
+        with self._lock:
+            postings = [self._postings.get(g, set()) for g in _query_grams(needle)]
+            if not postings:
+                return []
+            postings.sort(key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+            # N-gramの一致だけでは連続していない場合があるため本文で確認する
+            return [item_id for item_id in candidates if needle in self._docs[item_id]]
+
+    def _add(self, record: dict[str, Any]) -> None:
+        item_id = str(record.get("管理ID"))
+        if item_id in self._docs:
+            self._remove(item_id)
+        text = document_text(record)
+        self._docs[item_id] = text
+        for gram in ngrams(text):
+            self._postings[gram].add(item_id)
+
+    def _remove(self, item_id: str) -> None:
+        text = self._docs.pop(item_id, None)
+        if text is None:
+            return
+        for gram in ngrams(text):
+            posting = self._postings.get(gram)
+            if posting is not None:
+                posting.discard(item_id)
+                if not posting:
+                    del self._postings[gram]
+
+
+class SearchIndexes:
+    """データベースごとの SearchIndex を保持する"""
+
+    def __init__(self) -> None:
+        self._indexes: dict[str, SearchIndex] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, db_name: str, records: list[dict[str, Any]], source: float
+    ) -> SearchIndex:
+        """スナップショットに対応するインデックスを取得
+
+        スナップショットが読み直されていれば（シートの外部編集を含め）再構築する。
+        """
+        with self._lock:
+            index = self._indexes.get(db_name)
+        if index is not None and index.source == source:
+            return index
+        index = SearchIndex(records, source)
+        with self._lock:
+            self._indexes[db_name] = index
+        return index
+
+    def peek(self, db_name: str) -> Optional[SearchIndex]:
+        """構築済みのインデックス（なければNone）"""
+        with self._lock:
+            return self._indexes.get(db_name)
+
+    def on_create(self, db_name: str, records: list[dict[str, Any]]) -> None:
+        """追加されたレコードを反映"""
+        index = self.peek(db_name)
+        if index is not None:
+            for record in records:
+                index.add(record)
+
+    def on_delete(self, db_name: str, item_id: str) -> None:
+        """削除されたレコードを反映"""
+        index = self.peek(db_name)
+        if index is not None:
+            index.remove(item_id)
+
+    def invalidate(self, db_name: str) -> None:
+        with self._lock:
+            self._indexes.pop(db_name, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
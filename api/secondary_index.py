@@ -0,0 +1,276 @@
+"""
+スナップショットの検索用インデックス
+世代・ゲーム・全国図鑑Noの等価検索と、配信開始日・配信終了日の範囲検索、
+タイムスタンプ順の走査（変更フィード）に使う
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Any, Optional
+
+# 等価検索する列（クエリパラメータ名 → 列名）
+EQUALITY_COLUMNS = {
+    "generation": "世代",
+    "game": "ゲーム",
+    "dex_no": "全国図鑑No",
+}
+
+# 範囲検索する日付列（クエリパラメータ名の接頭辞 → 列名）
+RANGE_COLUMNS = {
+    "start": "配信開始日",
+    "end": "配信終了日",
+}
+
+# 登録日時の列（変更フィードで再起動後に走査する）
+TIMESTAMP_COLUMN = "タイムスタンプ"
+
+_DATE = re.compile(r"^\s*(\d{4})[-/.](\d{1,2})[-/.](\d{1,2})")
+_TIME = re.compile(r"[ T](\d{1,2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?")
+
+
+def equality_key(value: Any) -> str:
+    """等価比較用のキー（"0025" と 25 を同じ値として扱う）"""
+    text = str(value).strip()
+    return str(int(text)) if text.isdigit() else text
+
+
+def date_key(value: Any) -> Optional[str]:
+    """日付を YYYY-MM-DD に揃える（日付でなければNone）"""
+    match = _DATE.match(str(value))
+    if not match:
+        return None
+    year, month, day = match.groups()
+    return f"{year}-{int(month):02d}-{int(day):02d}"
+
+
+def timestamp_key(value: Any) -> Optional[str]:
+    """日時を YYYY-MM-DDTHH:MM:SS.ffffff に揃える（日時でなければNone）
+
+    ISO形式（APIが書き込む形式）と "2024/1/5 9:30:00" のような表記を
+    文字列のまま比較できるようにする。
+    """
+    text = str(value)
+    date = _DATE.match(text)
+    if not date:
+        return None
+    year, month, day = date.groups()
+    clock = _TIME.match(text, date.end())
+    hour, minute, second, fraction = clock.groups() if clock else ("0", "0", "0", "")
+    return (
+        f"{year}-{int(month):02d}-{int(day):02d}"
+        f"T{int(hour):02d}:{int(minute):02d}:{int(second or 0):02d}"
+        f".{(fraction or '').ljust(6, '0')}"
+    )
+
+
+def _contains(sorted_positions: list[int], position: int) -> bool:
+    i = bisect_left(sorted_positions, position)
+    return i < len(sorted_positions) and sorted_positions[i] == position
+
+
+def _shift(position: int, removed: list[int]) -> int:
+    """削除後の位置（前にある削除済みの位置の数だけ詰める）"""
+    return position - bisect_left(removed, position)
+
+
+def _insert_sorted(
+    keys: list[str], positions: list[int], key: str, position: int
+) -> None:
+    """(キー, 位置) の順を保って挿入（位置は既存のどの位置よりも後）"""
+    i = bisect_right(keys, key)
+    keys.insert(i, key)
+    positions.insert(i, position)
+
+
+class TimestampIndex:
+    """タイムスタンプ順に並べたレコードの位置
+
+    スナップショットの追加・削除では ``extended`` / ``removed`` で
+    変更のあった行だけを反映した新しいインデックスを作る。
+    """
+
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        entries = []
+        for position, record in enumerate(records):
+            key = timestamp_key(record.get(TIMESTAMP_COLUMN, ""))
+            if key is not None:
+                entries.append((key, position))
+        entries.sort()
+        self._entries = entries
+        self._keys = [k for k, _ in entries]
+
+    def extended(self, records: list[dict[str, Any]], start: int) -> "TimestampIndex":
+        """records の start 件目以降（追加分）を反映したインデックス"""
+        keys = self._keys[:]
+        positions = [p for _, p in self._entries]
+        for position in range(start, len(records)):
+            key = timestamp_key(records[position].get(TIMESTAMP_COLUMN, ""))
+            if key is not None:
+                _insert_sorted(keys, positions, key, position)
+        return self._derive(keys, positions)
+
+    def removed(self, removed: list[int]) -> "TimestampIndex":
+        """削除した位置（昇順）を除いて位置を詰めたインデックス"""
+        kept = [(k, p) for k, p in self._entries if not _contains(removed, p)]
+        return self._derive([k for k, _ in kept], [_shift(p, removed) for _, p in kept])
+
+    @classmethod
+    def _derive(cls, keys: list[str], positions: list[int]) -> "TimestampIndex":
+        index = cls.__new__(cls)
+        index._entries = list(zip(keys, positions))
+        index._keys = keys
+        return index
+
+    def after(self, lower: Optional[str]) -> list[tuple[str, int]]:
+        """タイムスタンプが lower より後の (タイムスタンプ, 位置)（古い順）"""
+        start = bisect_right(self._keys, lower) if lower else 0
+        return self._entries[start:]
+
+    @property
+    def latest(self) -> Optional[str]:
+        """最も新しいタイムスタンプ"""
+        return self._keys[-1] if self._keys else None
+
+
+class RecordIndexes:
+    """レコードの位置を引くためのハッシュインデックスとソート済みインデックス
+
+    スナップショットの追加・削除では ``extended`` / ``removed`` で
+    変更のあった行だけを反映した新しいインデックスを作る（取得済みの
+    インデックスは変更しない）。
+    """
+
+    def __init__(self, records: list[dict[str, Any]]) -> None:
+        self._records = records
+        self._hash: dict[str, defaultdict[str, list[int]]] = {
+            column: defaultdict(list) for column in EQUALITY_COLUMNS.values()
+        }
+        sorted_entries: dict[str, list[tuple[str, int]]] = {
+            column: [] for column in RANGE_COLUMNS.values()
+        }
+        for position, record in enumerate(records):
+            for column, table in self._hash.items():
+                table[equality_key(record.get(column, ""))].append(position)
+            for column, entries in sorted_entries.items():
+                key = date_key(record.get(column, ""))
+                if key is not None:
+                    entries.append((key, position))
+        for entries in sorted_entries.values():
+            entries.sort()
+        self._sorted_keys = {c: [k for k, _ in e] for c, e in sorted_entries.items()}
+        self._sorted_positions = {
+            c: [p for _, p in e] for c, e in sorted_entries.items()
+        }
+
+    def extended(self, records: list[dict[str, Any]], start: int) -> "RecordIndexes":
+        """records の start 件目以降（追加分）を反映したインデックス"""
+        hash_tables = {column: table.copy() for column, table in self._hash.items()}
+        sorted_keys = {c: keys[:] for c, keys in self._sorted_keys.items()}
+        sorted_positions = {c: p[:] for c, p in self._sorted_positions.items()}
+        # 共有しているリストは書き換えず、追加のあったキーだけ複製する
+        copied: set[tuple[str, str]] = set()
+        for position in range(start, len(records)):
+            record = records[position]
+            for column, table in hash_tables.items():
+                key = equality_key(record.get(column, ""))
+                if (column, key) not in copied:
+                    copied.add((column, key))
+                    table[key] = table[key][:]
+                table[key].append(position)
+            for column, keys in sorted_keys.items():
+                date = date_key(record.get(column, ""))
+                if date is not None:
+                    _insert_sorted(keys, sorted_positions[column], date, position)
+        return self._derive(records, hash_tables, sorted_keys, sorted_positions)
+
+    def removed(
+        self, records: list[dict[str, Any]], removed: list[int]
+    ) -> "RecordIndexes":
+        """削除した位置（昇順）を除き、残りの位置を詰めたインデックス"""
+        hash_tables: dict[str, defaultdict[str, list[int]]] = {}
+        for column, table in self._hash.items():
+            hash_tables[column] = defaultdict(list)
+            for key, positions in table.items():
+                kept = [
+                    _shift(p, removed) for p in positions if not _contains(removed, p)
+                ]
+                if kept:
+                    hash_tables[column][key] = kept
+        sorted_keys: dict[str, list[str]] = {}
+        sorted_positions: dict[str, list[int]] = {}
+        for column, keys in self._sorted_keys.items():
+            kept_entries = [
+                (k, p)
+                for k, p in zip(keys, self._sorted_positions[column])
+                if not _contains(removed, p)
+            ]
+            sorted_keys[column] = [k for k, _ in kept_entries]
+            sorted_positions[column] = [_shift(p, removed) for _, p in kept_entries]
+        return self._derive(records, hash_tables, sorted_keys, sorted_positions)
+
+    @classmethod
+    def _derive(
+        cls,
+        records: list[dict[str, Any]],
+        hash_tables: dict[str, defaultdict[str, list[int]]],
+        sorted_keys: dict[str, list[str]],
+        sorted_positions: dict[str, list[int]],
+    ) -> "RecordIndexes":
+        indexes = cls.__new__(cls)
+        indexes._records = records
+        indexes._hash = hash_tables
+        indexes._sorted_keys = sorted_keys
+        indexes._sorted_positions = sorted_positions
+        return indexes
+
+    def equal(self, column: str, value: Any) -> list[int]:
+        """列の値が一致するレコードの位置"""
+        return self._hash[column].get(equality_key(value), [])
+
+    def between(
+        self, column: str, lower: Optional[str], upper: Optional[str]
+    ) -> list[int]:
+        """日付列が lower〜upper（両端を含む）のレコードの位置"""
+        keys = self._sorted_keys[column]
+        start = bisect_left(keys, lower) if lower else 0
+        end = bisect_right(keys, upper) if upper else len(keys)
+        return self._sorted_positions[column][start:end]
+
+    def query(
+        self,
+        equals: dict[str, Any],
+        ranges: dict[str, tuple[Optional[str], Optional[str]]],
+    ) -> list[int]:
+        """条件に一致するレコードの位置をシートの行順で返す
+
+        最も絞り込めるインデックスで候補を取り、残りの条件は候補の
+        レコードだけで判定する（コストは候補数に比例）。
+        """
+        candidates = [self.equal(column, value) for column, value in equals.items()]
+        candidates += [
+            self.between(column, lower, upper)
+            for column, (lower, upper) in ranges.items()
+        ]
+        if not candidates:
+            return list(range(len(self._records)))
+
+        smallest = min(candidates, key=len)
+        matched = [p for p in smallest if self._matches(p, equals, ranges)]
+        return sorted(matched)
+
+    def _matches(
+        self,
+        position: int,
+        equals: dict[str, Any],
+        ranges: dict[str, tuple[Optional[str], Optional[str]]],
+    ) -> bool:
+        record = self._records[position]
+        for column, value in equals.items():
+            if equality_key(record.get(column, "")) != equality_key(value):
+                return False
+        for column, (lower, upper) in ranges.items():
+            key = date_key(record.get(column, ""))
+            if key is None or (lower and key < lower) or (upper and key > upper):
+                return False
+        return True
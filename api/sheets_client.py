@@ -0,0 +1,140 @@
+"""
+Google Sheetsクライアント管理
+認証済みクライアントをプロセス全体で共有し、トークンの期限前に更新する
+（gspread・oauth2clientは起動を遅くしないよう、初めてクライアントを作るときに読み込む）
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from typing import TYPE_CHECKING, Any, Optional
+
+from api.metrics import observe_sheets_call
+from api.quota import QuotaScheduler, api_error_status
+
+if TYPE_CHECKING:
+    import gspread
+
+logger = logging.getLogger(__name__)
+
+SCOPES = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive",
+]
+
+
+def load_credentials() -> Any:
+    """認証情報を読み込む（ファイル → 環境変数の順）"""
+    # サービスアカウントキーファイルのパス
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH", "credentials.json")
+
+    if os.path.exists(creds_path):
+        # ファイルから認証情報を読み込み
+        return ServiceAccountCredentials.from_json_keyfile_name(creds_path, SCOPES)
+
+    # 環境変数から認証情報を読み込み（Vercel用）
+    creds_json = os.getenv("GOOGLE_CREDENTIALS_JSON")
+    if creds_json:
+        creds_dict = json.loads(creds_json)
+        return ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPES)
+
+    raise ValueError("Google認証情報が見つかりません")
+
+
+def is_auth_error(exc: BaseException) -> bool:
+    """認証失敗による例外かどうかを判定"""
+    if api_error_status(exc) in (401, 403):
+        return True
+    # google-authのRefreshErrorなど
+    return type(exc).__name__ == "RefreshError"
+
+
+class SheetsClientManager:
+    """認証済みgspreadクライアントを保持・更新するマネージャー
+
+    認証情報の読み込みと ``gspread.authorize`` は初回のみ実行し、
+    以降はアクセストークンの有効期限が ``refresh_margin`` 秒以内に
+    迫った場合だけ更新する。認証エラー時は ``invalidate()`` で再構築する。
+    """
+
+    def __init__(
+        self, refresh_margin: int = 300, scheduler: Optional[QuotaScheduler] = None
+    ) -> None:
+        self.refresh_margin = refresh_margin
+        self.scheduler = scheduler
+        self._client: Optional["gspread.Client"] = None
+        self._lock = threading.Lock()
+
+    def get_client(self) -> "gspread.Client":
+        """共有クライアントを取得（必要に応じて構築・トークン更新）"""
+        with self._lock:
+            if self._client is None:
+                self._client = self._build()
+            elif self._needs_refresh(self._client):
+                self._refresh(self._client)
+            return self._client
+
+    def invalidate(self) -> None:
+        """クライアントを破棄し、次回取得時に再認証させる"""
+        with self._lock:
+            if self._client is not None:
+                logger.info("Google Sheetsクライアントを破棄しました")
+            self._client = None
+
+    def _build(self) -> "gspread.Client":
+        import gspread
+
+        from api.scheduled_client import ScheduledClient
+
+        creds = load_credentials()
+        if self.scheduler is not None:
+            factory = partial(ScheduledClient, scheduler=self.scheduler)
+            client = gspread.authorize(creds, client_factory=factory)
+        else:
+            client = gspread.authorize(creds)
+        # 初回リクエストでのトークン取得を避けるため、ここで取得しておく
+        self._refresh(client)
+        logger.info("Google Sheetsクライアントを初期化しました")
+        return client
+
+    def _needs_refresh(self, client: "gspread.Client") -> bool:
+        auth = getattr(client, "auth", None)
+        if auth is None or not getattr(auth, "token", None):
+            return True
+        expiry = getattr(auth, "expiry", None)
+        if expiry is None:
+            return False
+        # google-authのexpiryはnaiveなUTC
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        deadline = now + timedelta(seconds=self.refresh_margin)
+        return bool(expiry <= deadline)
+
+    def _refresh(self, client: "gspread.Client") -> None:
+        start = time.perf_counter()
+        status = "error"
+        try:
+            client.login()
+            status = "ok"
+        finally:
+            observe_sheets_call("auth", time.perf_counter() - start, status)
+
+
+# Sheets APIのクォータ（1分あたりのリクエスト数）と再試行の設定
+sheets_scheduler = QuotaScheduler(
+    read_per_minute=float(os.getenv("SHEETS_READ_QUOTA", "60")),
+    write_per_minute=float(os.getenv("SHEETS_WRITE_QUOTA", "60")),
+    burst=float(os.getenv("SHEETS_QUOTA_BURST", "10")),
+    max_retries=int(os.getenv("SHEETS_MAX_RETRIES", "5")),
+)
+
+# プロセス全体で共有するマネージャー
+client_manager = SheetsClientManager(
+    refresh_margin=int(os.getenv("SHEETS_TOKEN_REFRESH_MARGIN", "300")),
+    scheduler=sheets_scheduler,
+)
@@ -0,0 +1,179 @@
+"""
+Google Sheets I/Oのオフロード
+gspreadの同期HTTP呼び出しをスレッドプールで実行し、イベントループを止めない
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import itertools
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from api.metrics import record_timing
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 実行枠の優先度（小さいほど先に割り当てる）
+WRITE_PRIORITY = 0
+READ_PRIORITY = 1
+
+
+class PrioritySemaphore:
+    """空いた枠を優先度の高い待機者から順に割り当てるセマフォ
+
+    同じ優先度の待機者は到着順に割り当てる。
+    """
+
+    def __init__(self, value: int) -> None:
+        self._value = value
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+
+    async def acquire(self, priority: int = READ_PRIORITY) -> None:
+        if self._value > 0 and not self._waiters:
+            self._value -= 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._order), waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # 枠を割り当てられた直後に取り消された場合は返却する
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, waiter = heapq.heappop(self._waiters)
+            # 取り消された待機者は読み飛ばす
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._value += 1
+
+
+class SheetsExecutor:
+    """サイズ固定のスレッドプールでSheets呼び出しを実行する
+
+    データベースごとに同時実行数を ``per_db_limit`` に制限し、
+    待機中・実行中の件数を ``stats()`` で確認できる。
+    枠が埋まっている間は、書き込み（``run_write``）を読み取りより先に実行する。
+    """
+
+    def __init__(self, max_workers: int = 16, per_db_limit: int = 8) -> None:
+        self.max_workers = max_workers
+        self.per_db_limit = per_db_limit
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        # asyncio.Semaphoreはイベントループに紐づくため、ループごとに保持する
+        self._semaphores: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, dict[str, PrioritySemaphore]
+        ] = weakref.WeakKeyDictionary()
+        self._counts_lock = threading.Lock()
+        self._waiting: defaultdict[str, int] = defaultdict(int)
+        self._running: defaultdict[str, int] = defaultdict(int)
+        self._completed: defaultdict[str, int] = defaultdict(int)
+        self._failed: defaultdict[str, int] = defaultdict(int)
+
+    async def run(
+        self, db_name: str, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        """funcをスレッドプールで実行し、結果を返す"""
+        return await self._run(db_name, READ_PRIORITY, func, args, kwargs)
+
+    async def run_write(
+        self, db_name: str, func: Callable[..., T], *args: Any, **kwargs: Any
+    ) -> T:
+        """書き込みのfuncを、待機中の読み取りより優先して実行する"""
+        return await self._run(db_name, WRITE_PRIORITY, func, args, kwargs)
+
+    async def _run(
+        self,
+        db_name: str,
+        priority: int,
+        func: Callable[..., T],
+        args: tuple[Any, ...],
+        kwargs: dict[str, Any],
+    ) -> T:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphore(loop, db_name)
+
+        self._add(self._waiting, db_name, 1)
+        start = time.perf_counter()
+        try:
+            await semaphore.acquire(priority)
+        finally:
+            self._add(self._waiting, db_name, -1)
+            record_timing("io-queue", time.perf_counter() - start)
+
+        self._add(self._running, db_name, 1)
+        try:
+            # リクエストの処理時間の内訳をスレッド側でも記録できるよう引き継ぐ
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, func, *args, **kwargs)
+            result = await loop.run_in_executor(self._get_pool(), call)
+        except BaseException:
+            self._add(self._failed, db_name, 1)
+            raise
+        finally:
+            self._add(self._running, db_name, -1)
+            semaphore.release()
+
+        self._add(self._completed, db_name, 1)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        """データベースごとのキュー深さ・実行数を取得"""
+        with self._counts_lock:
+            names = set(self._waiting) | set(self._running) | set(self._completed)
+            databases = {
+                name: {
+                    "waiting": self._waiting[name],
+                    "running": self._running[name],
+                    "completed": self._completed[name],
+                    "failed": self._failed[name],
+                }
+                for name in sorted(names)
+            }
+        return {
+            "max_workers": self.max_workers,
+            "per_db_limit": self.per_db_limit,
+            "databases": databases,
+        }
+
+    def shutdown(self) -> None:
+        """スレッドプールを停止"""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="sheets-io"
+                )
+            return self._pool
+
+    def _semaphore(
+        self, loop: asyncio.AbstractEventLoop, db_name: str
+    ) -> PrioritySemaphore:
+        per_loop = self._semaphores.setdefault(loop, {})
+        if db_name not in per_loop:
+            per_loop[db_name] = PrioritySemaphore(self.per_db_limit)
+        return per_loop[db_name]
+
+    def _add(self, table: defaultdict[str, int], db_name: str, delta: int) -> None:
+        with self._counts_lock:
+            table[db_name] += delta
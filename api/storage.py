@@ -0,0 +1,478 @@
+"""
+データの保存先（ストレージバックエンド）
+Google Sheets とローカルのSQLiteを同じインターフェースで扱い、データベースごとに選べるようにする
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections.abc import Sequence
+from typing import Any, Callable, Optional
+
+from api.pk_index import FIRST_DATA_ROW
+from api.record_cache import row_to_record
+
+logger = logging.getLogger(__name__)
+
+
+class StorageBackend(ABC):
+    """データベース1つ分の保存先
+
+    メソッドはブロッキングI/Oを行うため、スレッドプールから呼び出す。
+    レコードはシートの get_all_records と同じ形式（列名 → 値）で返す。
+    """
+
+    kind = ""
+
+    def __init__(self, db_name: str) -> None:
+        self.db_name = db_name
+
+    @abstractmethod
+    def headers(self) -> list[str]:
+        """列名（保存先の列順）"""
+
+    @abstractmethod
+    def load_all(self) -> list[dict[str, Any]]:
+        """全レコードを行順で読み込む"""
+
+    @abstractmethod
+    def read_window(
+        self,
+        offset: int,
+        limit: int,
+        after_id: Optional[str] = None,
+        cursor_row: Optional[int] = None,
+    ) -> tuple[list[dict[str, Any]], int, int]:
+        """1ページ分のレコードを読み込む
+
+        Returns:
+            (レコードのリスト, 総件数, 先頭レコードの位置)
+        """
+
+    @abstractmethod
+    def read_by_id(self, item_id: str) -> Optional[dict[str, Any]]:
+        """管理IDのレコードを読み込む（なければNone）"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """レコード数"""
+
+    @abstractmethod
+    def read_rows(self, start: int, size: int) -> list[dict[str, Any]]:
+        """start件目（0始まり）から最大size件を読み込む"""
+
+    @abstractmethod
+    def append_rows(self, rows: list[list[Any]]) -> None:
+        """列順の行データを末尾に追加"""
+
+    @abstractmethod
+    def delete(self, item_id: str) -> bool:
+        """管理IDのレコードを削除（見つからなければFalse）"""
+
+    def delete_many(self, item_ids: list[str]) -> list[str]:
+        """複数の管理IDのレコードを削除し、見つからなかった管理IDを返す"""
+        return [
+            item_id for item_id in dict.fromkeys(item_ids) if not self.delete(item_id)
+        ]
+
+    def stats(self) -> dict[str, Any]:
+        return {"backend": self.kind}
+
+    def close(self) -> None:
+        """接続・スレッドを閉じる"""
+        # 閉じるものがないバックエンド（シート）は何もしない
+        return None
+
+
+class SqliteBackend(StorageBackend):
+    """ローカルのSQLiteに保存するバックエンド
+
+    行はシートと同じ列順の値のリストとして保存し、読み込み時に
+    シートと同じ変換（数値化など）を行う。シートへのミラーリングが
+    有効な場合、変更は同じトランザクションで ``mirror_outbox`` に記録する。
+    """
+
+    kind = "sqlite"
+
+    def __init__(
+        self,
+        db_name: str,
+        path: str,
+        headers: Sequence[str],
+        mirror_enabled: bool = False,
+    ) -> None:
+        super().__init__(db_name)
+        self.path = path
+        self._headers = list(headers)
+        self.mirror_enabled = mirror_enabled
+        self.mirror: Optional["SheetMirror"] = None
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS records (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    item_id TEXT NOT NULL,
+                    row TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS records_item_id ON records (item_id);
+                CREATE TABLE IF NOT EXISTS mirror_outbox (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    op TEXT NOT NULL,
+                    payload TEXT NOT NULL
+                );
+                """
+            )
+
+    def headers(self) -> list[str]:
+        return list(self._headers)
+
+    def load_all(self) -> list[dict[str, Any]]:
+        return self._query_records("SELECT row FROM records ORDER BY seq")
+
+    def read_window(
+        self,
+        offset: int,
+        limit: int,
+        after_id: Optional[str] = None,
+        cursor_row: Optional[int] = None,
+    ) -> tuple[list[dict[str, Any]], int, int]:
+        with self._lock:
+            total = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+            after_seq = self._first_seq(after_id) if after_id is not None else None
+
+        if cursor_row is not None and after_seq is not None:
+            # 前のページ以降に削除があってもずれないよう管理IDの次から読む
+            with self._lock:
+                start = self._conn.execute(
+                    "SELECT COUNT(*) FROM records WHERE seq <= ?", (after_seq,)
+                ).fetchone()[0]
+            records = self._query_records(
+                "SELECT row FROM records WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after_seq, limit),
+            )
+            return records, total, start
+
+        start = cursor_row - FIRST_DATA_ROW if cursor_row is not None else offset
+        return self.read_rows(start, limit), total, start
+
+    def read_by_id(self, item_id: str) -> Optional[dict[str, Any]]:
+        records = self._query_records(
+            "SELECT row FROM records WHERE item_id = ? ORDER BY seq LIMIT 1",
+            (item_id,),
+        )
+        return records[0] if records else None
+
+    def count(self) -> int:
+        with self._lock:
+            found = self._conn.execute("SELECT COUNT(*) FROM records").fetchone()
+        count: int = found[0]
+        return count
+
+    def read_rows(self, start: int, size: int) -> list[dict[str, Any]]:
+        if size <= 0:
+            return []
+        return self._query_records(
+            "SELECT row FROM records ORDER BY seq LIMIT ? OFFSET ?",
+            (size, max(start, 0)),
+        )
+
+    def append_rows(self, rows: list[list[Any]]) -> None:
+        with self._lock, self._conn:
+            self._insert(rows)
+            if self.mirror_enabled:
+                self._conn.execute(
+                    "INSERT INTO mirror_outbox (op, payload) VALUES ('append', ?)",
+                    (json.dumps(rows, ensure_ascii=False, default=str),),
+                )
+        self._notify_mirror()
+
+    def delete(self, item_id: str) -> bool:
+        with self._lock, self._conn:
+            seq = self._first_seq(item_id)
+            if seq is None:
+                return False
+            self._conn.execute("DELETE FROM records WHERE seq = ?", (seq,))
+            if self.mirror_enabled:
+                self._conn.execute(
+                    "INSERT INTO mirror_outbox (op, payload) VALUES ('delete', ?)",
+                    (json.dumps(item_id),),
+                )
+        self._notify_mirror()
+        return True
+
+    def delete_many(self, item_ids: list[str]) -> list[str]:
+        missing: list[str] = []
+        deleted = False
+        with self._lock, self._conn:
+            for item_id in dict.fromkeys(item_ids):
+                seq = self._first_seq(item_id)
+                if seq is None:
+                    missing.append(item_id)
+                    continue
+                deleted = True
+                self._conn.execute("DELETE FROM records WHERE seq = ?", (seq,))
+                if self.mirror_enabled:
+                    self._conn.execute(
+                        "INSERT INTO mirror_outbox (op, payload) VALUES ('delete', ?)",
+                        (json.dumps(item_id),),
+                    )
+        if deleted:
+            self._notify_mirror()
+        return missing
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            found = self._conn.execute("SELECT 1 FROM records LIMIT 1").fetchone()
+        return found is None
+
+    def import_rows(self, rows: list[list[Any]]) -> None:
+        """既存データを取り込む（シートへは反映しない）"""
+        with self._lock, self._conn:
+            self._insert(rows)
+
+    def outbox(self, limit: int) -> list[tuple[int, str, Any]]:
+        """シートへ未反映の変更を古い順に取得"""
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT seq, op, payload FROM mirror_outbox ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(seq, op, json.loads(payload)) for seq, op, payload in entries]
+
+    def ack_outbox(self, seqs: list[int]) -> None:
+        """シートへ反映した変更を削除"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM mirror_outbox WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def outbox_size(self) -> int:
+        with self._lock:
+            found = self._conn.execute("SELECT COUNT(*) FROM mirror_outbox").fetchone()
+        count: int = found[0]
+        return count
+
+    def stats(self) -> dict[str, Any]:
+        stats = super().stats()
+        if self.mirror is not None:
+            stats["mirror"] = self.mirror.stats()
+        return stats
+
+    def close(self) -> None:
+        if self.mirror is not None:
+            self.mirror.stop()
+        with self._lock:
+            self._conn.close()
+
+    def _insert(self, rows: list[list[Any]]) -> None:
+        self._conn.executemany(
+            "INSERT INTO records (item_id, row) VALUES (?, ?)",
+            [
+                (str(row[0]), json.dumps(row, ensure_ascii=False, default=str))
+                for row in rows
+            ],
+        )
+
+    def _first_seq(self, item_id: str) -> Optional[int]:
+        found = self._conn.execute(
+            "SELECT MIN(seq) FROM records WHERE item_id = ?", (item_id,)
+        ).fetchone()
+        return found[0] if found else None
+
+    def _query_records(
+        self, sql: str, params: Sequence[Any] = ()
+    ) -> list[dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [row_to_record(self._headers, json.loads(row)) for (row,) in rows]
+
+    def _notify_mirror(self) -> None:
+        if self.mirror is not None:
+            self.mirror.notify()
+
+
+class SheetMirror:
+    """SQLiteへの変更をバックグラウンドでシートに反映する
+
+    変更はSQLiteの ``mirror_outbox`` に記録されているため、反映前に
+    プロセスが停止しても次回起動時に続きから反映する。連続する追加は
+    まとめて ``append(db_name, rows)``、連続する削除はまとめて
+    ``delete(db_name, item_ids)`` で反映する。
+
+    シートへの追加は冪等ではなく、反映済みで失敗（または反映後に停止）
+    した変更を送り直すと行が重複する。そのため起動直後と失敗の後は
+    ``existing_ids(db_name)`` でシートの管理IDを確認し、既にある行を
+    除いてから追加する。
+    """
+
+    def __init__(
+        self,
+        backend: SqliteBackend,
+        append: Callable[[str, list[list[Any]]], None],
+        delete: Callable[[str, list[str]], Any],
+        interval: float = 2.0,
+        batch_size: int = 500,
+        existing_ids: Optional[Callable[[str], set[str]]] = None,
+    ) -> None:
+        self.backend = backend
+        self.append = append
+        self.delete = delete
+        self.existing_ids = existing_ids
+        self.interval = interval
+        self.batch_size = batch_size
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._dirty = False
+        self._last_error: Optional[str] = None
+        # 前回のプロセスが反映後・確認前に停止した可能性があるため確認から始める
+        self._recovering = True
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is not None:
+                return
+            self._stopping = False
+            # 前回のプロセスで反映できなかった変更から始める
+            self._dirty = True
+            self._thread = threading.Thread(
+                target=self._run,
+                name=f"sheet-mirror-{self.backend.db_name}",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """残りの変更を反映してからスレッドを停止"""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join()
+        with self._cond:
+            self._thread = None
+
+    def notify(self) -> None:
+        with self._cond:
+            self._dirty = True
+            self._cond.notify_all()
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            last_error = self._last_error
+        return {"pending": self.backend.outbox_size(), "last_error": last_error}
+
+    def drain(self) -> bool:
+        """未反映の変更を全てシートに反映する（全て成功した場合True）"""
+        while True:
+            entries = self.backend.outbox(self.batch_size)
+            if not entries:
+                return True
+            try:
+                self._apply(entries)
+            except Exception as e:
+                logger.error(f"シートへの反映に失敗しました: {self.backend.db_name} {e}")
+                with self._cond:
+                    self._last_error = str(e)
+                self._recovering = True
+                return False
+            with self._cond:
+                self._last_error = None
+
+    def _apply(self, entries: list[tuple[int, str, Any]]) -> None:
+        # 同じ操作が続く間はまとめ、操作が変わる時点で反映する（順序は保つ）
+        pending_op: Optional[str] = None
+        values: list[Any] = []
+        seqs: list[int] = []
+
+        def flush() -> None:
+            if not seqs:
+                return
+            if pending_op == "append":
+                rows = self._unwritten(values)
+                if rows:
+                    self.append(self.backend.db_name, rows)
+            else:
+                self.delete(self.backend.db_name, values[:])
+            self.backend.ack_outbox(seqs[:])
+            # 失敗した変更を反映できたので、以降は確認せずに追加する
+            self._recovering = False
+            values.clear()
+            seqs.clear()
+
+        for seq, op, payload in entries:
+            if op != pending_op:
+                flush()
+                pending_op = op
+            if op == "append":
+                values.extend(payload)
+            else:
+                values.append(payload)
+            seqs.append(seq)
+        flush()
+
+    def _unwritten(self, rows: list[list[Any]]) -> list[list[Any]]:
+        """追加する行のうち、シートにまだない行"""
+        if not self._recovering or self.existing_ids is None:
+            return rows[:]
+        existing = self.existing_ids(self.backend.db_name)
+        unwritten = [row for row in rows if str(row[0]) not in existing]
+        if len(unwritten) < len(rows):
+            logger.info(
+                f"シートに反映済みの行を除きました: {self.backend.db_name} "
+                f"({len(rows) - len(unwritten)}件)"
+            )
+        return unwritten
+
+    def _run(self) -> None:
+        failed = False
+        while True:
+            with self._cond:
+                # 失敗直後は変更があっても次の周期まで待つ
+                if not self._stopping and (failed or not self._dirty):
+                    self._cond.wait(timeout=self.interval)
+                stopping = self._stopping
+                self._dirty = False
+            failed = not self.drain()
+            if stopping:
+                return
+
+
+class BackendRegistry:
+    """データベースごとのバックエンドを初回利用時に作成して保持する"""
+
+    def __init__(self, factory: Callable[[str], StorageBackend]) -> None:
+        self.factory = factory
+        self._backends: dict[str, StorageBackend] = {}
+        self._lock = threading.Lock()
+
+    def get(self, db_name: str) -> StorageBackend:
+        with self._lock:
+            backend = self._backends.get(db_name)
+            if backend is None:
+                backend = self._backends[db_name] = self.factory(db_name)
+            return backend
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            backends = dict(self._backends)
+        return {db_name: backend.stats() for db_name, backend in backends.items()}
+
+    def clear(self) -> None:
+        """全てのバックエンドを閉じて破棄"""
+        with self._lock:
+            backends = list(self._backends.values())
+            self._backends.clear()
+        for backend in backends:
+            backend.close()
@@ -0,0 +1,97 @@
+"""
+Spreadsheet/Worksheetハンドルのキャッシュ
+open_by_key と worksheet() のメタデータ取得をリクエストごとに行わないようにする
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from api.lazy_imports import as_api_error, is_error
+
+logger = logging.getLogger(__name__)
+
+
+def is_stale_worksheet_error(exc: BaseException) -> bool:
+    """キャッシュ済みハンドルが無効になった（削除・リネーム）ことを示す例外か判定"""
+    if is_error(exc, "gspread.exceptions", "WorksheetNotFound", "SpreadsheetNotFound"):
+        return True
+    error = as_api_error(exc)
+    if error is not None:
+        # リネーム後は "Unable to parse range"（400）、削除後は404が返る
+        status = getattr(error.response, "status_code", None)
+        return status in (400, 404)
+    return False
+
+
+class WorksheetCache:
+    """(データベース名, シート名) ごとのハンドルをTTL付きで保持する
+
+    ハンドルは取得元のクライアントに紐づけて保存し、クライアントが
+    再構築された場合は自動的に取り直す。
+    """
+
+    def __init__(
+        self, ttl: float = 600, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._spreadsheets: dict[str, tuple[Any, Any, float]] = {}
+        self._worksheets: dict[tuple[str, str], tuple[Any, Any, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_worksheet(
+        self, client: Any, db_name: str, sheet_id: str, sheet_name: str
+    ) -> Any:
+        """Worksheetを取得（キャッシュになければSheets APIから取得）"""
+        key = (db_name, sheet_name)
+        with self._lock:
+            cached = self._lookup(self._worksheets, key, client)
+        if cached is not None:
+            return cached
+
+        spreadsheet = self.get_spreadsheet(client, sheet_id)
+        worksheet = spreadsheet.worksheet(sheet_name)
+        with self._lock:
+            self._worksheets[key] = (client, worksheet, self._clock() + self.ttl)
+        return worksheet
+
+    def get_spreadsheet(self, client: Any, sheet_id: str) -> Any:
+        """Spreadsheetを取得（キャッシュになければSheets APIから取得）"""
+        with self._lock:
+            cached = self._lookup(self._spreadsheets, sheet_id, client)
+        if cached is not None:
+            return cached
+
+        spreadsheet = client.open_by_key(sheet_id)
+        with self._lock:
+            expires_at = self._clock() + self.ttl
+            self._spreadsheets[sheet_id] = (client, spreadsheet, expires_at)
+        return spreadsheet
+
+    def invalidate(self, db_name: str, sheet_name: Optional[str] = None) -> None:
+        """指定データベースのWorksheetハンドルを破棄"""
+        with self._lock:
+            for key in list(self._worksheets):
+                if key[0] == db_name and sheet_name in (None, key[1]):
+                    del self._worksheets[key]
+        logger.info(f"Worksheetキャッシュを無効化しました: {db_name}")
+
+    def clear(self) -> None:
+        """全てのハンドルを破棄"""
+        with self._lock:
+            self._spreadsheets.clear()
+            self._worksheets.clear()
+
+    def _lookup(
+        self, table: dict[Any, tuple[Any, Any, float]], key: Any, client: Any
+    ) -> Any:
+        entry = table.get(key)
+        if entry is None:
+            return None
+        owner, handle, expires_at = entry
+        if owner is not client or expires_at <= self._clock():
+            del table[key]
+            return None
+        return handle
@@ -0,0 +1,263 @@
+"""
+書き込みバッファ（ライトビハインド）
+受け付けた行をローカルのジャーナルに記録し、バックグラウンドでまとめてシートに書き込む
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+COMMITTED = "committed"
+
+# 完了済みチケットを保持する件数
+_MAX_FINISHED = 10000
+
+
+@dataclass
+class PendingRow:
+    """書き込み待ちの行"""
+
+    ticket: str
+    db_name: str
+    row: list[Any]
+    # 前回のプロセスから引き継いだ行・書き込みに失敗した行
+    # （シートには反映済みの可能性があるため、管理IDで確認してから書き込む）
+    recovered: bool = False
+
+
+class WriteJournal:
+    """JSON Lines形式の追記専用ジャーナル"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self) -> tuple[list[PendingRow], list[str]]:
+        """未完了の行と完了済みチケットを読み込む"""
+        pending: OrderedDict[str, PendingRow] = OrderedDict()
+        committed: list[str] = []
+        if not os.path.exists(self.path):
+            return [], []
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # 書き込み途中で停止した最終行
+                    logger.warning("ジャーナルの壊れた行を読み飛ばしました")
+                    continue
+                if entry["type"] == PENDING:
+                    pending[entry["ticket"]] = PendingRow(
+                        entry["ticket"], entry["db"], entry["row"], recovered=True
+                    )
+                elif entry["type"] == COMMITTED:
+                    for ticket in entry["tickets"]:
+                        pending.pop(ticket, None)
+                        committed.append(ticket)
+        return list(pending.values()), committed
+
+    def append_pending(self, item: PendingRow) -> None:
+        entry = {
+            "type": PENDING,
+            "ticket": item.ticket,
+            "db": item.db_name,
+            "row": item.row,
+        }
+        self._write([entry])
+
+    def append_committed(self, tickets: list[str]) -> None:
+        self._write([{"type": COMMITTED, "tickets": tickets}])
+
+    def compact(self, pending: list[PendingRow]) -> None:
+        """未完了の行だけを残してジャーナルを書き直す"""
+        tmp_path = f"{self.path}.tmp"
+        with self._lock:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for item in pending:
+                    entry = {
+                        "type": PENDING,
+                        "ticket": item.ticket,
+                        "db": item.db_name,
+                        "row": item.row,
+                    }
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def _write(self, entries: list[dict[str, Any]]) -> None:
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class WriteBehindBuffer:
+    """行をジャーナルに記録してすぐに応答し、バックグラウンドでまとめて書き込む
+
+    データベースごとの待ち行数が ``flush_size`` に達するか、
+    ``flush_interval`` 秒経過した時点で ``writer(db_name, rows)`` を呼ぶ。
+    書き込みに失敗した行は待ち行列に残し、次回の書き込みで再試行する
+    （失敗してもシートには反映済みの場合があるため ``recovered`` を立てる）。
+    """
+
+    def __init__(
+        self,
+        journal: WriteJournal,
+        writer: Callable[[str, list[PendingRow]], None],
+        flush_size: int = 50,
+        flush_interval: float = 2.0,
+    ) -> None:
+        self.journal = journal
+        self.writer = writer
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending: defaultdict[str, list[PendingRow]] = defaultdict(list)
+        self._finished: OrderedDict[str, str] = OrderedDict()
+        self._last_error: dict[str, str] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+    def start(self) -> None:
+        """ジャーナルを読み込み、書き込みスレッドを開始"""
+        with self._cond:
+            if self._thread is not None:
+                return
+            pending, committed = self.journal.load()
+            for ticket in committed:
+                self._remember(ticket, COMMITTED)
+            for item in pending:
+                self._pending[item.db_name].append(item)
+            if pending:
+                logger.info(f"未書き込みの行を引き継ぎました: {len(pending)}件")
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="write-behind", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """残りの行を書き込んでからスレッドを停止"""
+        with self._cond:
+            thread = self._thread
+            if thread is None:
+                return
+            self._stopping = True
+            self._cond.notify_all()
+        thread.join()
+        with self._cond:
+            self._thread = None
+
+    def submit(self, db_name: str, row: list[Any]) -> str:
+        """行を受け付け、状態確認用のチケットを返す"""
+        self.start()
+        item = PendingRow(uuid.uuid4().hex, db_name, row)
+        with self._cond:
+            # ジャーナルへの記録が済んでから受け付ける
+            self.journal.append_pending(item)
+            self._pending[db_name].append(item)
+            if len(self._pending[db_name]) >= self.flush_size:
+                self._cond.notify_all()
+        return item.ticket
+
+    def status(self, ticket: str) -> Optional[dict[str, Any]]:
+        """チケットの状態を取得（不明なチケットはNone）"""
+        with self._cond:
+            if ticket in self._finished:
+                return {"ticket": ticket, "status": self._finished[ticket]}
+            for db_name, items in self._pending.items():
+                if any(item.ticket == ticket for item in items):
+                    return {
+                        "ticket": ticket,
+                        "status": PENDING,
+                        "last_error": self._last_error.get(db_name),
+                    }
+        return None
+
+    def stats(self) -> dict[str, int]:
+        """データベースごとの書き込み待ち行数"""
+        with self._cond:
+            return {db_name: len(items) for db_name, items in self._pending.items()}
+
+    def flush(self) -> bool:
+        """書き込み待ちの行を全て書き込む（全て成功した場合True）"""
+        ok = True
+        with self._cond:
+            batches = {db: items[:] for db, items in self._pending.items() if items}
+
+        for db_name, items in batches.items():
+            try:
+                self.writer(db_name, items)
+            except Exception as e:
+                logger.error(f"書き込みバッファのフラッシュに失敗しました: {db_name} {e}")
+                with self._cond:
+                    self._last_error[db_name] = str(e)
+                    for item in items:
+                        item.recovered = True
+                ok = False
+                continue
+
+            tickets = [item.ticket for item in items]
+            self.journal.append_committed(tickets)
+            with self._cond:
+                written = set(tickets)
+                self._pending[db_name] = [
+                    item
+                    for item in self._pending[db_name]
+                    if item.ticket not in written
+                ]
+                self._last_error.pop(db_name, None)
+                for ticket in tickets:
+                    self._remember(ticket, COMMITTED)
+
+        if batches:
+            with self._cond:
+                remaining = [item for items in self._pending.values() for item in items]
+                self.journal.compact(remaining)
+        return ok
+
+    def _run(self) -> None:
+        failed = False
+        while True:
+            with self._cond:
+                # 失敗直後は満杯でも次の周期まで待つ
+                if not self._stopping and (failed or not self._is_full()):
+                    self._cond.wait(timeout=self.flush_interval)
+                stopping = self._stopping
+            failed = not self.flush()
+            if stopping:
+                return
+
+    def _is_full(self) -> bool:
+        return any(len(items) >= self.flush_size for items in self._pending.values())
+
+    def _remember(self, ticket: str, status: str) -> None:
+        self._finished[ticket] = status
+        while len(self._finished) > _MAX_FINISHED:
+            self._finished.popitem(last=False)
+
+
+def new_buffer_from_env(
+    writer: Callable[[str, list[PendingRow]], None],
+) -> Optional[WriteBehindBuffer]:
+    """環境変数で有効化されている場合のみバッファを作成"""
+    if os.getenv("WRITE_BEHIND_ENABLED", "").lower() not in ("1", "true", "yes"):
+        return None
+    journal = WriteJournal(os.getenv("WRITE_BEHIND_JOURNAL", "write_behind.jsonl"))
+    return WriteBehindBuffer(
+        journal,
+        writer,
+        flush_size=int(os.getenv("WRITE_BEHIND_FLUSH_SIZE", "50")),
+        flush_interval=float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "2.0")),
+    )
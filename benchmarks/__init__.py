@@ -0,0 +1,4 @@
+"""
+ベンチマーク・負荷テスト
+Google Sheetsのフェイクに対してAPIの主要な処理の所要時間を計測する
+"""
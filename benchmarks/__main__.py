@@ -0,0 +1,102 @@
+"""
+ベンチマーク・負荷テストの実行
+
+    python -m benchmarks                          # 1k/10k/100k行で各シナリオを計測
+    python -m benchmarks --rows 10000 --load      # 16並列で10秒ずつ負荷をかける
+    python -m benchmarks --json result.json       # 結果を保存
+    python -m benchmarks --baseline result.json   # 保存した結果より悪化したら終了コード1
+"""
+
+import argparse
+import json
+import logging
+import sys
+from dataclasses import replace
+from typing import Optional
+
+from benchmarks.runner import (
+    SCENARIOS,
+    BenchConfig,
+    compare,
+    format_table,
+    run_scenario,
+)
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Google Sheetsのフェイクに対するベンチマーク・負荷テスト",
+    )
+    parser.add_argument("--rows", default="1000,10000,100000", help="シートの行数")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="実行するシナリオ")
+    parser.add_argument("--requests", type=int, default=100, help="リクエスト数")
+    parser.add_argument("--load", action="store_true", help="負荷モード（並列で一定時間送り続ける）")
+    parser.add_argument("--concurrency", type=int, help="並列数（負荷モードは16）")
+    parser.add_argument("--duration", type=float, help="負荷モードの秒数（既定10）")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.0, help="API遅延（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="遅延のゆらぎ（秒）")
+    parser.add_argument(
+        "--latency-per-row", type=float, default=0.0, help="1行あたりの遅延（秒）"
+    )
+    parser.add_argument("--read-quota", type=int, help="読み取りのクォータ（/分）")
+    parser.add_argument("--write-quota", type=int, help="書き込みのクォータ（/分）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="結果を保存するJSONファイル")
+    parser.add_argument("--baseline", help="比較する前回の結果（JSON）")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="p99の悪化を許容する割合")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    # リクエストごとのログで結果が埋もれないようにする
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = sorted(set(scenarios) - set(SCENARIOS))
+    if unknown:
+        print(f"未知のシナリオです: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    config = BenchConfig(
+        requests=args.requests,
+        concurrency=args.concurrency or (16 if args.load else 1),
+        duration=args.duration or (10.0 if args.load else None),
+        batch_size=args.batch_size,
+        page_size=args.page_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        latency_per_row=args.latency_per_row,
+        read_quota=args.read_quota,
+        write_quota=args.write_quota,
+        seed=args.seed,
+    )
+
+    results = []
+    for rows in (int(r) for r in args.rows.split(",")):
+        for scenario in scenarios:
+            result = run_scenario(scenario, replace(config, rows=rows))
+            results.append(result.summary())
+            print(f"{scenario} ({rows}行): 完了", file=sys.stderr)
+    print(format_table(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"悪化: {line}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Google Sheets APIのフェイク
+gspreadのHTTPリクエストをプロセス内で処理し、シートの内容をメモリ上に保持する
+（呼び出しごとの遅延・分あたりのクォータ・シートの行数を調整できる）
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Optional
+from urllib.parse import unquote, urlsplit
+
+import gspread
+import requests
+from gspread.utils import a1_range_to_grid_range, rowcol_to_a1
+
+from api.metrics import sheets_operation
+from api.quota import READ, WRITE, QuotaScheduler
+from api.scheduled_client import ScheduledClient
+
+# /v4/spreadsheets/{id}[/values[/{range}]][:{action}]
+_PATH = re.compile(
+    r"/v4/spreadsheets/(?P<key>[^/:]+)"
+    r"(?:/values(?:/(?P<range>[^:]+))?)?"
+    r"(?::(?P<action>[a-z][A-Za-z]*))?$"
+)
+
+
+class FakeSheet:
+    """1枚のワークシート（セルの値は文字列で保持する）"""
+
+    def __init__(self, sheet_id: int, title: str, rows: list[list[Any]]) -> None:
+        self.sheet_id = sheet_id
+        self.title = title
+        self.rows = [[_cell(v) for v in row] for row in rows]
+
+    def read(self, a1: Optional[str]) -> list[list[str]]:
+        """範囲の値（Sheets APIと同じく末尾の空の行・列は返さない）"""
+        grid = a1_range_to_grid_range(a1) if a1 else {}
+        start_row = grid.get("startRowIndex", 0)
+        end_row = grid.get("endRowIndex", len(self.rows))
+        start_col = grid.get("startColumnIndex", 0)
+        end_col = grid.get("endColumnIndex")
+        values = []
+        for row in self.rows[start_row:end_row]:
+            cells = row[start_col:end_col]
+            while cells and cells[-1] == "":
+                cells.pop()
+            values.append(cells)
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def append(self, values: list[list[Any]]) -> tuple[int, int]:
+        """末尾に行を追加し、(先頭行, 末尾行) を返す"""
+        last = len(self.rows)
+        while last and not any(self.rows[last - 1]):
+            last -= 1
+        del self.rows[last:]
+        self.rows.extend([_cell(v) for v in row] for row in values)
+        return last + 1, last + len(values)
+
+    def delete_rows(self, start_index: int, end_index: int) -> None:
+        del self.rows[start_index:end_index]
+
+
+def _cell(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+class FakeSheetsService:
+    """gspreadのセッションとして使うSheets APIのフェイク
+
+    ``latency`` 秒（+ 最大 ``jitter`` 秒）の遅延を呼び出しごとに、
+    ``latency_per_row`` 秒を読み書きした行ごとに加える。
+    ``read_quota`` / ``write_quota`` を指定すると、直近60秒の呼び出し数が
+    上限を超えた呼び出しに429を返す。
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        latency_per_row: float = 0.0,
+        read_quota: Optional[int] = None,
+        write_quota: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_per_row = latency_per_row
+        self.quotas = {READ: read_quota, WRITE: write_quota}
+        self._clock = clock
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._spreadsheets: dict[str, dict[str, FakeSheet]] = {}
+        self._history: dict[str, deque[float]] = {READ: deque(), WRITE: deque()}
+        self._lock = threading.Lock()
+        # 操作名（values.get など）ごとの呼び出し数・429を返した数
+        self.calls: Counter[str] = Counter()
+        self.throttled: Counter[str] = Counter()
+
+    # --- シートの準備 ---
+
+    def add_sheet(
+        self, key: str, title: str = "Sheet1", rows: Optional[list[list[Any]]] = None
+    ) -> FakeSheet:
+        with self._lock:
+            sheets = self._spreadsheets.setdefault(key, {})
+            sheet = FakeSheet(len(sheets), title, rows or [])
+            sheets[title] = sheet
+            return sheet
+
+    def sheet(self, key: str, title: str = "Sheet1") -> FakeSheet:
+        return self._spreadsheets[key][title]
+
+    def client(self, scheduler: Optional[QuotaScheduler] = None) -> gspread.Client:
+        """このフェイクへリクエストを送るgspreadクライアント"""
+        if scheduler is None:
+            return gspread.Client(None, session=self)
+        return ScheduledClient(None, scheduler=scheduler, session=self)
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.throttled.clear()
+
+    # --- requests.Session 互換のインターフェース ---
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("get", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("post", url, **kwargs)
+
+    def put(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("put", url, **kwargs)
+
+    def delete(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("delete", url, **kwargs)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        json: Optional[dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> requests.Response:
+        operation = sheets_operation(method, url)
+        kind = READ if method.lower() == "get" else WRITE
+        with self._lock:
+            self.calls[operation] += 1
+            if not self._admit(kind):
+                self.throttled[operation] += 1
+                return _response(
+                    429,
+                    _error(429, "Quota exceeded", "RESOURCE_EXHAUSTED"),
+                    {"Retry-After": "1"},
+                )
+            try:
+                status, body, rows = self._dispatch(
+                    method.lower(), url, params or {}, json
+                )
+            except (KeyError, IndexError, ValueError) as e:
+                status, body, rows = 400, _error(400, str(e), "INVALID_ARGUMENT"), 0
+
+        delay = self.latency + self.latency_per_row * rows
+        if self.jitter:
+            delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            # 通信中は他の呼び出しを止めない
+            self._sleep(delay)
+        return _response(status, body)
+
+    def _admit(self, kind: str) -> bool:
+        """分あたりのクォータの範囲内ならTrue"""
+        limit = self.quotas[kind]
+        if limit is None:
+            return True
+        now = self._clock()
+        history = self._history[kind]
+        while history and history[0] <= now - 60:
+            history.popleft()
+        if len(history) >= limit:
+            return False
+        history.append(now)
+        return True
+
+    # --- Sheets APIの処理 ---
+
+    def _dispatch(
+        self, method: str, url: str, params: dict[str, Any], body: Any
+    ) -> tuple[int, dict[str, Any], int]:
+        """(ステータス, レスポンス本文, 読み書きした行数)"""
+        match = _PATH.search(urlsplit(url).path)
+        if match is None:
+            return 404, _error(404, f"unknown endpoint: {url}", "NOT_FOUND"), 0
+        sheets = self._spreadsheets.get(match["key"])
+        if sheets is None:
+            return 404, _error(404, "Requested entity was not found.", "NOT_FOUND"), 0
+        action = match["action"]
+        a1 = unquote(match["range"]) if match["range"] else None
+
+        if "/values" not in url:
+            if method == "get" and action is None:
+                return 200, self._metadata(match["key"], sheets), 0
+            if method == "post" and action == "batchUpdate":
+                return 200, self._batch_update(match["key"], sheets, body), 0
+        elif method == "get" and action == "batchGet":
+            ranges = [self._get(sheets, r) for r in params.get("ranges", [])]
+            return 200, {"valueRanges": ranges}, _row_total(ranges)
+        elif a1 is None:
+            return 400, _error(400, "range is required", "INVALID_ARGUMENT"), 0
+        elif method == "get" and action is None:
+            value_range = self._get(sheets, a1)
+            return 200, value_range, _row_total([value_range])
+        elif method == "post" and action == "append":
+            values = body.get("values", [])
+            return 200, self._append(match["key"], sheets, a1, values), len(values)
+        return 400, _error(400, f"unsupported: {method} {url}", "INVALID_ARGUMENT"), 0
+
+    def _metadata(self, key: str, sheets: dict[str, FakeSheet]) -> dict[str, Any]:
+        return {
+            "spreadsheetId": key,
+            "properties": {"title": key},
+            "sheets": [
+                {
+                    "properties": {
+                        "sheetId": sheet.sheet_id,
+                        "title": sheet.title,
+                        "index": sheet.sheet_id,
+                        "sheetType": "GRID",
+                        "gridProperties": {
+                            "rowCount": len(sheet.rows),
+                            "columnCount": len(sheet.rows[0]) if sheet.rows else 0,
+                        },
+                    }
+                }
+                for sheet in sheets.values()
+            ],
+        }
+
+    def _get(self, sheets: dict[str, FakeSheet], name: str) -> dict[str, Any]:
+        sheet, a1 = _split_range(sheets, name)
+        result: dict[str, Any] = {"range": name, "majorDimension": "ROWS"}
+        values = sheet.read(a1)
+        if values:
+            result["values"] = values
+        return result
+
+    def _append(
+        self,
+        key: str,
+        sheets: dict[str, FakeSheet],
+        name: str,
+        values: list[list[Any]],
+    ) -> dict[str, Any]:
+        sheet, _ = _split_range(sheets, name)
+        first, last = sheet.append(values)
+        width = max(map(len, values), default=1)
+        updated = f"'{sheet.title}'!A{first}:{rowcol_to_a1(last, width)}"
+        return {
+            "spreadsheetId": key,
+            "tableRange": f"'{sheet.title}'!A1:{rowcol_to_a1(first - 1 or 1, width)}",
+            "updates": {
+                "spreadsheetId": key,
+                "updatedRange": updated,
+                "updatedRows": len(values),
+                "updatedCells": sum(map(len, values)),
+            },
+        }
+
+    def _batch_update(
+        self, key: str, sheets: dict[str, FakeSheet], body: dict[str, Any]
+    ) -> dict[str, Any]:
+        by_id = {sheet.sheet_id: sheet for sheet in sheets.values()}
+        replies: list[dict[str, Any]] = []
+        for request in body.get("requests", []):
+            if "deleteDimension" not in request:
+                raise ValueError(f"unsupported request: {list(request)}")
+            target = request["deleteDimension"]["range"]
+            if target.get("dimension") != "ROWS":
+                raise ValueError("only ROWS can be deleted")
+            by_id[target["sheetId"]].delete_rows(
+                target["startIndex"], target["endIndex"]
+            )
+            replies.append({})
+        return {"spreadsheetId": key, "replies": replies}
+
+
+def _split_range(sheets: dict[str, FakeSheet], name: str) -> tuple[FakeSheet, str]:
+    """範囲名をシートとA1表記に分ける（例: 'Sheet1'!A1:B2 → (シート, "A1:B2")）"""
+    title, _, a1 = name.partition("!")
+    title = title.strip("'").replace("''", "'")
+    return sheets[title], a1
+
+
+def _row_total(value_ranges: list[dict[str, Any]]) -> int:
+    return sum(len(r.get("values", [])) for r in value_ranges)
+
+
+def _error(code: int, message: str, status: str) -> dict[str, Any]:
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+def _response(
+    status: int, body: dict[str, Any], headers: Optional[dict[str, str]] = None
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body, ensure_ascii=False).encode("utf-8")
+    response.headers["Content-Type"] = "application/json; charset=UTF-8"
+    response.headers.update(headers or {})
+    response.encoding = "utf-8"
+    return response
@@ -0,0 +1,326 @@
+"""
+ベンチマークのシナリオと集計
+フェイクのシートを差し込んだAPIへプロセス内でリクエストを送り、所要時間を計測する
+"""
+
+import asyncio
+import itertools
+import math
+import random
+import time
+from collections.abc import Awaitable, Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Optional
+from unittest.mock import patch
+
+import httpx
+
+from api import main
+from api.quota import QuotaScheduler
+from api.schema import SHEET_HEADERS, pokemon_to_row
+from benchmarks.fake_sheets import FakeSheetsService
+
+DB_NAME = "pokemon"
+
+SCENARIOS = ("single_create", "bulk_create", "paginated_read", "lookup", "delete")
+
+# クォータを指定しない場合の上限（実質無制限）
+UNLIMITED = 10**9
+
+# シナリオごとにクリアするプロセス内キャッシュ
+CACHES = (
+    main.change_log,
+    main.record_cache,
+    main.pk_index,
+    main.header_guard,
+    main.search_indexes,
+    main.worksheet_cache,
+    main.storage_backends,
+)
+
+
+@dataclass(frozen=True)
+class BenchConfig:
+    """ベンチマークの条件"""
+
+    # シートのデータ行数
+    rows: int = 1000
+    # 計測するリクエスト数（duration を指定した場合は上限なし）
+    requests: int = 100
+    # 同時に送るリクエスト数
+    concurrency: int = 1
+    # 負荷モードでリクエストを送り続ける秒数
+    duration: Optional[float] = None
+    # bulk_create の1リクエストあたりの件数
+    batch_size: int = 100
+    # paginated_read の1ページの件数
+    page_size: int = 50
+    # フェイクのSheets APIの遅延（秒）とクォータ（分あたり）
+    latency: float = 0.0
+    jitter: float = 0.0
+    latency_per_row: float = 0.0
+    read_quota: Optional[int] = None
+    write_quota: Optional[int] = None
+    seed: int = 0
+
+
+@dataclass
+class ScenarioResult:
+    """1シナリオの計測結果"""
+
+    scenario: str
+    rows: int
+    concurrency: int
+    requests: int
+    errors: int
+    elapsed: float
+    latencies: list[float] = field(default_factory=list, repr=False)
+    # Sheets APIの操作名ごとの呼び出し数・429の数
+    sheets_calls: dict[str, int] = field(default_factory=dict)
+    throttled: int = 0
+
+    def percentile(self, p: float) -> float:
+        """p パーセンタイルの所要時間（秒、最近傍法）"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def calls_per_request(self) -> float:
+        total = sum(self.sheets_calls.values())
+        return total / self.requests if self.requests else 0.0
+
+    def summary(self) -> dict[str, Any]:
+        result = asdict(self)
+        del result["latencies"]
+        result.update(
+            p50_ms=round(self.percentile(50) * 1000, 3),
+            p99_ms=round(self.percentile(99) * 1000, 3),
+            throughput=round(self.throughput, 2),
+            calls_per_request=round(self.calls_per_request, 3),
+        )
+        return result
+
+
+def bench_payload(item_id: str) -> dict[str, Any]:
+    """登録に使うデータ（図鑑データとの照合に通る内容）"""
+    return {
+        "id": item_id,
+        "name": {"ja": "ピカチュウ"},
+        "dex_no": "0025",
+        "generation": 8,
+        "game": "ソード・シールド",
+        "event_name": "ベンチマーク配信",
+        "distribution": {
+            "method": "シリアルコード",
+            "location": "オンライン",
+            "start_date": "2024-01-01",
+        },
+        "level": 25,
+    }
+
+
+def seed_id(index: int) -> str:
+    return f"B{index:07d}"
+
+
+def seed_rows(count: int) -> list[list[Any]]:
+    """ヘッダー行 + count 行のデータ"""
+    template = pokemon_to_row(main.PokemonData.model_validate(bench_payload("")))
+    rows: list[list[Any]] = [list(SHEET_HEADERS)]
+    for index in range(count):
+        row = list(template)
+        row[0] = seed_id(index)
+        rows.append(row)
+    return rows
+
+
+def build_fake(config: BenchConfig) -> FakeSheetsService:
+    fake = FakeSheetsService(
+        latency=config.latency,
+        jitter=config.jitter,
+        latency_per_row=config.latency_per_row,
+        read_quota=config.read_quota,
+        write_quota=config.write_quota,
+        seed=config.seed,
+    )
+    db = main.DATABASES[DB_NAME]
+    fake.add_sheet(str(db["sheet_id"]), str(db["sheet_name"]), seed_rows(config.rows))
+    return fake
+
+
+@contextmanager
+def fake_backend(fake: FakeSheetsService, config: BenchConfig) -> Iterator[None]:
+    """APIのSheets呼び出しをフェイクへ向ける（キャッシュは前後でクリア）"""
+    scheduler = QuotaScheduler(
+        read_per_minute=config.read_quota or UNLIMITED,
+        write_per_minute=config.write_quota or UNLIMITED,
+    )
+    client = fake.client(scheduler)
+    settings = {"backend": "sheets", "sheet_mirror": False}
+    for cache in CACHES:
+        cache.clear()
+    try:
+        with patch.dict(main.DATABASES[DB_NAME], settings), patch.object(
+            main, "write_buffer", None
+        ), patch.object(main, "get_google_sheets_client", return_value=client):
+            yield
+    finally:
+        for cache in CACHES:
+            cache.clear()
+
+
+# (クライアント, 通し番号) → レスポンス（None なら送るリクエストがない）
+Operation = Callable[[httpx.AsyncClient, int], Optional[Awaitable[httpx.Response]]]
+
+
+def make_operation(scenario: str, config: BenchConfig) -> Operation:
+    rng = random.Random(config.seed)
+    base = f"/api/{DB_NAME}/data"
+
+    if scenario == "single_create":
+        return lambda client, i: client.post(base, json=bench_payload(f"N{i:07d}"))
+
+    if scenario == "bulk_create":
+
+        def bulk_create(client: httpx.AsyncClient, i: int) -> Awaitable[Any]:
+            items = [
+                bench_payload(f"M{i:05d}{j:04d}") for j in range(config.batch_size)
+            ]
+            return client.post(f"{base}/batch", json=items)
+
+        return bulk_create
+
+    if scenario == "paginated_read":
+        pages = max(1, math.ceil(config.rows / config.page_size))
+        return lambda client, i: client.get(
+            base,
+            params={"limit": config.page_size, "offset": i % pages * config.page_size},
+        )
+
+    if scenario == "lookup":
+        lookups = [seed_id(rng.randrange(config.rows)) for _ in range(1024)]
+        return lambda client, i: client.get(f"{base}/{lookups[i % len(lookups)]}")
+
+    if scenario == "delete":
+        # 同じ行を2度削除しないよう、シャッフルした順に1度ずつ削除する
+        order = list(range(config.rows))
+        rng.shuffle(order)
+
+        def delete(client: httpx.AsyncClient, i: int) -> Optional[Awaitable[Any]]:
+            if i >= len(order):
+                return None
+            return client.delete(f"{base}/{seed_id(order[i])}")
+
+        return delete
+
+    raise ValueError(f"未知のシナリオです: {scenario}")
+
+
+async def _drive(operation: Operation, config: BenchConfig) -> tuple[list[float], int]:
+    """config.concurrency 本のワーカーでリクエストを送り、所要時間を集める"""
+    latencies: list[float] = []
+    errors = 0
+    counter = itertools.count()
+    deadline = None
+    if config.duration is not None:
+        deadline = time.perf_counter() + config.duration
+
+    client = httpx.AsyncClient(app=main.app, base_url="http://benchmark")
+
+    async def worker() -> None:
+        nonlocal errors
+        while True:
+            index = next(counter)
+            if deadline is None and index >= config.requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            request = operation(client, index)
+            if request is None:
+                return
+            start = time.perf_counter()
+            response = await request
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    async with client:
+        await asyncio.gather(*(worker() for _ in range(config.concurrency)))
+    return latencies, errors
+
+
+def run_scenario(scenario: str, config: BenchConfig) -> ScenarioResult:
+    """フェイクのシートを用意し、1シナリオを計測する"""
+    fake = build_fake(config)
+    operation = make_operation(scenario, config)
+    with fake_backend(fake, config):
+        start = time.perf_counter()
+        latencies, errors = asyncio.run(_drive(operation, config))
+        elapsed = time.perf_counter() - start
+    return ScenarioResult(
+        scenario=scenario,
+        rows=config.rows,
+        concurrency=config.concurrency,
+        requests=len(latencies),
+        errors=errors,
+        elapsed=elapsed,
+        latencies=latencies,
+        sheets_calls=dict(fake.calls),
+        throttled=sum(fake.throttled.values()),
+    )
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float = 0.25,
+) -> list[str]:
+    """基準の結果と比べて悪化した項目を返す
+
+    p99 が基準の (1 + tolerance) 倍を超えた場合、リクエストあたりの
+    Sheets API呼び出し数・エラー数が増えた場合を悪化とみなす。
+    """
+    previous = {(r["scenario"], r["rows"], r["concurrency"]): r for r in baseline}
+    regressions: list[str] = []
+    for result in results:
+        key = (result["scenario"], result["rows"], result["concurrency"])
+        base = previous.get(key)
+        if base is None:
+            continue
+        name = f"{result['scenario']}@{result['rows']}"
+        if result["p99_ms"] > base["p99_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p99 {base['p99_ms']:.1f}ms → {result['p99_ms']:.1f}ms"
+            )
+        if result["calls_per_request"] > base["calls_per_request"] + 0.01:
+            regressions.append(
+                f"{name}: Sheets API呼び出し/リクエスト "
+                f"{base['calls_per_request']} → {result['calls_per_request']}"
+            )
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: エラー {base['errors']} → {result['errors']}")
+    return regressions
+
+
+def format_table(results: list[dict[str, Any]]) -> str:
+    header = (
+        f"{'scenario':<16}{'rows':>8}{'conc':>6}{'reqs':>7}{'err':>5}"
+        f"{'p50 ms':>10}{'p99 ms':>10}{'req/s':>10}{'calls/req':>11}"
+    )
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['scenario']:<16}{r['rows']:>8}{r['concurrency']:>6}"
+            f"{r['requests']:>7}{r['errors']:>5}{r['p50_ms']:>10.2f}"
+            f"{r['p99_ms']:>10.2f}{r['throughput']:>10.1f}"
+            f"{r['calls_per_request']:>11.2f}"
+        )
+    return "\n".join(lines)
@@ -7,12 +7,24 @@ GAS（Google Apps Script）からAPIへのデータ移行ツール
 import argparse
 import json
 import logging
+import os
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path
 
 import gspread
 import requests
 from oauth2client.service_account import ServiceAccountCredentials
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+# uv run を使わずに実行した場合もリポジトリの api パッケージを読み込めるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.schema import compile_decoder, record_to_row, row_to_pokemon  # noqa: E402
 
 # ログ設定
 logging.basicConfig(
@@ -20,6 +32,117 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 再試行するステータスコード（レート制限。受け付けられていないため再送してよい）
+RETRY_STATUSES = {429}
+
+# 登録は反映済みの可能性があるステータスコード（移行先を確認してから再送する）
+SERVER_ERROR_STATUSES = {500, 502, 503, 504}
+
+
+class AdaptiveRateLimiter:
+    """送信間隔を調整するレートリミッター（AIMD）
+
+    成功するたびに送信レートを少しずつ上げ、レート制限や一時的な障害が
+    返ったら半分に下げる。Retry-Afterが指定されていればその間は送信しない。
+    """
+
+    def __init__(
+        self,
+        rate,
+        min_rate=0.2,
+        max_rate=5.0,
+        step=0.2,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.step = step
+        self.rate = min(max(rate, min_rate), max_rate)
+        self._clock = clock
+        self._sleep = sleep
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """次の送信枠まで待つ"""
+        with self._lock:
+            now = self._clock()
+            start = max(now, self._next_at)
+            self._next_at = start + 1 / self.rate
+        if start > now:
+            self._sleep(start - now)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.step)
+
+    def on_throttle(self, retry_after=None):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._next_at = max(self._next_at, self._clock() + retry_after)
+
+
+def _not_sent(exc):
+    """リクエストを送信する前（接続の確立中）の失敗かどうか"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    # MaxRetryError の場合は reason に元の例外が入る
+    reason = getattr(reason, "reason", reason)
+    return isinstance(reason, NewConnectionError)
+
+
+def _retry_after(response):
+    """Retry-Afterヘッダーの秒数（なければNone）"""
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+class MigrationCheckpoint:
+    """送信済みの管理IDを記録するチェックポイント（JSON Lines、追記のみ）
+
+    バッチごとに成功した管理IDを追記してfsyncするため、途中で停止しても
+    ``--resume`` で続きから再開できる。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def load(self):
+        """記録済みの管理IDを読み込む"""
+        ids = set()
+        if not os.path.exists(self.path):
+            return ids
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ids.update(json.loads(line)["ids"])
+                except (json.JSONDecodeError, KeyError):
+                    # 書き込み途中で停止した最終行
+                    logger.warning("チェックポイントの壊れた行を読み飛ばしました")
+        return ids
+
+    def record(self, ids):
+        """送信に成功した管理IDを追記"""
+        if not ids:
+            return
+        entry = {"ids": list(ids), "at": datetime.now().isoformat()}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def reset(self):
+        """記録を消して最初から移行する"""
+        with self._lock:
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
 
 class GasToApiMigrator:
     def __init__(
@@ -39,6 +162,12 @@ class GasToApiMigrator:
         self.api_base_url = api_base_url
         self.database_name = database_name
 
+        # 全リクエストで接続を再利用する
+        self.session = requests.Session()
+        self.session.headers["Content-Type"] = "application/json"
+        self.rate_limiter = AdaptiveRateLimiter(rate=1.0)
+        self.max_retries = 5
+
         # Google Sheets クライアントを初期化
         self.gc = self._init_google_sheets()
 
@@ -80,6 +209,29 @@ class GasToApiMigrator:
             logger.error(f"データ取得エラー: {e}")
             raise
 
+    def get_source_rows(self, sheet_name="Sheet1"):
+        """
+        移行元スプレッドシートから行データを取得（1回のAPI呼び出し）
+
+        Args:
+            sheet_name: シート名
+
+        Returns:
+            tuple: (ヘッダー行, データ行のリスト)
+        """
+        try:
+            spreadsheet = self.gc.open_by_key(self.source_sheet_id)
+            sheet = spreadsheet.worksheet(sheet_name)
+
+            values = sheet.get_all_values()
+            headers, rows = (values[0], values[1:]) if values else ([], [])
+            logger.info(f"取得したレコード数: {len(rows)}")
+
+            return headers, rows
+        except Exception as e:
+            logger.error(f"データ取得エラー: {e}")
+            raise
+
     def transform_data(self, record):
         """
         GAS形式からAPI形式にデータを変換
@@ -91,53 +243,7 @@ class GasToApiMigrator:
             dict: API形式のデータ
         """
         try:
-            # 技リストの構築
-            moves = []
-            for i in range(1, 5):
-                move = record.get(f"技{i}", "").strip()
-                if move:
-                    moves.append(move)
-
-            # リボンリストの構築
-            ribbons = []
-            for i in range(1, 4):
-                ribbon = record.get(f"リボン{i}", "").strip()
-                if ribbon:
-                    ribbons.append(ribbon)
-
-            # API形式に変換
-            api_data = {
-                "id": record.get("管理ID", ""),
-                "name": {"ja": record.get("ポケモン名", "")},
-                "shiny": record.get("色違い", ""),
-                "dexNo": str(record.get("全国図鑑No", "")).zfill(4),
-                "generation": int(record.get("世代", 0)),
-                "game": record.get("ゲーム", ""),
-                "eventName": record.get("配信イベント名", ""),
-                "distribution": {
-                    "method": record.get("配信方法", ""),
-                    "location": record.get("配信場所", ""),
-                    "startDate": record.get("配信開始日", ""),
-                    "endDate": record.get("配信終了日", "") or None,
-                },
-                "otName": record.get("おやめい", ""),
-                "trainerId": record.get("ID", ""),
-                "metLocation": record.get("出会った場所", ""),
-                "ball": record.get("ボール", ""),
-                "level": int(record.get("レベル", 1)),
-                "ability": record.get("とくせい", ""),
-                "nature": record.get("せいかく", ""),
-                "gender": record.get("せいべつ", ""),
-                "gigantamax": record.get("キョダイマックス", ""),
-                "terastallize": record.get("テラスタイプ", ""),
-                "moves": moves,
-                "heldItem": record.get("持ち物", ""),
-                "ribbons": ribbons,
-                "otherInfo": record.get("その他特記事項", ""),
-                "timestamp": record.get("タイムスタンプ", datetime.now().isoformat()),
-            }
-
-            return api_data
+            return row_to_pokemon(record_to_row(record))
 
         except Exception as e:
             logger.error(f"データ変換エラー: {e}")
@@ -156,11 +262,10 @@ class GasToApiMigrator:
         """
         try:
             url = f"{self.api_base_url}/api/{self.database_name}/data"
-            headers = {"Content-Type": "application/json"}
+            response = self._post(url, data)
 
-            response = requests.post(url, json=data, headers=headers, timeout=30)
-
-            if response.status_code == 200:
+            # ライトビハインド有効時は202で受け付けられる
+            if response.status_code in (200, 202):
                 return response.json()
             else:
                 logger.error(f"API送信エラー: {response.status_code}")
@@ -171,83 +276,294 @@ class GasToApiMigrator:
             logger.error(f"API送信エラー: {e}")
             return None
 
-    def migrate_all_data(self, sheet_name="Sheet1", batch_size=10, delay=1):
+    def send_batch_to_api(self, items):
+        """
+        複数件を1回のリクエストで一括登録APIに送信
+
+        5xxの場合は登録が反映済みの可能性があるため、移行先の管理IDを
+        取得し直し、未登録の分だけを送り直す。
+
+        Args:
+            items: API形式のデータのリスト
+
+        Returns:
+            list: 1件ごとの (管理ID, 成功したか, エラーメッセージ)
+        """
+        outcomes = {}
+        pending = list(enumerate(items))
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self._send_items([item for _, item in pending])
+                if (
+                    response.status_code not in SERVER_ERROR_STATUSES
+                    or attempt == self.max_retries
+                ):
+                    break
+                logger.warning(
+                    f"登録状況を確認して再送します ({attempt + 1}/{self.max_retries}): "
+                    f"{response.status_code}"
+                )
+                self.rate_limiter.on_throttle(_retry_after(response))
+                registered = self.fetch_target_ids()
+            except Exception as e:
+                logger.error(f"API送信エラー: {e}")
+                for index, item in pending:
+                    outcomes[index] = (item["id"], False, f"API送信失敗: {e}")
+                return [outcomes[index] for index in range(len(items))]
+            for index, item in pending:
+                if str(item["id"]) in registered:
+                    outcomes[index] = (item["id"], True, None)
+            pending = [(i, item) for i, item in pending if i not in outcomes]
+            if not pending:
+                return [outcomes[index] for index in range(len(items))]
+
+        for (index, _), outcome in zip(pending, self._results(pending, response)):
+            outcomes[index] = outcome
+        return [outcomes[index] for index in range(len(items))]
+
+    def _send_items(self, items):
+        """1件は単体の登録API、複数件は一括登録APIに送信"""
+        if len(items) == 1:
+            url = f"{self.api_base_url}/api/{self.database_name}/data"
+            return self._post(url, items[0])
+        url = f"{self.api_base_url}/api/{self.database_name}/data/batch"
+        return self._post(url, items)
+
+    def _results(self, pending, response):
+        """レスポンスを送信した1件ごとの (管理ID, 成功したか, エラーメッセージ) にする"""
+        items = [item for _, item in pending]
+        # ライトビハインド有効時は単体の登録が202で受け付けられる
+        accepted = (200, 202) if len(items) == 1 else (200,)
+        if response.status_code not in accepted:
+            logger.error(f"API送信エラー: {response.status_code}")
+            logger.error(f"レスポンス: {response.text}")
+            message = f"API送信失敗 ({response.status_code})"
+            return [(item["id"], False, message) for item in items]
+
+        body = response.json()
+        if len(items) == 1:
+            if body.get("success"):
+                return [(items[0]["id"], True, None)]
+            return [(items[0]["id"], False, body.get("message", "不明なエラー"))]
+        return [
+            (
+                items[r["index"]]["id"],
+                r["success"],
+                None if r["success"] else "; ".join(r["errors"]),
+            )
+            for r in body["data"]["results"]
+        ]
+
+    def _post(self, url, payload):
+        """レートリミッターに従って送信し、レート制限時は間隔を空けて再試行
+
+        登録は冪等ではないため、再送するのは受け付けられていないことが
+        確実な場合（429・送信前の接続エラー）だけにする。
+        """
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.post(url, json=payload, timeout=30)
+            except requests.ConnectionError as e:
+                if attempt == self.max_retries or not _not_sent(e):
+                    raise
+                self.rate_limiter.on_throttle()
+                continue
+            if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                logger.warning(
+                    f"再試行します ({attempt + 1}/{self.max_retries}): "
+                    f"{response.status_code}"
+                )
+                self.rate_limiter.on_throttle(_retry_after(response))
+                continue
+            if response.status_code not in RETRY_STATUSES | SERVER_ERROR_STATUSES:
+                self.rate_limiter.on_success()
+            return response
+
+    def fetch_target_ids(self):
+        """
+        移行先に登録済みの管理IDを取得
+
+        Returns:
+            set: 管理IDの集合
+        """
+        # エクスポートAPIで全件を1回のリクエストで受け取る
+        url = f"{self.api_base_url}/api/{self.database_name}/export"
+        with self.session.get(
+            url, params={"format": "ndjson"}, stream=True, timeout=300
+        ) as response:
+            if response.status_code == 200:
+                return {
+                    str(json.loads(line).get("管理ID"))
+                    for line in response.iter_lines()
+                    if line
+                }
+
+        # エクスポートAPIがない場合はページングして取得
+        url = f"{self.api_base_url}/api/{self.database_name}/data"
+        ids = set()
+        params = {"limit": 1000}
+        while True:
+            response = self.session.get(url, params=params, timeout=60)
+            response.raise_for_status()
+            body = response.json()
+            ids.update(str(record.get("管理ID")) for record in body["data"])
+            if not body.get("next_cursor"):
+                return ids
+            params["cursor"] = body["next_cursor"]
+
+    def migrate_all_data(
+        self,
+        sheet_name="Sheet1",
+        batch_size=10,
+        delay=1,
+        workers=4,
+        max_rate=5.0,
+        checkpoint=None,
+        resume=False,
+    ):
         """
         全データを移行
 
         Args:
             sheet_name: 移行元のシート名
-            batch_size: バッチサイズ
-            delay: リクエスト間の待機時間（秒）
+            batch_size: 1回のリクエストで送信する件数
+            delay: 開始時のリクエスト間隔（秒）。以降は応答に応じて調整する
+            workers: 同時に送信するリクエスト数
+            max_rate: 1秒あたりの最大リクエスト数
+            checkpoint: 送信済みの管理IDを記録するチェックポイント
+            resume: チェックポイントと移行先に記録済みの管理IDを送信しない
 
         Returns:
             dict: 移行結果のサマリー
         """
         logger.info("データ移行を開始します...")
 
-        # 移行元データを取得
-        source_data = self.get_source_data(sheet_name)
+        # 移行元データを取得し、移行元の列順に合わせた変換関数を生成
+        headers, source_data = self.get_source_rows(sheet_name)
+        total = len(source_data)
+        if source_data and "管理ID" not in headers:
+            raise ValueError("移行元シートに 管理ID 列がありません")
+        decode = compile_decoder(headers)
+        id_position = headers.index("管理ID") if "管理ID" in headers else 0
+
+        skipped = 0
+        if resume:
+            # 送信済み・登録済みの管理IDを除いた差分だけを送る
+            sent_ids = checkpoint.load() if checkpoint is not None else set()
+            target_ids = self.fetch_target_ids()
+            logger.info(f"送信済み {len(sent_ids)}件、移行先に登録済み {len(target_ids)}件")
+            known_ids = sent_ids | target_ids
+            source_data = [
+                row
+                for row in source_data
+                if str(row[id_position] if row else "") not in known_ids
+            ]
+            skipped = total - len(source_data)
+            logger.info(f"未送信のレコード: {len(source_data)}件（スキップ {skipped}件）")
+        elif checkpoint is not None and os.path.exists(checkpoint.path):
+            logger.warning(f"前回のチェックポイントを破棄します（再開するには --resume）: {checkpoint.path}")
+            checkpoint.reset()
 
         if not source_data:
             logger.warning("移行するデータがありません")
-            return {"success": 0, "errors": 0, "total": 0}
+            return {
+                "success": 0,
+                "errors": 0,
+                "skipped": skipped,
+                "total": total,
+                "error_details": [],
+            }
 
         success_count = 0
         error_count = 0
         error_details = []
 
-        # バッチ処理
-        for i in range(0, len(source_data), batch_size):
-            batch = source_data[i : i + batch_size]
-            logger.info(
-                f"バッチ {i//batch_size + 1} を処理中... ({i+1}-{min(i+batch_size, len(source_data))}/{len(source_data)})"
-            )
+        # 同時送信数ぶんの接続をプールし、固定の待機の代わりにレートを調整する
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.rate_limiter = AdaptiveRateLimiter(
+            rate=1 / delay if delay > 0 else max_rate, max_rate=max_rate
+        )
 
-            for record in batch:
-                try:
-                    # データ変換
-                    api_data = self.transform_data(record)
-
-                    # API送信
-                    result = self.send_to_api(api_data)
-
-                    if result and result.get("success"):
-                        success_count += 1
-                        logger.info(f"成功: {api_data['id']}")
-                    else:
-                        error_count += 1
-                        error_msg = f"失敗: {api_data['id']} - {result.get('message', '不明なエラー') if result else 'API送信失敗'}"
-                        logger.error(error_msg)
-                        error_details.append(error_msg)
-
-                    # 待機
-                    time.sleep(delay)
-
-                except Exception as e:
-                    error_count += 1
-                    error_msg = f"処理エラー: {record.get('管理ID', 'ID不明')} - {str(e)}"
-                    logger.error(error_msg)
-                    error_details.append(error_msg)
+        batches = [
+            source_data[i : i + batch_size]
+            for i in range(0, len(source_data), batch_size)
+        ]
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(
+                    self._migrate_batch, batch, decode, id_position, checkpoint
+                )
+                for batch in batches
+            ]
+            for number, future in enumerate(as_completed(futures), 1):
+                succeeded, errors = future.result()
+                success_count += len(succeeded)
+                error_count += len(errors)
+                error_details.extend(errors)
+                done += len(succeeded) + len(errors)
+                logger.info(
+                    f"バッチ {number}/{len(batches)} 完了 "
+                    f"({done}/{len(source_data)}, 送信レート {self.rate_limiter.rate:.1f}/秒)"
+                )
 
         # 結果サマリー
         result_summary = {
             "success": success_count,
             "errors": error_count,
-            "total": len(source_data),
+            "skipped": skipped,
+            "total": total,
             "error_details": error_details,
         }
 
         logger.info(
-            f"移行完了: 成功 {success_count}, 失敗 {error_count}, 合計 {len(source_data)}"
+            f"移行完了: 成功 {success_count}, 失敗 {error_count}, "
+            f"スキップ {skipped}, 合計 {total}"
         )
 
         return result_summary
 
+    def _migrate_batch(self, batch, decode, id_position=0, checkpoint=None):
+        """
+        1バッチ分の行を変換して送信
+
+        Returns:
+            tuple: (成功した管理IDのリスト, エラーメッセージのリスト)
+        """
+        items = []
+        errors = []
+        for row in batch:
+            try:
+                items.append(decode(row))
+            except Exception as e:
+                item_id = row[id_position] if len(row) > id_position else "ID不明"
+                error_msg = f"処理エラー: {item_id} - {str(e)}"
+                logger.error(error_msg)
+                errors.append(error_msg)
+        if not items:
+            return [], errors
+
+        succeeded = []
+        for item_id, success, message in self.send_batch_to_api(items):
+            if success:
+                succeeded.append(item_id)
+                logger.debug(f"成功: {item_id}")
+            else:
+                error_msg = f"失敗: {item_id} - {message}"
+                logger.error(error_msg)
+                errors.append(error_msg)
+        if checkpoint is not None:
+            checkpoint.record(succeeded)
+        return succeeded, errors
+
     def validate_api_connection(self):
         """API接続を検証"""
         try:
             url = f"{self.api_base_url}/health"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, timeout=10)
 
             if response.status_code == 200:
                 logger.info("API接続テスト成功")
@@ -260,13 +576,18 @@ class GasToApiMigrator:
             logger.error(f"API接続テストエラー: {e}")
             return False
 
-    def backup_source_data(self, output_file="backup_data.json"):
-        """移行元データをバックアップ"""
+    def backup_source_data(self, output_file="backup_data.ndjson"):
+        """移行元データを1行1レコードのNDJSONでバックアップ
+
+        レコードを1件ずつ書き出し、全件の辞書やJSON文字列を作らない。
+        """
         try:
-            source_data = self.get_source_data()
+            headers, rows = self.get_source_rows()
 
             with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(source_data, f, ensure_ascii=False, indent=2)
+                for row in rows:
+                    record = dict(zip(headers, row))
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
 
             logger.info(f"バックアップ完了: {output_file}")
             return True
@@ -283,8 +604,20 @@ def main():
     parser.add_argument("--api-url", required=True, help="移行先APIのベースURL")
     parser.add_argument("--database", default="pokemon", help="移行先データベース名")
     parser.add_argument("--sheet-name", default="Sheet1", help="移行元シート名")
-    parser.add_argument("--batch-size", type=int, default=10, help="バッチサイズ")
-    parser.add_argument("--delay", type=float, default=1, help="リクエスト間の待機時間（秒）")
+    parser.add_argument("--batch-size", type=int, default=10, help="1回のリクエストで送信する件数")
+    parser.add_argument("--delay", type=float, default=1, help="開始時のリクエスト間隔（秒、以降は自動調整）")
+    parser.add_argument("--workers", type=int, default=4, help="同時に送信するリクエスト数")
+    parser.add_argument("--max-rate", type=float, default=5.0, help="1秒あたりの最大リクエスト数")
+    parser.add_argument(
+        "--checkpoint",
+        default="migration_checkpoint.jsonl",
+        help="送信済みの管理IDを記録するファイル",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="送信済み・移行先に登録済みの管理IDを除いて再開",
+    )
     parser.add_argument("--backup", action="store_true", help="移行前にバックアップを作成")
     parser.add_argument("--dry-run", action="store_true", help="実際の移行を行わずテストのみ実行")
 
@@ -326,7 +659,13 @@ def main():
 
     # 実際の移行を実行
     result = migrator.migrate_all_data(
-        sheet_name=args.sheet_name, batch_size=args.batch_size, delay=args.delay
+        sheet_name=args.sheet_name,
+        batch_size=args.batch_size,
+        delay=args.delay,
+        workers=args.workers,
+        max_rate=args.max_rate,
+        checkpoint=MigrationCheckpoint(args.checkpoint),
+        resume=args.resume,
     )
 
     # 結果を表示
@@ -335,6 +674,7 @@ def main():
     print("=" * 50)
     print(f"成功: {result['success']}")
     print(f"失敗: {result['errors']}")
+    print(f"スキップ: {result['skipped']}")
     print(f"合計: {result['total']}")
 
     if result["error_details"]:
@@ -0,0 +1,36 @@
+"""
+テスト共通設定
+"""
+
+import pytest
+
+from api.main import (
+    change_log,
+    header_guard,
+    pk_index,
+    record_cache,
+    search_indexes,
+    storage_backends,
+    worksheet_cache,
+)
+
+# テストごとに初期化するプロセス内キャッシュ
+CACHES = (
+    change_log,
+    record_cache,
+    pk_index,
+    header_guard,
+    search_indexes,
+    worksheet_cache,
+    storage_backends,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    """テスト間でキャッシュを共有しないようにする"""
+    for cache in CACHES:
+        cache.clear()
+    yield
+    for cache in CACHES:
+        cache.clear()
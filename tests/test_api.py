@@ -3,11 +3,28 @@
 APIのテストスクリプト
 """
 
+import asyncio
+import json
 from unittest.mock import Mock, patch
 
+import gspread
 from fastapi.testclient import TestClient
 
-from api.main import app
+from api.change_log import ChangeToken
+from api.main import (
+    DATABASES,
+    app,
+    change_log,
+    flush_pending_rows,
+    pk_index,
+    prewarm,
+    prewarm_steps,
+    record_cache,
+    sheets_scheduler,
+)
+from api.pk_index import FIRST_DATA_ROW
+from api.schema import SHEET_HEADERS
+from api.write_behind import WriteBehindBuffer, WriteJournal
 
 client = TestClient(app)
 
@@ -99,12 +116,18 @@ def test_invalid_pokemon_data() -> None:
 
 def test_get_pokemon_data_mock() -> None:
     """ポケモンデータ取得のテスト（モック使用）"""
-    with patch("api.main.get_google_sheets_client") as mock_get_client:
+    # スナップショットを読み込まない大きいデータベースとして扱う
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch(
+        "api.main.RECORD_CACHE_MAX_ROWS", 0
+    ):
         # モックの設定
         mock_sheet = Mock()
-        mock_sheet.get_all_records.return_value = [
-            {"管理ID": "08M01", "ポケモン名": "ピカチュウ", "全国図鑑No": "0025", "世代": 8}
+        # ヘッダー行と管理ID列、要求範囲の行
+        mock_sheet.batch_get.return_value = [
+            [["管理ID", "ポケモン名", "全国図鑑No", "世代"]],
+            [["管理ID"], ["08M01"]],
         ]
+        mock_sheet.get_values.return_value = [["08M01", "ピカチュウ", "0025", "8"]]
 
         mock_spreadsheet = Mock()
         mock_spreadsheet.worksheet.return_value = mock_sheet
@@ -125,6 +148,822 @@ def test_get_pokemon_data_mock() -> None:
         assert data["data"][0]["管理ID"] == "08M01"
 
 
+def test_get_pokemon_data_cached_mock() -> None:
+    """スナップショットキャッシュのテスト（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        record_cache.put(
+            "pokemon",
+            [{"管理ID": "08M01", "ポケモン名": "ピカチュウ", "全国図鑑No": 25, "世代": 8}],
+        )
+
+        # スナップショットがあればシートを読まずにメモリから返す
+        first = client.get("/api/pokemon/data")
+        second = client.get("/api/pokemon/data/08M01")
+        assert first.headers["X-Cache"] == "HIT"
+        assert second.headers["X-Cache"] == "HIT"
+        assert first.json()["data"][0]["管理ID"] == "08M01"
+        assert second.json()["data"]["ポケモン名"] == "ピカチュウ"
+        mock_get_client.assert_not_called()
+
+
+def test_get_pokemon_data_reads_through_small_sheet_mock() -> None:
+    """小さいデータベースは最初の読み取りでスナップショットを作ること（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.batch_get.return_value = [
+            [["管理ID", "ポケモン名"]],
+            [["管理ID"], ["08M01"], ["08M02"]],
+        ]
+        mock_sheet.get_all_records.return_value = [
+            {"管理ID": "08M01", "ポケモン名": "ピカチュウ"},
+            {"管理ID": "08M02", "ポケモン名": "イーブイ"},
+        ]
+        mock_client = Mock()
+        mock_client.open_by_key.return_value.worksheet.return_value = mock_sheet
+        mock_get_client.return_value = mock_client
+
+        first = client.get("/api/pokemon/data")
+        second = client.get("/api/pokemon/data/08M02")
+        third = client.get("/api/pokemon/data?limit=1&offset=1")
+
+        assert first.headers["X-Cache"] == "MISS"
+        assert [r["管理ID"] for r in first.json()["data"]] == ["08M01", "08M02"]
+        assert second.headers["X-Cache"] == "HIT"
+        assert second.json()["data"]["ポケモン名"] == "イーブイ"
+        assert third.headers["X-Cache"] == "HIT"
+        assert mock_sheet.get_all_records.call_count == 1
+        mock_sheet.get_values.assert_not_called()
+        mock_sheet.row_values.assert_not_called()
+
+
+def test_get_pokemon_data_range_mock() -> None:
+    """要求範囲の行だけを読み込むページネーションのテスト（モック使用）"""
+    # スナップショットを読み込まない大きいデータベースとして扱う
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch(
+        "api.main.RECORD_CACHE_MAX_ROWS", 0
+    ):
+        headers = ["管理ID", "ポケモン名"]
+        ids = [f"08M{i:02d}" for i in range(1, 26)]
+        rows = {FIRST_DATA_ROW + i: [item_id, "ピカチュウ"] for i, item_id in enumerate(ids)}
+
+        def get_values(a1_range: str) -> list:
+            first, last = (int(cell.lstrip("AB")) for cell in a1_range.split(":"))
+            return [rows[r] for r in range(first, last + 1)]
+
+        mock_sheet = Mock()
+        mock_sheet.batch_get.return_value = [[headers], [["管理ID"], *([i] for i in ids)]]
+        mock_sheet.get_values.side_effect = get_values
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        response = client.get("/api/pokemon/data?limit=10&offset=10")
+        data = response.json()
+        assert response.headers["X-Cache"] == "MISS"
+        assert data["total"] == 25
+        assert [r["管理ID"] for r in data["data"]] == ids[10:20]
+        mock_sheet.get_values.assert_called_with("A12:B21")
+        mock_sheet.get_all_records.assert_not_called()
+
+        # カーソルで次のページを取得（最後のページにはカーソルがない）
+        next_cursor = data["next_cursor"]
+        response = client.get(f"/api/pokemon/data?limit=10&cursor={next_cursor}")
+        data = response.json()
+        assert [r["管理ID"] for r in data["data"]] == ids[20:]
+        assert data["next_cursor"] is None
+        assert mock_sheet.batch_get.call_count == 1
+
+        assert client.get("/api/pokemon/data?cursor=broken").status_code == 400
+
+
+def test_get_and_delete_by_id_mock() -> None:
+    """主キーインデックスによる取得・削除のテスト（モック使用）"""
+    # スナップショットを読み込まない大きいデータベースとして扱う
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch(
+        "api.main.RECORD_CACHE_MAX_ROWS", 0
+    ):
+        mock_sheet = Mock()
+        # ヘッダー行と管理ID列（1回の batch_get で取得）
+        mock_sheet.batch_get.return_value = [
+            [["管理ID", "ポケモン名", "ID"]],
+            [["管理ID"], ["08M01"], ["08M02"]],
+        ]
+        mock_sheet.row_values.return_value = ["08M02", "イーブイ", "08M01"]
+        mock_sheet.cell.return_value = Mock(value="08M02")
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        # 対象行だけを読み込む
+        response = client.get("/api/pokemon/data/08M02")
+        assert response.status_code == 200
+        assert response.json()["data"]["ポケモン名"] == "イーブイ"
+        mock_sheet.row_values.assert_called_once_with(3)
+        mock_sheet.get_all_records.assert_not_called()
+
+        # 他の列（トレーナーID）に同じ値があっても管理IDの行を削除する
+        response = client.delete("/api/pokemon/data/08M02")
+        assert response.status_code == 200
+        mock_sheet.delete_rows.assert_called_once_with(3)
+        mock_sheet.find.assert_not_called()
+        assert mock_sheet.batch_get.call_count == 1
+
+        # 存在しないIDは404
+        mock_sheet.cell.return_value = Mock(value="08M01")
+        response = client.delete("/api/pokemon/data/08M02")
+        assert response.status_code == 404
+
+
+def test_delete_batch_mock() -> None:
+    """一括削除が1回のbatchUpdateで下の行から削除すること（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        ids = ["08M01", "08M02", "08M03", "08M04", "08M05"]
+        mock_sheet = Mock()
+        mock_sheet.id = 0
+        mock_sheet.batch_get.return_value = [
+            [["管理ID", "ポケモン名"]],
+            [["管理ID"], *([i] for i in ids)],
+        ]
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        record_cache.put("pokemon", [{"管理ID": i} for i in ids])
+        response = client.post(
+            "/api/pokemon/data/batch-delete",
+            json=["08M02", "08M05", "08M03", "08X99"],
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is False
+        assert data["data"] == {
+            "deleted": ["08M02", "08M05", "08M03"],
+            "missing": ["08X99"],
+        }
+
+        # 連続する行はまとめ、下の行から削除する
+        body = mock_sheet.spreadsheet.batch_update.call_args.args[0]
+        ranges = [
+            (r["startIndex"], r["endIndex"])
+            for r in (req["deleteDimension"]["range"] for req in body["requests"])
+        ]
+        assert ranges == [(5, 6), (2, 4)]
+        mock_sheet.spreadsheet.batch_update.assert_called_once()
+        mock_sheet.delete_rows.assert_not_called()
+
+        snapshot = record_cache.get("pokemon")
+        assert [r["管理ID"] for r in snapshot.records] == ["08M01", "08M04"]
+
+        too_many = ["08M01"] * 1001
+        response = client.post("/api/pokemon/data/batch-delete", json=too_many)
+        assert response.status_code == 413
+
+
+def _pokemon_payload(item_id: str) -> dict:
+    return {
+        "id": item_id,
+        "name": {"ja": "ピカチュウ"},
+        "dex_no": "0025",
+        "generation": 8,
+        "game": "ソード・シールド",
+        "event_name": "テストイベント",
+        "distribution": {
+            "method": "シリアルコード",
+            "location": "テスト会場",
+            "start_date": "2024-01-01",
+        },
+        "level": 25,
+    }
+
+
+def test_header_check_is_memoized_mock() -> None:
+    """ヘッダー行の確認は初回の書き込みだけ行うこと（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        for item_id in ("08M01", "08M02", "08M03"):
+            response = client.post("/api/pokemon/data", json=_pokemon_payload(item_id))
+            assert response.status_code == 200
+
+        mock_sheet.row_values.assert_called_once_with(1)
+        assert mock_sheet.append_row.call_count == 3
+
+
+def test_header_mismatch_does_not_clear_mock() -> None:
+    """ヘッダー行が異なるシートを消去しないこと（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = ["別の", "ヘッダー"]
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        response = client.post("/api/pokemon/data", json=_pokemon_payload("08M01"))
+
+        assert response.status_code == 409
+        mock_sheet.clear.assert_not_called()
+        mock_sheet.append_row.assert_not_called()
+
+
+def test_create_batch_mock() -> None:
+    """一括作成のテスト（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        items = [
+            _pokemon_payload("08M01"),
+            {"id": "08M02", "name": {"ja": "イーブイ"}},
+            _pokemon_payload("08M03"),
+            _pokemon_payload("08M01"),
+        ]
+        response = client.post("/api/pokemon/data/batch", json=items)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["success"] is False
+        assert data["data"]["saved"] == 2
+        assert data["data"]["failed"] == 2
+        results = data["data"]["results"]
+        assert [r["success"] for r in results] == [True, False, True, False]
+        assert results[1]["errors"]
+
+        # 検証に通った行だけを1回で書き込む
+        mock_sheet.append_rows.assert_called_once()
+        rows = mock_sheet.append_rows.call_args[0][0]
+        assert [row[0] for row in rows] == ["08M01", "08M03"]
+        mock_sheet.append_row.assert_not_called()
+
+
+def test_write_behind_retry_after_applied_append_mock(tmp_path) -> None:
+    """反映後に例外になった書き込みを、再試行で重複させないこと（モック使用）"""
+    sheet_ids = ["08M00"]
+
+    def append_rows(rows: list) -> dict:
+        # シートには反映されたが、レスポンスの受信に失敗した
+        sheet_ids.extend(str(row[0]) for row in rows)
+        raise RuntimeError("500 Internal error")
+
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+        mock_sheet.append_rows.side_effect = append_rows
+        mock_sheet.batch_get.side_effect = lambda ranges: [
+            [list(SHEET_HEADERS)],
+            [["管理ID"], *([i] for i in sheet_ids)],
+        ]
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        buffer = WriteBehindBuffer(
+            WriteJournal(str(tmp_path / "journal.jsonl")),
+            flush_pending_rows,
+            flush_size=100,
+            flush_interval=3600,
+        )
+        with patch("api.main.write_buffer", buffer):
+            response = client.post("/api/pokemon/data", json=_pokemon_payload("08M01"))
+            ticket = response.json()["data"]["ticket"]
+
+            assert buffer.flush() is False
+            assert buffer.flush() is True
+
+        # 2回目は管理ID列で反映済みを確認し、書き込み直さない
+        mock_sheet.append_rows.assert_called_once()
+        assert sheet_ids == ["08M00", "08M01"]
+        assert buffer.status(ticket)["status"] == "committed"
+        assert change_log.head("pokemon") == 1
+
+
+def test_create_write_behind_mock(tmp_path) -> None:
+    """ライトビハインド有効時は受け付けだけ行うこと（モック使用）"""
+    writer = Mock()
+    buffer = WriteBehindBuffer(
+        WriteJournal(str(tmp_path / "journal.jsonl")),
+        writer,
+        flush_size=100,
+        flush_interval=3600,
+    )
+
+    with patch("api.main.write_buffer", buffer):
+        response = client.post("/api/pokemon/data", json=_pokemon_payload("08M01"))
+        assert response.status_code == 202
+        ticket = response.json()["data"]["ticket"]
+
+        status = client.get(f"/api/pokemon/writes/{ticket}")
+        assert status.json()["data"]["status"] == "pending"
+
+        buffer.flush()
+        status = client.get(f"/api/pokemon/writes/{ticket}")
+        assert status.json()["data"]["status"] == "committed"
+        assert writer.call_args[0][1][0].row[0] == "08M01"
+
+        assert client.get("/api/pokemon/writes/unknown").status_code == 404
+    buffer.stop()
+
+
+def test_get_pokemon_data_filtered_mock() -> None:
+    """世代・日付範囲での絞り込みのテスト（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.get_all_records.return_value = [
+            {"管理ID": "08M01", "世代": 8, "配信開始日": "2021-07-01"},
+            {"管理ID": "09M01", "世代": 9, "配信開始日": "2023-02-27"},
+            {"管理ID": "08M02", "世代": 8, "配信開始日": "2020-11-20"},
+        ]
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        response = client.get("/api/pokemon/data?generation=8")
+        data = response.json()
+        assert [r["管理ID"] for r in data["data"]] == ["08M01", "08M02"]
+        assert data["total"] == 2
+
+        response = client.get("/api/pokemon/data?start_from=2021-01-01")
+        assert [r["管理ID"] for r in response.json()["data"]] == ["08M01", "09M01"]
+        assert response.headers["X-Cache"] == "HIT"
+        assert mock_sheet.get_all_records.call_count == 1
+
+        response = client.get("/api/pokemon/data?start_from=tomorrow")
+        assert response.status_code == 400
+
+
+def test_search_pokemon_data_mock() -> None:
+    """全文検索と作成時の索引更新のテスト（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.get_all_records.return_value = [
+            {"管理ID": "08M01", "ポケモン名": "ピカチュウ", "配信イベント名": "映画2021"},
+            {"管理ID": "08M02", "ポケモン名": "イーブイ", "配信イベント名": "センター"},
+        ]
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        response = client.get("/api/pokemon/search", params={"q": "ぴかちゅう"})
+        assert [r["管理ID"] for r in response.json()["data"]] == ["08M01"]
+
+        # 作成したデータはシートを読み直さずに検索できる
+        client.post("/api/pokemon/data", json=_pokemon_payload("08M03"))
+        response = client.get("/api/pokemon/search", params={"q": "ピカチュウ"})
+        assert [r["管理ID"] for r in response.json()["data"]] == ["08M01", "08M03"]
+        assert mock_sheet.get_all_records.call_count == 1
+
+
+def test_conditional_get_mock() -> None:
+    """ETagが一致すればシートを読まずに304を返すテスト（モック使用）"""
+    # スナップショットを読み込まない大きいデータベースとして扱う
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch(
+        "api.main.RECORD_CACHE_MAX_ROWS", 0
+    ):
+        headers = ["管理ID", "ポケモン名", "全国図鑑No", "世代"]
+        mock_sheet = Mock()
+        mock_sheet.get_all_records.return_value = [
+            {"管理ID": "08M01", "ポケモン名": "ピカチュウ", "全国図鑑No": 25, "世代": 8},
+        ]
+        mock_sheet.batch_get.return_value = [[headers], [["管理ID"], ["08M01"]]]
+        mock_sheet.get_values.return_value = [["08M01", "ピカチュウ", "25", "8"]]
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+        mock_get_client.return_value = mock_client
+
+        # 範囲読み込みでもスナップショットと同じ内容ならETagは同じになる
+        first = client.get("/api/pokemon/data")
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "private, no-cache"
+        mock_sheet.get_all_records.assert_not_called()
+
+        # 条件付きGETはスナップショットを読み込み、以降はメモリだけで判定する
+        for _ in range(3):
+            response = client.get("/api/pokemon/data", headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.headers["ETag"] == etag
+            assert response.content == b""
+        assert mock_sheet.get_all_records.call_count == 1
+
+        item = client.get("/api/pokemon/data/08M01")
+        response = client.get(
+            "/api/pokemon/data/08M01", headers={"If-None-Match": item.headers["ETag"]}
+        )
+        assert response.status_code == 304
+
+        # データが変われば新しい内容を返す
+        client.post("/api/pokemon/data", json=_pokemon_payload("08M02"))
+        response = client.get("/api/pokemon/data", headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+        assert len(response.json()["data"]) == 2
+
+
+def test_export_streams_row_chunks_mock() -> None:
+    """行範囲ごとに読み込んでエクスポートするテスト（モック使用）"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch(
+        "api.main.EXPORT_CHUNK_SIZE", 2
+    ):
+        headers = ["管理ID", "ポケモン名"]
+        ids = [f"08M{i:02d}" for i in range(1, 6)]
+        rows = {FIRST_DATA_ROW + i: [item_id, "ピカチュウ"] for i, item_id in enumerate(ids)}
+
+        def get_values(a1_range: str) -> list:
+            first, last = (int(cell.lstrip("AB")) for cell in a1_range.split(":"))
+            return [rows[r] for r in range(first, last + 1) if r in rows]
+
+        mock_sheet = Mock()
+        mock_sheet.batch_get.return_value = [[headers], [["管理ID"], *([i] for i in ids)]]
+        mock_sheet.get_values.side_effect = get_values
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        response = client.get("/api/pokemon/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = response.text.splitlines()
+        assert [json.loads(line)["管理ID"] for line in lines] == ids
+        assert [c.args[0] for c in mock_sheet.get_values.call_args_list] == [
+            "A2:B3",
+            "A4:B5",
+            "A6:B7",
+        ]
+        mock_sheet.get_all_records.assert_not_called()
+
+        # gzip圧縮したCSV（クライアント側で展開される）
+        response = client.get("/api/pokemon/export?format=csv&gzip=true")
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text.lstrip("\ufeff").splitlines()[0] == "管理ID,ポケモン名"
+        assert len(response.text.splitlines()) == 6
+
+        assert client.get("/api/pokemon/export?format=xml").status_code == 400
+
+
+def test_sqlite_backend_mock(tmp_path) -> None:
+    """SQLiteを保存先にした場合はシートにアクセスしないこと（モック使用）"""
+    config = {"backend": "sqlite", "sqlite_path": str(tmp_path / "pokemon.sqlite3")}
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch.dict(
+        DATABASES["pokemon"], config
+    ):
+        response = client.post("/api/pokemon/data", json=_pokemon_payload("08M01"))
+        assert response.json()["success"] is True
+        client.post("/api/pokemon/data/batch", json=[_pokemon_payload("08M02")])
+
+        record_cache.clear()
+        response = client.get("/api/pokemon/data?limit=1")
+        assert response.json()["total"] == 2
+        assert response.json()["data"][0]["管理ID"] == "08M01"
+        response = client.get("/api/pokemon/data/08M02")
+        assert response.json()["data"]["ポケモン名"] == "ピカチュウ"
+        assert client.delete("/api/pokemon/data/08M01").status_code == 200
+        assert client.get("/api/pokemon/data").json()["total"] == 1
+        mock_get_client.assert_not_called()
+
+
+def test_quota_exhaustion_degrades_mock() -> None:
+    """クォータ超過時は期限切れのデータで応答し、なければ503を返すこと"""
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        throttled = Mock(status_code=429, headers={"Retry-After": "7"}, text="")
+        throttled.json.return_value = {"error": {"code": 429}}
+        mock_sheet = Mock()
+        mock_sheet.get_all_records.side_effect = gspread.exceptions.APIError(throttled)
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        response = client.get("/api/pokemon/search", params={"q": "ピカチュウ"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+
+        # 読み取りが混雑している間は期限切れのスナップショットを使う
+        record_cache.put("pokemon", [{"管理ID": "08M01", "ポケモン名": "ピカチュウ"}])
+        with patch.object(record_cache, "ttl", 0), patch.object(
+            sheets_scheduler, "congested", return_value=True
+        ):
+            response = client.get("/api/pokemon/search", params={"q": "ピカチュウ"})
+        assert response.status_code == 200
+        assert [r["管理ID"] for r in response.json()["data"]] == ["08M01"]
+        assert mock_sheet.get_all_records.call_count == 1
+
+        assert "quota" in client.get("/health").json()
+
+
+def test_write_server_error_is_not_retryable_mock() -> None:
+    """書き込みの5xxは再試行を促さない502、429はRetry-After付きの503を返すこと"""
+
+    def api_error(status: int) -> gspread.exceptions.APIError:
+        response = Mock(status_code=status, headers={"Retry-After": "3"}, text="")
+        response.json.return_value = {"error": {"code": status}}
+        return gspread.exceptions.APIError(response)
+
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        mock_sheet.append_row.side_effect = api_error(500)
+        response = client.post("/api/pokemon/data", json=_pokemon_payload("08M01"))
+        assert response.status_code == 502
+        assert "Retry-After" not in response.headers
+
+        mock_sheet.append_row.side_effect = api_error(429)
+        response = client.post("/api/pokemon/data", json=_pokemon_payload("08M01"))
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "3"
+
+
+def test_pokedex_endpoints() -> None:
+    """図鑑の入力補完・図鑑No検索と、登録時の照合のテスト"""
+    response = client.get("/api/pokedex/autocomplete", params={"q": "ぴかちゅ"})
+    assert response.status_code == 200
+    names = [entry["name"] for entry in response.json()["data"]]
+    assert "ピカチュウ" in names
+
+    response = client.get("/api/pokedex/25")
+    assert response.json()["data"][0] == {
+        "dex_no": "0025",
+        "name": "ピカチュウ",
+        "generation": "第一世代",
+    }
+    assert client.get("/api/pokedex/9999").status_code == 404
+
+    # 図鑑Noが名前と一致しないデータは登録前に弾く
+    payload = _pokemon_payload("08M01")
+    payload["dex_no"] = "0026"
+    response = client.post("/api/pokemon/data", json=payload)
+    assert response.status_code == 422
+
+
+def test_pokedex_json_is_precompressed() -> None:
+    """図鑑データのJSONを圧縮済みの内容で返し、ETagで304を返すこと"""
+    response = client.get("/pokemon_data.json", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert any(entry["name"] == "ピカチュウ" for entry in response.json())
+
+    etag = response.headers["ETag"]
+    response = client.get("/pokemon_data.json", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_metrics_endpoint_mock() -> None:
+    """Sheets API呼び出しを含むリクエストがメトリクスに反映されること"""
+    # スナップショットを読み込まない大きいデータベースとして扱う
+    with patch("api.main.get_google_sheets_client") as mock_get_client, patch(
+        "api.main.RECORD_CACHE_MAX_ROWS", 0
+    ):
+        mock_sheet = Mock()
+        mock_sheet.batch_get.return_value = [
+            [["管理ID", "ポケモン名", "全国図鑑No", "世代"]],
+            [["管理ID"], ["08M01"]],
+        ]
+        mock_sheet.get_values.return_value = [["08M01", "ピカチュウ", "0025", "8"]]
+        mock_client = Mock()
+        mock_client.open_by_key.return_value.worksheet.return_value = mock_sheet
+        mock_get_client.return_value = mock_client
+
+        response = client.get("/api/pokemon/data")
+        assert response.status_code == 200
+        assert response.headers["Server-Timing"].startswith("total;dur=")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain")
+    body = response.text
+    assert (
+        'http_requests_total{method="GET",route="/api/{db_name}/data",'
+        'db="pokemon",status="200"}' in body
+    )
+    assert "http_request_duration_seconds_bucket" in body
+    assert 'sheets_quota_tokens{kind="read"}' in body
+
+
+def test_prewarm_primes_caches_mock() -> None:
+    """事前準備で認証・主キーインデックス・スナップショットを用意し、
+    完了までは /health が503を返すこと"""
+    mock_sheet = Mock()
+    mock_sheet.batch_get.return_value = [
+        [["管理ID", "ポケモン名"]],
+        [["管理ID"], ["08M01"]],
+    ]
+    mock_sheet.get_all_records.return_value = [{"管理ID": "08M01"}]
+    mock_client = Mock()
+    mock_client.open_by_key.return_value.worksheet.return_value = mock_sheet
+
+    with patch("api.main.get_google_sheets_client", return_value=mock_client), patch(
+        "api.main.client_manager"
+    ) as mock_manager, patch.dict(DATABASES["pokemon"], {"backend": "sheets"}):
+        prewarm.state = prewarm.RUNNING
+        response = client.get("/health")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+        asyncio.run(prewarm.run(prewarm_steps()))
+
+    assert mock_manager.get_client.call_count == 1
+    assert prewarm.stats()["errors"] == {}
+    assert pk_index.get("pokemon", mock_sheet).lookup("08M01") == 2
+    assert record_cache.get("pokemon") is not None
+    assert client.get("/health").status_code == 200
+
+
+def test_change_feed_mock() -> None:
+    """作成・削除が変更フィードに流れ、別プロセスのトークンは走査になること（モック使用）"""
+    seeded = [
+        {"管理ID": "08M01", "タイムスタンプ": "2024-01-01T00:00:00"},
+        {"管理ID": "08M02", "タイムスタンプ": "2024-01-02T00:00:00"},
+    ]
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.id = 0
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+        mock_sheet.batch_get.return_value = [
+            [list(SHEET_HEADERS)],
+            [["管理ID"], ["08M01"], ["08M02"], ["08M03"]],
+        ]
+
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+
+        mock_get_client.return_value = mock_client
+
+        record_cache.put("pokemon", seeded)
+
+        # トークンなしはタイムスタンプ順に全件を返す
+        feed = client.get("/api/pokemon/changes").json()["data"]
+        assert feed["mode"] == "scan"
+        assert [c["id"] for c in feed["changes"]] == ["08M01", "08M02"]
+        assert feed["ids"] == ["08M01", "08M02"]
+        since = feed["next"]
+
+        client.post("/api/pokemon/data/batch", json=[_pokemon_payload("08M03")])
+        client.post("/api/pokemon/data/batch-delete", json=["08M01"])
+
+        feed = client.get("/api/pokemon/changes", params={"since": since}).json()
+        feed = feed["data"]
+        assert feed["mode"] == "log"
+        assert [(c["op"], c["id"]) for c in feed["changes"]] == [
+            ("create", "08M03"),
+            ("delete", "08M01"),
+        ]
+        assert feed["changes"][0]["record"]["管理ID"] == "08M03"
+        assert "ids" not in feed
+
+        # 以降の変更がなければ空
+        latest = client.get("/api/pokemon/changes", params={"since": feed["next"]})
+        assert latest.json()["data"]["changes"] == []
+        token = ChangeToken.decode(feed["next"])
+        assert token.seq == change_log.head("pokemon")
+
+        # 再起動後のトークンは前回の位置から走査し、削除は全管理IDで照合する
+        foreign = ChangeToken("restarted", 1, "2024-01-02T00:00:00.000000")
+        feed = client.get(
+            "/api/pokemon/changes", params={"since": foreign.encode(), "limit": 1}
+        ).json()["data"]
+        assert feed["mode"] == "scan"
+        assert [c["id"] for c in feed["changes"]] == ["08M02"]
+        assert feed["has_more"] is True
+        assert "ids" not in feed
+
+        feed = client.get(
+            "/api/pokemon/changes", params={"since": feed["next"], "limit": 1}
+        ).json()["data"]
+        assert [c["id"] for c in feed["changes"]] == ["08M03"]
+        assert feed["has_more"] is False
+        assert feed["ids"] == ["08M02", "08M03"]
+
+    response = client.get("/api/pokemon/changes", params={"since": "不正"})
+    assert response.status_code == 400
+    response = client.get("/api/unknown/changes")
+    assert response.status_code == 404
+
+
+def test_change_feed_log_mode_includes_other_writers_mock() -> None:
+    """変更履歴にない行（別インスタンス・シートへの直接の追加）も返すこと（モック使用）"""
+    seeded = [{"管理ID": "08M01", "タイムスタンプ": "2024-01-01T00:00:00"}]
+    with patch("api.main.get_google_sheets_client") as mock_get_client:
+        mock_sheet = Mock()
+        mock_sheet.id = 0
+        mock_sheet.row_count = 1000
+        mock_sheet.row_values.return_value = list(SHEET_HEADERS)
+        mock_sheet.batch_get.return_value = [
+            [list(SHEET_HEADERS)],
+            [["管理ID"], ["08M01"], ["08M02"]],
+        ]
+        mock_spreadsheet = Mock()
+        mock_spreadsheet.worksheet.return_value = mock_sheet
+        mock_client = Mock()
+        mock_client.open_by_key.return_value = mock_spreadsheet
+        mock_get_client.return_value = mock_client
+
+        record_cache.put("pokemon", seeded)
+        since = client.get("/api/pokemon/changes").json()["data"]["next"]
+        client.post("/api/pokemon/data/batch", json=[_pokemon_payload("08M02")])
+        local = record_cache.get("pokemon").records[-1]
+
+        # 再読み込みしたスナップショットに、別インスタンスが書き込んだ行が現れた
+        # （このプロセスでの書き込みより古いタイムスタンプ）
+        other = {"管理ID": "08X01", "タイムスタンプ": "2024-01-02T00:00:00"}
+        record_cache.put("pokemon", [*seeded, other, local])
+
+        feed = client.get("/api/pokemon/changes", params={"since": since}).json()
+        feed = feed["data"]
+        assert feed["mode"] == "log"
+        assert [(c["op"], c["id"]) for c in feed["changes"]] == [
+            ("create", "08M02"),
+            ("create", "08X01"),
+        ]
+        assert ChangeToken.decode(feed["next"]).watermark == (
+            "2024-01-02T00:00:00.000000"
+        )
+
+        latest = client.get("/api/pokemon/changes", params={"since": feed["next"]})
+        assert latest.json()["data"]["changes"] == []
+
+
 if __name__ == "__main__":
     print("APIテストを実行中...")
 
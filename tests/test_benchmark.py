@@ -0,0 +1,93 @@
+"""
+ベンチマーク（Google Sheetsのフェイク）のテスト
+主要な処理のSheets API呼び出し回数が増えていないことも確認する
+"""
+
+import gspread
+import pytest
+
+from api.quota import QuotaScheduler
+from benchmarks.fake_sheets import FakeSheetsService
+from benchmarks.runner import SCENARIOS, BenchConfig, compare, run_scenario
+
+# 1リクエストあたりのSheets API呼び出し（シートを開く・索引を作る初回分を除く）
+CALLS_PER_REQUEST = {
+    "single_create": {"values.append": 1},
+    "bulk_create": {"values.append": 1},
+    "paginated_read": {"values.get": 1},
+    "lookup": {"values.get": 1},
+    "delete": {"values.get": 1, "batchUpdate": 1},
+}
+
+
+def test_fake_sheets_round_trip() -> None:
+    """gspreadから読み書き・行削除ができること"""
+    fake = FakeSheetsService()
+    fake.add_sheet("key", rows=[["管理ID", "名前"], ["a", "x"], ["b", "y"]])
+    sheet = fake.client().open_by_key("key").worksheet("Sheet1")
+
+    assert sheet.batch_get(["1:1", "A:A"])[1] == [["管理ID"], ["a"], ["b"]]
+    response = sheet.append_rows([["c", "z"]])
+    assert response["updates"]["updatedRange"] == "'Sheet1'!A4:B4"
+    sheet.delete_rows(2)
+
+    assert sheet.get_values("A2:B3") == [["b", "y"], ["c", "z"]]
+    assert sheet.get_all_records()[0] == {"管理ID": "b", "名前": "y"}
+    assert fake.calls["values.append"] == 1
+
+
+def test_fake_sheets_quota() -> None:
+    """クォータを超えた呼び出しに429を返し、スケジューラーが再試行すること"""
+    now = [0.0]
+    fake = FakeSheetsService(read_quota=1, clock=lambda: now[0])
+    fake.add_sheet("key", rows=[["管理ID"]])
+
+    def sleep(seconds: float) -> None:
+        now[0] += seconds
+
+    scheduler = QuotaScheduler(
+        max_retries=1, base_delay=60, max_delay=60, sleep=sleep, rng=lambda: 1.0
+    )
+    spreadsheet = fake.client(scheduler).open_by_key("key")
+    # 2回目は429になり、60秒待って再試行すると成功する
+    spreadsheet.worksheet("Sheet1")
+    assert fake.throttled["spreadsheets.get"] == 1
+    assert now[0] >= 60
+
+    with pytest.raises(gspread.exceptions.APIError) as excinfo:
+        fake.client(QuotaScheduler(max_retries=0)).open_by_key("key")
+    assert excinfo.value.response.status_code == 429
+
+
+@pytest.mark.parametrize("scenario", SCENARIOS)
+def test_scenario_sheets_calls(scenario: str) -> None:
+    """各シナリオがエラーなく、想定した回数だけSheets APIを呼ぶこと"""
+    config = BenchConfig(rows=200, requests=20, batch_size=10, page_size=20)
+    result = run_scenario(scenario, config)
+
+    assert result.errors == 0
+    assert result.requests == 20
+    calls = dict(result.sheets_calls)
+    for operation, count in CALLS_PER_REQUEST[scenario].items():
+        assert calls.pop(operation, 0) - count * result.requests <= 1
+    # 残りはシートを開く・索引を作る初回の呼び出しだけ
+    assert sum(calls.values()) <= 3
+    assert 0 < result.percentile(50) <= result.percentile(99)
+
+
+def test_compare_reports_regressions() -> None:
+    """p99・呼び出し数・エラー数の悪化を検出すること"""
+    base = {
+        "scenario": "lookup",
+        "rows": 1000,
+        "concurrency": 1,
+        "p99_ms": 10.0,
+        "calls_per_request": 1.0,
+        "errors": 0,
+    }
+    assert compare([dict(base, p99_ms=12.0)], [base]) == []
+    regressions = compare(
+        [dict(base, p99_ms=20.0, calls_per_request=2.0, errors=1)], [base]
+    )
+    assert len(regressions) == 3
+    assert compare([dict(base, rows=10)], [base]) == []
@@ -0,0 +1,72 @@
+"""
+変更履歴のテスト
+"""
+
+import pytest
+
+from api.change_log import CREATE, DELETE, ChangeLog, ChangeToken, scan_lower_bound
+
+
+def test_since_returns_changes_after_seq() -> None:
+    """通し番号より後の変更だけを追記順に返すこと"""
+    log = ChangeLog()
+    log.append("pokemon", CREATE, [("08M01", {"管理ID": "08M01"}), ("08M02", {})])
+    log.append("pokemon", DELETE, [("08M01", None)])
+
+    assert log.head("pokemon") == 3
+    assert [c.seq for c in log.since("pokemon", 0)] == [1, 2, 3]
+    changes = log.since("pokemon", 1)
+    assert [c.to_dict() for c in changes] == [
+        {"op": "create", "id": "08M02", "record": {}},
+        {"op": "delete", "id": "08M01"},
+    ]
+    assert log.since("pokemon", 3) == []
+    # データベースごとに別の通し番号
+    assert log.head("cards") == 0
+    assert log.since("cards", 0) == []
+
+
+def test_since_detects_gaps() -> None:
+    """履歴から押し出された位置・未来の位置はNoneを返すこと"""
+    log = ChangeLog(capacity=2)
+    log.append("pokemon", CREATE, [(f"08M0{i}", {}) for i in range(1, 5)])
+
+    assert [c.item_id for c in log.since("pokemon", 2)] == ["08M03", "08M04"]
+    assert log.since("pokemon", 1) is None
+    assert log.since("pokemon", 5) is None
+    assert log.since("pokemon", -1) is None
+
+
+def test_created_tracks_retained_creates() -> None:
+    """履歴に残っている作成の管理IDだけを返すこと"""
+    log = ChangeLog(capacity=2)
+    log.append("pokemon", CREATE, [("08M01", {}), ("08M02", {})])
+    log.append("pokemon", DELETE, [("08M02", None)])
+
+    # 08M01の作成は履歴から押し出された
+    assert log.created("pokemon", ["08M01", "08M02", "08M03"]) == {"08M02"}
+    assert log.created("cards", ["08M02"]) == set()
+    log.clear()
+    assert log.created("pokemon", ["08M02"]) == set()
+    assert log.head("pokemon") == 0
+
+
+def test_token_round_trip() -> None:
+    """トークンを文字列にして戻せること・不正な文字列はValueErrorになること"""
+    token = ChangeToken("abc", 12, "2024-01-01T00:00:00.000000")
+    assert ChangeToken.decode(token.encode()) == token
+    assert ChangeToken.decode(ChangeToken("abc", None, None).encode()).seq is None
+
+    with pytest.raises(ValueError):
+        ChangeToken.decode("not-a-token")
+    with pytest.raises(ValueError):
+        ChangeToken.decode(ChangeToken("abc", 1, None).encode()[:-4])
+
+
+def test_scan_lower_bound() -> None:
+    """走査の下限を overlap 秒さかのぼること"""
+    assert scan_lower_bound(None, 60) is None
+    assert (
+        scan_lower_bound("2024-01-01T00:01:00.000000", 60)
+        == "2024-01-01T00:00:00.000000"
+    )
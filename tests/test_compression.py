@@ -0,0 +1,116 @@
+"""
+レスポンス圧縮のテスト
+"""
+
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from api.compression import (
+    BROTLI,
+    GZIP,
+    CompressionMiddleware,
+    StaticAsset,
+    negotiate_encoding,
+)
+
+BODY = "配信イベント名,ポケモン名\n" * 200
+
+
+def _client() -> TestClient:
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY.encode("utf-8")
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/encoded")
+    async def encoded():
+        body = gzip.compress(BODY.encode("utf-8"))
+        return PlainTextResponse(body, headers={"Content-Encoding": "gzip"})
+
+    @app.get("/image")
+    async def image():
+        return PlainTextResponse(BODY, media_type="image/png")
+
+    return TestClient(app)
+
+
+def test_negotiate_encoding() -> None:
+    """q値が最も高く、使える形式を選ぶこと"""
+    both = (BROTLI, GZIP)
+    assert negotiate_encoding("gzip, deflate, br", both) == BROTLI
+    assert negotiate_encoding("gzip, deflate, br", (GZIP,)) == GZIP
+    assert negotiate_encoding("br;q=0.5, gzip", both) == GZIP
+    assert negotiate_encoding("gzip;q=0", both) is None
+    assert negotiate_encoding("*", (GZIP,)) == GZIP
+    assert negotiate_encoding("", both) is None
+
+
+def test_compresses_large_responses_only() -> None:
+    """最小サイズ以上・圧縮できる形式のレスポンスだけを圧縮すること"""
+    client = _client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/large", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) < len(BODY.encode("utf-8"))
+    assert response.text == BODY
+
+    assert "Content-Encoding" not in client.get("/small", headers=headers).headers
+    assert "Content-Encoding" not in client.get("/image", headers=headers).headers
+    identity = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in identity.headers
+
+
+def test_streaming_and_precompressed_responses() -> None:
+    """ストリーミングは逐次圧縮し、圧縮済みのレスポンスは二重に圧縮しないこと"""
+    client = _client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/stream", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert response.text == BODY * 3
+
+    response = client.get("/encoded", headers=headers)
+    assert response.text == BODY
+
+
+def test_static_asset_is_compressed_once() -> None:
+    """静的データは形式ごとに1度だけ圧縮して再利用すること"""
+    asset = StaticAsset(BODY.encode("utf-8"), "text/csv")
+    asset.prepare()
+
+    encoding, body = asset.select("gzip")
+    assert encoding == GZIP
+    assert gzip.decompress(body) == asset.body
+    assert asset.select("gzip")[1] is body
+    assert asset.select("identity") == (None, asset.body)
+
+
+def test_brotli_when_available() -> None:
+    """Brotliが使える場合はBrotliを優先すること"""
+    pytest.importorskip("brotli")
+    client = _client()
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == BROTLI
+    assert response.text == BODY
@@ -0,0 +1,36 @@
+"""
+条件付きGET（ETag）のテスト
+"""
+
+from api.etag import compute_etag, etag_matches, memoized_etag
+
+
+def test_compute_etag_depends_on_content() -> None:
+    """内容が同じなら同じETag、変われば別のETagになること"""
+    payload = {"success": True, "data": [{"管理ID": "08M01", "世代": 8}]}
+    same = {"data": [{"世代": 8, "管理ID": "08M01"}], "success": True}
+
+    assert compute_etag(payload) == compute_etag(same)
+    assert compute_etag(payload) != compute_etag({"success": True, "data": []})
+    assert compute_etag(payload).startswith('"')
+
+
+def test_etag_matches() -> None:
+    """If-None-Matchのリスト・弱いETag・ワイルドカードを扱えること"""
+    etag = '"abc"'
+
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('"xyz", "abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"xyz"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_memoized_etag_reuses_value() -> None:
+    """同じキーでは内容を再ハッシュしないこと"""
+    memo: dict = {}
+    first = memoized_etag(memo, "key", {"a": 1})
+
+    assert memoized_etag(memo, "key", {"a": 2}) == first
+    assert memoized_etag(memo, "other", {"a": 2}) != first
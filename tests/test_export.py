@@ -0,0 +1,58 @@
+"""
+エクスポートのテスト
+"""
+
+import asyncio
+import gzip
+import json
+
+from api.export import CsvEncoder, encode_ndjson, stream_export
+
+RECORDS = [
+    {"管理ID": "08M01", "ポケモン名": "ピカチュウ", "その他特記事項": "映画, 2021"},
+    {"管理ID": "08M02", "ポケモン名": "イーブイ", "その他特記事項": ""},
+]
+
+
+async def _chunks(chunks: list) -> object:
+    for chunk in chunks:
+        yield chunk
+
+
+def _collect(*args, **kwargs) -> bytes:
+    async def run() -> bytes:
+        return b"".join([body async for body in stream_export(*args, **kwargs)])
+
+    return asyncio.run(run())
+
+
+def test_encode_ndjson() -> None:
+    """1行1件のJSONになること"""
+    lines = encode_ndjson(RECORDS).decode("utf-8").splitlines()
+
+    assert [json.loads(line) for line in lines] == RECORDS
+
+
+def test_csv_encoder_quotes_and_orders_columns() -> None:
+    """列順を固定し、カンマを含む値を引用符で囲むこと"""
+    encoder = CsvEncoder(["管理ID", "その他特記事項"])
+
+    assert encoder.header().decode("utf-8") == "\ufeff管理ID,その他特記事項\r\n"
+    assert encoder.encode(RECORDS).decode("utf-8") == ('08M01,"映画, 2021"\r\n08M02,\r\n')
+
+
+def test_stream_export_gzip() -> None:
+    """チャンクをまたいでも1つのgzipストリームになること"""
+    headers = list(RECORDS[0])
+    body = _collect(_chunks([RECORDS[:1], RECORDS[1:]]), "csv", headers, True)
+
+    lines = gzip.decompress(body).decode("utf-8-sig").splitlines()
+    assert lines[0] == "管理ID,ポケモン名,その他特記事項"
+    assert len(lines) == 3
+
+
+def test_stream_export_empty_csv_has_header() -> None:
+    """0件でもCSVのヘッダー行は出力すること"""
+    body = _collect(_chunks([]), "csv", ["管理ID"])
+
+    assert body.decode("utf-8-sig") == "管理ID\r\n"
@@ -0,0 +1,64 @@
+"""
+起動時間（重い依存の遅延読み込み）のテスト
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import gspread
+
+from api.lazy_imports import DEFERRED_MODULES, is_error
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# api.main の読み込みにかけてよい時間（秒、遅い環境では環境変数で調整する）
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "3.0"))
+
+_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import api.main
+elapsed = time.perf_counter() - start
+deferred = {DEFERRED_MODULES!r}
+loaded = sorted(
+    m for m in sys.modules if any(m == d or m.startswith(d + ".") for d in deferred)
+)
+print(json.dumps({{"seconds": elapsed, "loaded": loaded}}))
+"""
+
+
+def _import_main() -> dict:
+    """新しいプロセスで api.main を読み込む"""
+    result = subprocess.run(
+        [sys.executable, "-c", _SCRIPT],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_import_defers_sheets_stack() -> None:
+    """起動時に gspread・oauth2client・requests・google-auth を読み込まず、
+    読み込み時間が予算内であること"""
+    result = _import_main()
+
+    assert result["loaded"] == []
+    assert result["seconds"] < IMPORT_TIME_BUDGET, (
+        f"api.main の読み込みに {result['seconds']:.2f}秒かかりました"
+        f"（予算 {IMPORT_TIME_BUDGET}秒、python -X importtime で内訳を確認）"
+    )
+
+
+def test_is_error_matches_loaded_exceptions() -> None:
+    """読み込み済みのモジュールの例外だけを判定すること"""
+    error = gspread.exceptions.WorksheetNotFound("Sheet1")
+
+    assert is_error(error, "gspread.exceptions", "WorksheetNotFound")
+    assert not is_error(error, "gspread.exceptions", "APIError")
+    assert not is_error(ValueError(), "gspread.exceptions", "APIError")
+    assert not is_error(error, "not_loaded_module", "WorksheetNotFound")
@@ -0,0 +1,97 @@
+"""
+メトリクスのテスト
+"""
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.metrics import (
+    Counter,
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    TimedJSONResponse,
+    http_requests,
+    record_timing,
+    registry,
+    sheets_operation,
+)
+
+SHEETS = "https://sheets.googleapis.com/v4/spreadsheets/abc"
+
+
+def test_render_counter_and_histogram() -> None:
+    """カウンターとヒストグラムをテキスト形式で出力すること"""
+    registry = MetricsRegistry()
+    calls = registry.register(Counter("calls_total", "呼び出し数", ("op",)))
+    duration = registry.register(
+        Histogram("duration_seconds", "所要時間", ("op",), buckets=(0.1, 1.0))
+    )
+    registry.add_gauge_callback("queue", "待ち数", ("db",), lambda: [({"db": "a"}, 3)])
+
+    calls.inc(op="get")
+    calls.inc(2, op="get")
+    duration.observe(0.05, op="get")
+    duration.observe(0.5, op="get")
+    duration.observe(5, op="get")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE calls_total counter" in lines
+    assert 'calls_total{op="get"} 3' in lines
+    assert 'duration_seconds_bucket{op="get",le="0.1"} 1' in lines
+    assert 'duration_seconds_bucket{op="get",le="1"} 2' in lines
+    assert 'duration_seconds_bucket{op="get",le="+Inf"} 3' in lines
+    assert 'duration_seconds_count{op="get"} 3' in lines
+    assert 'queue{db="a"} 3' in lines
+    assert duration.count(op="get") == 3
+
+
+def test_sheets_operation() -> None:
+    """URLからSheets APIの操作名を判定すること"""
+    assert sheets_operation("get", f"{SHEETS}/values/Sheet1!A1:Z10") == "values.get"
+    assert sheets_operation("post", f"{SHEETS}/values/Sheet1:append") == (
+        "values.append"
+    )
+    assert sheets_operation("get", f"{SHEETS}/values:batchGet") == "values.batchGet"
+    assert sheets_operation("post", f"{SHEETS}:batchUpdate") == "batchUpdate"
+    assert sheets_operation("get", SHEETS) == "spreadsheets.get"
+    assert sheets_operation("get", "https://www.googleapis.com/drive/v3/files") == (
+        "drive"
+    )
+
+
+def test_middleware_adds_server_timing() -> None:
+    """ルートごとに計測し、内訳を Server-Timing ヘッダーで返すこと"""
+    app = FastAPI(default_response_class=TimedJSONResponse)
+    app.add_middleware(MetricsMiddleware, databases={"pokemon"})
+
+    @app.get("/api/{db_name}/items")
+    def items(db_name: str):
+        record_timing("sheets.values.get", 0.012)
+        record_timing("sheets.values.get", 0.003)
+        return {"db": db_name}
+
+    client = TestClient(app)
+    response = client.get("/api/pokemon/items")
+
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("total;dur=")
+    assert 'sheets.values.get;dur=15.0;desc="x2"' in timing
+    # JSONへの変換はSheets APIの呼び出しと分けて記録する
+    assert "serialize;dur=" in timing
+    assert client.get("/missing").status_code == 404
+
+    labels = {"method": "GET", "db": "pokemon", "status": 200}
+    assert http_requests.value(route="/api/{db_name}/items", **labels) >= 1
+    assert http_requests.value(method="GET", route="unmatched", db="", status=404)
+
+    # 未知のデータベース名はラベルの系列を増やさない
+    for name in ("random0", "random1"):
+        client.get(f"/api/{name}/items")
+    assert (
+        http_requests.value(
+            method="GET", route="/api/{db_name}/items", db="unknown", status=200
+        )
+        == 2
+    )
+    assert "random0" not in registry.render()
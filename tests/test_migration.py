@@ -0,0 +1,229 @@
+"""
+データ移行ツールのテスト
+"""
+
+import importlib.util
+import json
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+_PATH = Path(__file__).resolve().parent.parent / "migration" / "gas-to-api.py"
+_spec = importlib.util.spec_from_file_location("gas_to_api", _PATH)
+gas_to_api = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(gas_to_api)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _migrator() -> "gas_to_api.GasToApiMigrator":
+    with patch.object(gas_to_api.GasToApiMigrator, "_init_google_sheets"):
+        return gas_to_api.GasToApiMigrator("creds.json", "sheet", "http://api")
+
+
+def _response(status_code: int, body: dict = None, headers: dict = None) -> Mock:
+    response = Mock(status_code=status_code, headers=headers or {}, text="")
+    response.json.return_value = body or {}
+    return response
+
+
+def test_rate_limiter_spaces_and_adapts() -> None:
+    """成功でレートを上げ、レート制限で半分にしてRetry-Afterを守ること"""
+    clock = FakeClock()
+    limiter = gas_to_api.AdaptiveRateLimiter(
+        rate=1.0, max_rate=4.0, step=1.0, clock=clock, sleep=clock.sleep
+    )
+
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.slept == [1.0]
+
+    limiter.on_success()
+    limiter.on_success()
+    assert limiter.rate == 3.0
+    limiter.on_throttle(retry_after=5)
+    assert limiter.rate == 1.5
+    limiter.acquire()
+    assert clock.now == 6.0
+
+
+def test_migrate_sends_batches_and_retries() -> None:
+    """batch_size件ずつ一括登録APIに送信し、429は再試行すること"""
+    migrator = _migrator()
+    rows = [[f"08M{i:02d}", "8", "50"] for i in range(5)]
+    migrator.get_source_rows = Mock(return_value=(["管理ID", "世代", "レベル"], rows))
+
+    def batch_result(items: list, fail_id: str = None) -> dict:
+        results = [
+            {
+                "index": i,
+                "id": item["id"],
+                "success": item["id"] != fail_id,
+                "errors": [] if item["id"] != fail_id else ["重複"],
+            }
+            for i, item in enumerate(items)
+        ]
+        return {"success": True, "data": {"results": results}}
+
+    throttled = []
+
+    def post(url: str, json: object, timeout: float) -> Mock:
+        if url.endswith("/data"):
+            return _response(200, {"success": True})
+        if not throttled:
+            throttled.append(url)
+            return _response(429, headers={"Retry-After": "0"})
+        return _response(200, batch_result(json, fail_id="08M01"))
+
+    migrator.session.post = Mock(side_effect=post)
+
+    result = migrator.migrate_all_data(batch_size=2, delay=0, workers=2, max_rate=1000)
+
+    assert result["total"] == 5
+    assert result["success"] == 4
+    assert result["errors"] == 1
+    assert "08M01" in result["error_details"][0]
+    urls = [c.args[0] for c in migrator.session.post.call_args_list]
+    # 2件ずつ3回（1回は再試行）、最後の1件は単体のAPI
+    assert urls.count("http://api/api/pokemon/data/batch") == 3
+    assert urls.count("http://api/api/pokemon/data") == 1
+
+
+def test_server_error_resends_only_missing_items() -> None:
+    """5xxは再送せず、移行先に登録されていない分だけを送り直すこと"""
+    migrator = _migrator()
+    migrator.rate_limiter = gas_to_api.AdaptiveRateLimiter(rate=1000, max_rate=1000)
+    items = [{"id": f"08M{i:02d}"} for i in range(3)]
+    migrator.fetch_target_ids = Mock(return_value={"08M00", "08M02"})
+    migrator.session.post = Mock(
+        side_effect=[_response(500), _response(200, {"success": True})]
+    )
+
+    results = migrator.send_batch_to_api(items)
+
+    assert results == [
+        ("08M00", True, None),
+        ("08M01", True, None),
+        ("08M02", True, None),
+    ]
+    calls = migrator.session.post.call_args_list
+    assert calls[0].kwargs["json"] == items
+    # 反映済みの2件は送らず、残りの1件だけを単体のAPIで送り直す
+    assert calls[1].args[0] == "http://api/api/pokemon/data"
+    assert calls[1].kwargs["json"] == {"id": "08M01"}
+
+
+def test_post_does_not_retry_sent_request() -> None:
+    """送信後のタイムアウトは再送せず、接続前の失敗だけを再試行すること"""
+    migrator = _migrator()
+    migrator.rate_limiter = gas_to_api.AdaptiveRateLimiter(rate=1000, max_rate=1000)
+    migrator.session.post = Mock(side_effect=gas_to_api.requests.ReadTimeout())
+
+    results = migrator.send_batch_to_api([{"id": "08M00"}, {"id": "08M01"}])
+
+    assert [success for _, success, _ in results] == [False, False]
+    assert migrator.session.post.call_count == 1
+
+    migrator.session.post = Mock(
+        side_effect=[
+            gas_to_api.requests.ConnectTimeout(),
+            _response(200, {"success": True}),
+        ]
+    )
+    assert migrator.send_batch_to_api([{"id": "08M00"}]) == [("08M00", True, None)]
+    assert migrator.session.post.call_count == 2
+
+
+def test_checkpoint_records_ids(tmp_path) -> None:
+    """送信済みの管理IDを追記し、壊れた最終行は読み飛ばすこと"""
+    path = tmp_path / "checkpoint.jsonl"
+    checkpoint = gas_to_api.MigrationCheckpoint(str(path))
+    checkpoint.record(["08M01", "08M02"])
+    checkpoint.record([])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"ids": ["08M0')
+
+    assert checkpoint.load() == {"08M01", "08M02"}
+    checkpoint.reset()
+    assert checkpoint.load() == set()
+
+
+def test_resume_sends_only_delta(tmp_path) -> None:
+    """チェックポイントと移行先の管理IDを除いた差分だけを送信すること"""
+    migrator = _migrator()
+    rows = [[f"08M{i:02d}", "8", "50"] for i in range(5)]
+    migrator.get_source_rows = Mock(return_value=(["管理ID", "世代", "レベル"], rows))
+    checkpoint = gas_to_api.MigrationCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    checkpoint.record(["08M00"])
+
+    export = _response(200)
+    export.iter_lines.return_value = [b'{"\\u7ba1\\u7406ID": "08M01"}', b""]
+    export.__enter__ = Mock(return_value=export)
+    export.__exit__ = Mock(return_value=False)
+    migrator.session.get = Mock(return_value=export)
+    migrator.session.post = Mock(return_value=_response(200, {"success": True}))
+
+    result = migrator.migrate_all_data(
+        batch_size=1, delay=0, max_rate=1000, checkpoint=checkpoint, resume=True
+    )
+
+    assert result["skipped"] == 2
+    assert result["success"] == 3
+    sent = [c.kwargs["json"]["id"] for c in migrator.session.post.call_args_list]
+    assert sorted(sent) == ["08M02", "08M03", "08M04"]
+    assert checkpoint.load() == {"08M00", "08M02", "08M03", "08M04"}
+
+    # 全件送信済みなら何も送らない
+    migrator.session.post.reset_mock()
+    result = migrator.migrate_all_data(checkpoint=checkpoint, resume=True)
+    assert result["skipped"] == 5
+    migrator.session.post.assert_not_called()
+
+
+def test_backup_writes_ndjson(tmp_path) -> None:
+    """移行元データを1行1レコードのNDJSONで書き出すこと"""
+    migrator = _migrator()
+    rows = [["08M00", "8"], ["08M01", "8"]]
+    migrator.get_source_rows = Mock(return_value=(["管理ID", "世代"], rows))
+    path = tmp_path / "backup.ndjson"
+
+    assert migrator.backup_source_data(str(path)) is True
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == [
+        {"管理ID": "08M00", "世代": "8"},
+        {"管理ID": "08M01", "世代": "8"},
+    ]
+
+
+def test_transform_data_matches_api_model() -> None:
+    """変換結果がAPIのモデル（snake_case）で検証できること"""
+    from api.main import PokemonData
+
+    record = {
+        "管理ID": "08M01",
+        "ポケモン名": "ピカチュウ",
+        "全国図鑑No": 25,
+        "世代": 8,
+        "配信イベント名": "映画",
+        "配信開始日": "2024-01-01",
+        "レベル": 25,
+        "技1": "10まんボルト",
+    }
+
+    data = PokemonData.model_validate(_migrator().transform_data(record))
+
+    assert data.dex_no == "0025"
+    assert data.event_name == "映画"
+    assert data.distribution.start_date == "2024-01-01"
+    assert data.moves == ["10まんボルト"]
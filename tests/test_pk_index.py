@@ -0,0 +1,104 @@
+"""
+主キーインデックスのテスト
+"""
+
+from unittest.mock import Mock
+
+from api.pk_index import PrimaryKeyIndex, appended_row_number
+
+
+def _mock_sheet(ids: list[str]) -> Mock:
+    sheet = Mock()
+    sheet.batch_get.return_value = [
+        [["管理ID", "ポケモン名"]],
+        [["管理ID"], *([item_id] if item_id else [] for item_id in ids)],
+    ]
+    return sheet
+
+
+def test_appended_row_number() -> None:
+    """append_row のレスポンスから行番号を取り出せること"""
+    response = {"updates": {"updatedRange": "Sheet1!A12:AE12"}}
+
+    assert appended_row_number(response) == 12
+    assert appended_row_number({}) is None
+    assert appended_row_number(Mock()) is None
+
+
+def test_build_from_id_column() -> None:
+    """A列の値から行番号を割り当てること（空行も行番号に数える）"""
+    index = PrimaryKeyIndex().build("pokemon", _mock_sheet(["08M01", "", "08M03"]))
+
+    assert index.headers == ["管理ID", "ポケモン名"]
+    assert index.lookup("08M01") == 2
+    assert index.lookup("08M03") == 4
+
+
+def test_append_and_delete_keep_rows_in_sync() -> None:
+    """追加・削除で行番号が追従すること"""
+    indexes = PrimaryKeyIndex()
+    sheet = _mock_sheet(["08M01", "08M02", "08M03"])
+    indexes.build("pokemon", sheet)
+
+    indexes.on_delete("pokemon", 3)
+    indexes.on_append("pokemon", "08M04", 4)
+    index = indexes.get("pokemon", sheet)
+
+    assert index.lookup("08M01") == 2
+    assert index.lookup("08M02") is None
+    assert index.lookup("08M03") == 3
+    assert index.lookup("08M04") == 4
+    assert sheet.batch_get.call_count == 1
+
+
+def test_delete_rows_shift_remaining_rows() -> None:
+    """複数行の削除で、残りの行番号が削除した行数ぶん詰められること"""
+    indexes = PrimaryKeyIndex()
+    sheet = _mock_sheet(["08M01", "08M02", "08M03", "08M04", "08M05"])
+    indexes.build("pokemon", sheet)
+
+    indexes.on_delete_rows("pokemon", [5, 3])
+    index = indexes.get("pokemon", sheet)
+
+    assert index.lookup("08M01") == 2
+    assert index.lookup("08M02") is None
+    assert index.lookup("08M03") == 3
+    assert index.lookup("08M04") is None
+    assert index.lookup("08M05") == 4
+    assert index.row_count == 3
+
+
+def test_resolve_rebuilds_stale_index() -> None:
+    """行の内容が一致しない場合は再構築してやり直すこと"""
+    indexes = PrimaryKeyIndex()
+    sheet = _mock_sheet(["08M01", "08M02"])
+    indexes.build("pokemon", sheet)
+
+    # シート上で08M01が外部から削除された
+    sheet.batch_get.return_value = [[["管理ID"]], [["管理ID"], ["08M02"]]]
+    actual = {2: "08M02"}
+
+    row = indexes.resolve("pokemon", sheet, "08M02", lambda r: actual.get(r) == "08M02")
+
+    assert row == 2
+    assert sheet.batch_get.call_count == 2
+
+
+def test_resolve_miss_rebuilds_at_most_once_per_interval() -> None:
+    """インデックスにない管理IDは再構築して確認し、再構築は間隔を空けること"""
+    now = [0.0]
+    indexes = PrimaryKeyIndex(ttl=60, clock=lambda: now[0], miss_rebuild_interval=5)
+    sheet = _mock_sheet(["08M01"])
+    indexes.build("pokemon", sheet)
+
+    # 構築直後の未登録は再構築しない
+    for _ in range(3):
+        assert indexes.resolve("pokemon", sheet, "08M99", lambda r: True) is None
+    assert sheet.batch_get.call_count == 1
+
+    # 別インスタンスが追加した行は、間隔を空けた次の未登録で反映される
+    sheet.batch_get.return_value = [[["管理ID"]], [["管理ID"], ["08M01"], ["08M99"]]]
+    now[0] = 5.0
+    assert indexes.resolve("pokemon", sheet, "08M99", lambda r: True) == 3
+    assert indexes.resolve("pokemon", sheet, "08M98", lambda r: True) is None
+    assert sheet.batch_get.call_count == 2
@@ -0,0 +1,60 @@
+"""
+ポケモン図鑑データのテスト
+"""
+
+from api.pokedex import DEFAULT_POKEDEX_PATH, DexEntry, Pokedex, load_pokedex
+
+
+def _pokedex() -> Pokedex:
+    return Pokedex(
+        [
+            DexEntry(25, "ピカチュウ", "第一世代"),
+            DexEntry(25, "ピカチュウ(相棒)", "第一世代"),
+            DexEntry(172, "ピチュー", "第二世代"),
+            DexEntry(6, "リザードン", "第一世代"),
+            DexEntry(6, "メガリザードンX", "第一世代"),
+        ]
+    )
+
+
+def test_complete_matches_prefix_across_kana() -> None:
+    """ひらがな・半角カナでも前方一致すること"""
+    pokedex = _pokedex()
+
+    assert [e.name for e in pokedex.complete("ぴか")] == ["ピカチュウ", "ピカチュウ(相棒)"]
+    assert [e.name for e in pokedex.complete("ﾋﾟ")] == [
+        "ピカチュウ",
+        "ピカチュウ(相棒)",
+        "ピチュー",
+    ]
+    assert [e.name for e in pokedex.complete("ピ", limit=1)] == ["ピカチュウ"]
+    assert pokedex.complete("ミュウ") == []
+    assert pokedex.complete("  ") == []
+
+
+def test_lookup_and_validate() -> None:
+    """図鑑Noで引けて、名前と図鑑Noの不一致を検出すること"""
+    pokedex = _pokedex()
+
+    assert [e.name for e in pokedex.lookup(6)] == ["リザードン", "メガリザードンX"]
+    assert pokedex.lookup(999) == []
+    assert pokedex.lookup(25)[0].to_dict() == {
+        "dex_no": "0025",
+        "name": "ピカチュウ",
+        "generation": "第一世代",
+    }
+
+    assert pokedex.validate("ピカチュウ", "0025") is None
+    assert pokedex.validate("ぴかちゅう", "25") is None
+    assert "0025" in pokedex.validate("ピカチュウ", "0026")
+    assert pokedex.validate("ピカチュウ", "abc") is not None
+    assert pokedex.validate("ピカチュー", "0025") is not None
+
+
+def test_load_bundled_pokedex(tmp_path) -> None:
+    """同梱の図鑑データを読み込めること（ファイルがなければ空）"""
+    pokedex = load_pokedex(DEFAULT_POKEDEX_PATH)
+
+    assert len(pokedex) > 1000
+    assert pokedex.validate("ミュウ", "0151") is None
+    assert len(load_pokedex(tmp_path / "missing.json")) == 0
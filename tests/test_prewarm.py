@@ -0,0 +1,56 @@
+"""
+起動時の事前準備のテスト
+"""
+
+import asyncio
+
+from api.prewarm import Prewarm
+
+
+def test_runs_steps_and_records_failures() -> None:
+    """全ての処理を順に実行し、失敗した処理があっても最後まで続けること"""
+    calls: list[str] = []
+
+    async def step(name: str) -> None:
+        calls.append(name)
+
+    async def fail() -> None:
+        raise RuntimeError("認証に失敗しました")
+
+    prewarm = Prewarm()
+    assert prewarm.ready
+
+    asyncio.run(
+        prewarm.run(
+            [
+                ("auth", fail),
+                ("pokemon.index", lambda: step("index")),
+                ("pokemon.records", lambda: step("records")),
+            ]
+        )
+    )
+
+    assert calls == ["index", "records"]
+    assert prewarm.ready
+    stats = prewarm.stats()
+    assert stats["state"] == Prewarm.FAILED
+    assert stats["errors"] == {"auth": "認証に失敗しました"}
+    assert set(stats["durations"]) == {"auth", "pokemon.index", "pokemon.records"}
+
+
+def test_not_ready_until_finished() -> None:
+    """バックグラウンドで実行し、完了するまでは準備中であること"""
+
+    async def scenario() -> None:
+        release = asyncio.Event()
+        prewarm = Prewarm()
+        prewarm.start([("auth", release.wait)])
+        await asyncio.sleep(0)
+        assert not prewarm.ready
+
+        release.set()
+        await prewarm.wait()
+        assert prewarm.ready
+        assert prewarm.state == Prewarm.DONE
+
+    asyncio.run(scenario())
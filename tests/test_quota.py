@@ -0,0 +1,135 @@
+"""
+Sheets APIクォータ管理のテスト
+"""
+
+from unittest.mock import Mock
+
+import gspread
+import pytest
+import requests
+from google.oauth2.credentials import Credentials
+
+from api.quota import READ, WRITE, QuotaScheduler, TokenBucket, backoff_delay
+from api.scheduled_client import ScheduledClient
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.slept: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def _api_error(status_code: int, headers: dict = None) -> gspread.exceptions.APIError:
+    response = Mock(status_code=status_code, headers=headers or {}, text="")
+    response.json.return_value = {"error": {"code": status_code}}
+    return gspread.exceptions.APIError(response)
+
+
+def _scheduler(clock: FakeClock, **kwargs) -> QuotaScheduler:
+    options = {"read_per_minute": 60, "write_per_minute": 60, "burst": 2}
+    options.update(kwargs)
+    return QuotaScheduler(clock=clock, sleep=clock.sleep, rng=lambda: 1.0, **options)
+
+
+def test_token_bucket_bursts_then_spaces_requests() -> None:
+    """burst件までは待たず、以降は補充間隔ごとに予約されること"""
+    clock = FakeClock()
+    bucket = TokenBucket(per_minute=60, burst=2, clock=clock)
+
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+
+    clock.now = 10.0
+    assert bucket.available() == 2
+
+
+def test_backoff_delay_is_capped_full_jitter() -> None:
+    """待ち時間が 0〜min(上限, base×2^attempt) に収まること"""
+    assert backoff_delay(0, base=1.0, cap=8.0, rng=lambda: 1.0) == 1.0
+    assert backoff_delay(2, base=1.0, cap=8.0, rng=lambda: 0.5) == 2.0
+    assert backoff_delay(10, base=1.0, cap=8.0, rng=lambda: 1.0) == 8.0
+    assert backoff_delay(3, rng=lambda: 0.0) == 0.0
+
+
+def test_reads_retry_transient_errors() -> None:
+    """読み取りは5xx・接続エラーを再試行すること"""
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    func = Mock(side_effect=[_api_error(503), requests.ConnectionError(), "ok"])
+
+    assert scheduler.call(READ, func) == "ok"
+    assert func.call_count == 3
+    assert clock.slept == [1.0, 2.0]
+    assert scheduler.stats()["read"]["retries"] == 2
+
+
+def test_writes_retry_only_rate_limits() -> None:
+    """書き込みは429だけを再試行し、Retry-Afterを守ること"""
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+
+    func = Mock(side_effect=[_api_error(429, {"Retry-After": "5"}), "ok"])
+    assert scheduler.call(WRITE, func) == "ok"
+    assert clock.slept == [5.0]
+    assert scheduler.stats()["write"]["throttled"] == 1
+
+    # 反映済みの可能性があるため再送しない
+    func = Mock(side_effect=_api_error(500))
+    with pytest.raises(gspread.exceptions.APIError):
+        scheduler.call(WRITE, func)
+    assert func.call_count == 1
+
+
+def test_gives_up_after_max_retries() -> None:
+    """再試行回数を超えたら例外を送出すること"""
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_retries=2)
+    func = Mock(side_effect=_api_error(429))
+
+    with pytest.raises(gspread.exceptions.APIError):
+        scheduler.call(READ, func)
+
+    assert func.call_count == 3
+    assert scheduler.stats()["read"]["waiting"] == 0
+
+
+def test_rate_limit_drains_bucket() -> None:
+    """429を受けたら残りのトークンを使わず、混雑状態になること"""
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_retries=0, burst=10)
+    assert not scheduler.congested(READ)
+
+    with pytest.raises(gspread.exceptions.APIError):
+        scheduler.call(READ, Mock(side_effect=_api_error(429)))
+
+    assert scheduler.congested(READ)
+    assert scheduler.seconds_until_available(READ) == 1
+    assert not scheduler.congested(WRITE)
+
+
+def test_scheduled_client_routes_requests() -> None:
+    """GETは読み取り、それ以外は書き込みとしてスケジューラーを通ること"""
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    session = Mock()
+    throttled = Mock(ok=False, status_code=429, headers={}, text="")
+    throttled.json.return_value = {"error": {"code": 429}}
+    session.get.side_effect = [throttled, Mock(ok=True)]
+    session.post.return_value = Mock(ok=True)
+    client = ScheduledClient(
+        auth=Credentials(token="token"), scheduler=scheduler, session=session
+    )
+
+    client.request("get", "https://sheets.googleapis.com/v4/spreadsheets/x")
+    client.request("post", "https://sheets.googleapis.com/v4/spreadsheets/x")
+
+    stats = scheduler.stats()
+    assert stats["read"]["requests"] == 2
+    assert stats["read"]["retries"] == 1
+    assert stats["write"]["requests"] == 1
@@ -0,0 +1,78 @@
+"""
+レコードスナップショットキャッシュのテスト
+"""
+
+from api.record_cache import RecordCache, row_to_record
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_row_to_record_matches_get_all_records() -> None:
+    """get_all_records と同様に数値へ変換されること"""
+    record = row_to_record(["管理ID", "全国図鑑No", "レベル", "色違い"], ["08M01", "0025", 50, ""])
+
+    assert record == {"管理ID": "08M01", "全国図鑑No": 25, "レベル": 50, "色違い": ""}
+
+
+def test_snapshot_expires_after_ttl() -> None:
+    """TTL経過後はスナップショットを返さないこと"""
+    clock = FakeClock()
+    cache = RecordCache(ttl=30, clock=clock)
+    cache.put("pokemon", [{"管理ID": "08M01"}])
+
+    clock.now = 29
+    assert cache.get("pokemon") is not None
+    clock.now = 30
+    assert cache.get("pokemon") is None
+    # 期限切れでも peek では取得できる
+    assert cache.peek("pokemon") is not None
+
+
+def test_append_and_remove_update_in_place() -> None:
+    """書き込み内容がスナップショットに反映されること"""
+    cache = RecordCache()
+    cache.put("pokemon", [{"管理ID": "08M01"}])
+    before = cache.get("pokemon")
+
+    cache.append("pokemon", {"管理ID": "08M02"})
+    cache.remove("pokemon", "08M01")
+
+    assert [r["管理ID"] for r in cache.get("pokemon").records] == ["08M02"]
+    # 取得済みのスナップショットは変更されない
+    assert [r["管理ID"] for r in before.records] == ["08M01"]
+
+
+def test_writes_carry_built_indexes_over() -> None:
+    """構築済みのインデックスを作り直さず、追加・削除した行だけを反映すること"""
+    cache = RecordCache()
+    cache.put("pokemon", [{"管理ID": "08M01", "世代": 8}, {"管理ID": "09M01", "世代": 9}])
+    before = cache.get("pokemon")
+    assert before.indexes.query({"世代": 8}, {}) == [0]
+    assert before.by_id["08M01"]["世代"] == 8
+
+    cache.extend("pokemon", [{"管理ID": "08M02", "世代": 8}])
+    cache.remove("pokemon", "08M01")
+    snapshot = cache.get("pokemon")
+
+    assert {"positions", "by_id", "indexes"} <= set(vars(snapshot))
+    assert "timestamps" not in vars(snapshot)
+    assert snapshot.positions == {"09M01": 0, "08M02": 1}
+    assert sorted(snapshot.by_id) == ["08M02", "09M01"]
+    assert snapshot.indexes.query({"世代": 8}, {}) == [1]
+    assert before.indexes.query({"世代": 8}, {}) == [0]
+
+
+def test_remove_unknown_id_invalidates() -> None:
+    """該当レコードがない場合はスナップショットを破棄すること"""
+    cache = RecordCache()
+    cache.put("pokemon", [{"管理ID": "08M01"}])
+
+    cache.remove("pokemon", "99X99")
+
+    assert cache.get("pokemon") is None
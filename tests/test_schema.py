@@ -0,0 +1,120 @@
+"""
+シート列定義のテスト
+"""
+
+from api.main import PokemonData
+from api.schema import (
+    COLUMNS,
+    SHEET_HEADERS,
+    compile_decoder,
+    pokemon_to_row,
+    record_to_row,
+    row_to_pokemon,
+)
+
+# 旧GAS実装のシートの列順（色違い・おやめいなどの列がない）
+GAS_HEADERS = [
+    "管理ID", "ポケモン名", "全国図鑑No", "世代", "ゲーム", "配信イベント名",
+    "配信方法", "配信場所", "配信開始日", "配信終了日",
+    "レベル", "せいべつ", "とくせい", "せいかく", "キョダイマックス", "テラスタイプ",
+    "持ち物", "技1", "技2", "技3", "技4",
+    "リボン1", "リボン2", "リボン3", "その他特記事項", "タイムスタンプ",
+]  # fmt: skip
+
+
+def _pokemon(**overrides) -> PokemonData:
+    fields = {
+        "id": "08M01",
+        "name": {"ja": "ピカチュウ"},
+        "dex_no": "0025",
+        "generation": 8,
+        "game": "ソード・シールド",
+        "event_name": "テストイベント",
+        "distribution": {
+            "method": "シリアルコード",
+            "location": "テスト会場",
+            "start_date": "2024-01-01",
+        },
+        "level": 25,
+        "moves": ["10まんボルト", "でんこうせっか"],
+        "ribbons": ["プレミアリボン"],
+        "timestamp": "2024-01-01T00:00:00",
+    }
+    fields.update(overrides)
+    return PokemonData(**fields)
+
+
+def test_row_matches_headers() -> None:
+    """行データがヘッダーと同じ列数・列順になること"""
+    data = _pokemon()
+
+    row = dict(zip(SHEET_HEADERS, pokemon_to_row(data)))
+
+    assert len(SHEET_HEADERS) == 31
+    assert len({column.header for column in COLUMNS}) == len(COLUMNS)
+    assert len(pokemon_to_row(data)) == len(SHEET_HEADERS)
+    assert row["管理ID"] == "08M01"
+    assert row["配信終了日"] == ""
+    assert row["技2"] == "でんこうせっか"
+    assert row["技3"] == ""
+    assert row["リボン1"] == "プレミアリボン"
+    assert row["タイムスタンプ"] == "2024-01-01T00:00:00"
+
+
+def test_round_trip() -> None:
+    """PokemonData → 行 → PokemonData で値が変わらないこと"""
+    originals = [
+        _pokemon(),
+        _pokemon(
+            shiny="★",
+            distribution={
+                "method": "ふしぎなおくりもの",
+                "location": "インターネット",
+                "start_date": "2023-11-17",
+                "end_date": "2024-01-31",
+            },
+            ot_name="サトシ",
+            trainer_id="000001",
+            moves=["a", "b", "c", "d"],
+            ribbons=["x", "y", "z"],
+            other_info="テスト, 改行\nあり",
+        ),
+        _pokemon(moves=[], ribbons=[], timestamp=None),
+    ]
+
+    for original in originals:
+        decoded = PokemonData.model_validate(row_to_pokemon(pokemon_to_row(original)))
+        assert decoded == original
+
+
+def test_decode_numericised_record() -> None:
+    """get_all_records で数値化された値を元の形式に戻すこと"""
+    record = dict(zip(SHEET_HEADERS, pokemon_to_row(_pokemon())))
+    record.update({"全国図鑑No": 25, "世代": 8, "レベル": 25, "ID": 1})
+
+    decoded = row_to_pokemon(record_to_row(record))
+
+    assert decoded["dex_no"] == "0025"
+    assert decoded["generation"] == 8
+    assert decoded["trainer_id"] == "1"
+    assert decoded["distribution"]["end_date"] is None
+
+
+def test_decoder_for_other_column_order() -> None:
+    """列順・列数が異なるシート（旧GAS形式）も列名で対応付けること"""
+    row = ["09M01", "ミュウ", "151", "9", "SV", "配信", "シリアル", "店頭",
+           "2024-02-01", "", "5", "-", "シンクロ", "おくびょう", "", "",
+           "", "はたく", "", "", "", "", "", "", "", ""]  # fmt: skip
+    decode = compile_decoder(GAS_HEADERS)
+
+    decoded = PokemonData.model_validate(decode(row))
+
+    assert decoded.id == "09M01"
+    assert decoded.dex_no == "0151"
+    assert decoded.level == 5
+    assert decoded.nature == "おくびょう"
+    assert decoded.moves == ["はたく"]
+    assert decoded.ot_name == ""
+    # 末尾の空セルが省略された行
+    assert decode(row[:3])["name"]["ja"] == "ミュウ"
+    assert decode(row[:3])["level"] == 1
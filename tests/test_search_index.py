@@ -0,0 +1,41 @@
+"""
+全文検索インデックスのテスト
+"""
+
+from api.search_index import SearchIndex, normalize
+
+RECORDS = [
+    {"管理ID": "08M01", "ポケモン名": "ピカチュウ", "配信イベント名": "ポケモン映画2021"},
+    {"管理ID": "08M02", "ポケモン名": "イーブイ", "配信イベント名": "ポケモンセンター"},
+    {"管理ID": "09M01", "ポケモン名": "ピカチュウ", "その他特記事項": "映画館で配布"},
+]
+
+
+def test_normalize_kana_and_width() -> None:
+    """カタカナ・ひらがな、全角・半角を同一視すること"""
+    assert normalize("ピカチュウ") == normalize("ぴかちゅう")
+    assert normalize("ＡＢＣ２０２１") == "abc2021"
+
+
+def test_search_matches_substrings() -> None:
+    """かな・漢字混じりの部分一致で検索できること"""
+    index = SearchIndex(RECORDS, source=0)
+
+    assert sorted(index.search("映画")) == ["08M01", "09M01"]
+    assert sorted(index.search("ぴかちゅう")) == ["08M01", "09M01"]
+    assert index.search("ブイ") == ["08M02"]
+    assert sorted(index.search("映")) == ["08M01", "09M01"]
+    # バイグラムは全て含むが連続していない
+    assert index.search("ポケ映画") == []
+    assert index.search("  ") == []
+
+
+def test_incremental_update() -> None:
+    """追加・削除が索引に反映されること"""
+    index = SearchIndex(RECORDS, source=0)
+
+    index.add({"管理ID": "09M02", "ポケモン名": "ミュウ", "出会った場所": "映画館"})
+    index.remove("08M01")
+
+    assert sorted(index.search("映画")) == ["09M01", "09M02"]
+    assert index.search("ポケモン映画") == []
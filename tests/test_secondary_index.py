@@ -0,0 +1,121 @@
+"""
+検索用インデックスのテスト
+"""
+
+from api.secondary_index import RecordIndexes, TimestampIndex, date_key, timestamp_key
+
+RECORDS = [
+    {
+        "管理ID": "08M01",
+        "世代": 8,
+        "ゲーム": "ソード・シールド",
+        "全国図鑑No": 25,
+        "配信開始日": "2021-07-01",
+        "配信終了日": "2021-08-31",
+    },
+    {
+        "管理ID": "09M01",
+        "世代": 9,
+        "ゲーム": "スカーレット・バイオレット",
+        "全国図鑑No": 25,
+        "配信開始日": "2023/2/27",
+        "配信終了日": "",
+    },
+    {
+        "管理ID": "08M02",
+        "世代": 8,
+        "ゲーム": "ソード・シールド",
+        "全国図鑑No": 133,
+        "配信開始日": "2020-11-20",
+        "配信終了日": "2021-01-05",
+    },
+]
+
+
+def test_date_key_normalizes_formats() -> None:
+    """日付の表記揺れを揃えること"""
+    assert date_key("2023/2/27") == "2023-02-27"
+    assert date_key("2021-07-01") == "2021-07-01"
+    assert date_key("未定") is None
+
+
+def test_equality_filters() -> None:
+    """等価条件で絞り込めること（図鑑Noは0埋めの有無を区別しない）"""
+    indexes = RecordIndexes(RECORDS)
+
+    assert indexes.query({"世代": 8}, {}) == [0, 2]
+    assert indexes.query({"全国図鑑No": "0025"}, {}) == [0, 1]
+    assert indexes.query({"世代": "8", "全国図鑑No": "0025"}, {}) == [0]
+    assert indexes.query({"ゲーム": "存在しない"}, {}) == []
+
+
+def test_date_range_filters() -> None:
+    """日付の範囲で絞り込めること（空の日付は範囲外）"""
+    indexes = RecordIndexes(RECORDS)
+
+    assert indexes.query({}, {"配信開始日": ("2021-01-01", None)}) == [0, 1]
+    assert indexes.query({}, {"配信開始日": (None, "2021-07-01")}) == [0, 2]
+    assert indexes.query({}, {"配信終了日": ("2021-01-01", "2021-12-31")}) == [0, 2]
+    assert indexes.query({"世代": 8}, {"配信開始日": ("2021-01-01", None)}) == [0]
+
+
+def test_extended_and_removed_match_rebuild() -> None:
+    """追加・削除を反映したインデックスが作り直した場合と同じ結果を返すこと"""
+    indexes = RecordIndexes(RECORDS[:2])
+    extended = indexes.extended(RECORDS, 2)
+    removed = extended.removed([RECORDS[0], RECORDS[2]], [1])
+    conditions = [
+        ({"世代": 8}, {}),
+        ({"全国図鑑No": 25}, {}),
+        ({}, {"配信開始日": ("2021-01-01", None)}),
+        ({}, {"配信終了日": (None, "2021-12-31")}),
+    ]
+
+    for equals, ranges in conditions:
+        rebuilt = RecordIndexes(RECORDS).query(equals, ranges)
+        assert extended.query(equals, ranges) == rebuilt
+        rebuilt = RecordIndexes([RECORDS[0], RECORDS[2]]).query(equals, ranges)
+        assert removed.query(equals, ranges) == rebuilt
+    # 元のインデックスは変更されない
+    assert indexes.query({"世代": 8}, {}) == [0]
+
+
+def test_timestamp_key_normalizes_formats() -> None:
+    """ISO形式とスラッシュ区切りの日時を同じ形式に揃えること"""
+    assert timestamp_key("2024-01-05T09:30:00.123") == "2024-01-05T09:30:00.123000"
+    assert timestamp_key("2024/1/5 9:30:00") == "2024-01-05T09:30:00.000000"
+    assert timestamp_key("2024-01-05") == "2024-01-05T00:00:00.000000"
+    assert timestamp_key("") is None
+
+
+def test_timestamp_index_after() -> None:
+    """指定した日時より後のレコードを古い順に返すこと"""
+    index = TimestampIndex(
+        [
+            {"タイムスタンプ": "2024-01-03T00:00:00"},
+            {"タイムスタンプ": "2024/1/1 12:00:00"},
+            {"タイムスタンプ": ""},
+            {"タイムスタンプ": "2024-01-02T00:00:00"},
+        ]
+    )
+    assert [p for _, p in index.after(None)] == [1, 3, 0]
+    assert [p for _, p in index.after("2024-01-02T00:00:00.000000")] == [0]
+    assert index.latest == "2024-01-03T00:00:00.000000"
+
+
+def test_timestamp_index_extended_and_removed() -> None:
+    """追加・削除を反映した位置が作り直した場合と一致すること"""
+    records = [
+        {"タイムスタンプ": "2024-01-03T00:00:00"},
+        {"タイムスタンプ": "2024/1/1 12:00:00"},
+        {"タイムスタンプ": "2024-01-02T00:00:00"},
+        {"タイムスタンプ": "2024-01-01T12:00:00"},
+    ]
+    index = TimestampIndex(records[:2])
+
+    extended = index.extended(records, 2)
+    assert extended.after(None) == TimestampIndex(records).after(None)
+    removed = extended.removed([0, 2])
+    assert removed.after(None) == TimestampIndex([records[1], records[3]]).after(None)
+    assert removed.latest == "2024-01-01T12:00:00.000000"
+    assert [p for _, p in index.after(None)] == [1, 0]
@@ -0,0 +1,65 @@
+"""
+Google Sheetsクライアント管理のテスト
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+from api.sheets_client import SheetsClientManager
+
+
+def _mock_client(expiry: datetime) -> Mock:
+    client = Mock()
+    client.auth.token = "token"
+    client.auth.expiry = expiry
+    return client
+
+
+@patch("api.sheets_client.load_credentials")
+@patch("gspread.authorize")
+def test_client_is_shared(mock_authorize, mock_load) -> None:
+    """2回目以降は再認証しないこと"""
+    mock_authorize.return_value = _mock_client(datetime.utcnow() + timedelta(hours=1))
+    manager = SheetsClientManager()
+
+    first = manager.get_client()
+    second = manager.get_client()
+
+    assert first is second
+    assert mock_load.call_count == 1
+    assert mock_authorize.call_count == 1
+
+
+@patch("api.sheets_client.load_credentials")
+@patch("gspread.authorize")
+def test_token_refreshed_before_expiry(mock_authorize, mock_load) -> None:
+    """期限間近のトークンは再認証せずに更新されること"""
+    client = _mock_client(datetime.utcnow() + timedelta(hours=1))
+    mock_authorize.return_value = client
+    manager = SheetsClientManager(refresh_margin=300)
+    manager.get_client()
+    assert client.login.call_count == 1
+
+    client.auth.expiry = datetime.utcnow() + timedelta(seconds=60)
+    manager.get_client()
+
+    assert client.login.call_count == 2
+    assert mock_authorize.call_count == 1
+
+
+@patch("api.sheets_client.load_credentials")
+@patch("gspread.authorize")
+def test_invalidate_rebuilds_client(mock_authorize, mock_load) -> None:
+    """invalidate後は新しいクライアントを構築すること"""
+    mock_authorize.side_effect = [
+        _mock_client(datetime.utcnow() + timedelta(hours=1)),
+        _mock_client(datetime.utcnow() + timedelta(hours=1)),
+    ]
+    manager = SheetsClientManager()
+
+    first = manager.get_client()
+    manager.invalidate()
+    second = manager.get_client()
+
+    assert first is not second
+    assert mock_authorize.call_count == 2
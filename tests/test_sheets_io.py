@@ -0,0 +1,82 @@
+"""
+Sheets I/Oオフロードのテスト
+"""
+
+import asyncio
+import threading
+import time
+
+from api.sheets_io import SheetsExecutor
+
+
+def test_blocking_calls_run_concurrently() -> None:
+    """同期呼び出しが並行して実行されること"""
+    executor = SheetsExecutor(max_workers=4, per_db_limit=4)
+
+    async def main() -> float:
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(executor.run("pokemon", time.sleep, 0.2) for _ in range(4))
+        )
+        return time.perf_counter() - start
+
+    elapsed = asyncio.run(main())
+    executor.shutdown()
+
+    assert elapsed < 0.6
+
+
+def test_per_db_limit_and_stats() -> None:
+    """データベースごとの同時実行数が制限され、統計に反映されること"""
+    executor = SheetsExecutor(max_workers=4, per_db_limit=1)
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def work() -> None:
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.05)
+        with lock:
+            active -= 1
+
+    async def main() -> None:
+        await asyncio.gather(*(executor.run("pokemon", work) for _ in range(3)))
+
+    asyncio.run(main())
+    stats = executor.stats()
+    executor.shutdown()
+
+    assert peak == 1
+    assert stats["databases"]["pokemon"] == {
+        "waiting": 0,
+        "running": 0,
+        "completed": 3,
+        "failed": 0,
+    }
+
+
+def test_writes_take_priority_over_waiting_reads() -> None:
+    """枠が空いたとき、待機中の読み取りより書き込みが先に実行されること"""
+    executor = SheetsExecutor(max_workers=2, per_db_limit=1)
+    order: list[str] = []
+
+    async def main() -> None:
+        blocker = asyncio.create_task(executor.run("pokemon", time.sleep, 0.1))
+        await asyncio.sleep(0.02)
+        reads = [
+            asyncio.create_task(executor.run("pokemon", order.append, f"read{i}"))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0)
+        write = asyncio.create_task(
+            executor.run_write("pokemon", order.append, "write")
+        )
+        await asyncio.gather(blocker, write, *reads)
+
+    asyncio.run(main())
+    executor.shutdown()
+
+    assert order == ["write", "read0", "read1"]
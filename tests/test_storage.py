@@ -0,0 +1,132 @@
+"""
+ストレージバックエンドのテスト
+"""
+
+from unittest.mock import Mock
+
+from api.pk_index import FIRST_DATA_ROW
+from api.storage import SheetMirror, SqliteBackend
+
+HEADERS = ["管理ID", "ポケモン名", "全国図鑑No"]
+
+
+def _backend(tmp_path, mirror_enabled: bool = False) -> SqliteBackend:
+    return SqliteBackend(
+        "pokemon",
+        str(tmp_path / "db" / "pokemon.sqlite3"),
+        HEADERS,
+        mirror_enabled=mirror_enabled,
+    )
+
+
+def test_sqlite_read_write(tmp_path) -> None:
+    """シートと同じ形式のレコードとして読み書きできること"""
+    backend = _backend(tmp_path)
+    backend.append_rows([["08M01", "ピカチュウ", "0025"], ["08M02", "イーブイ"]])
+    backend.append_rows([["08M03", "ミュウ", 151]])
+
+    records = backend.load_all()
+    assert [r["管理ID"] for r in records] == ["08M01", "08M02", "08M03"]
+    # get_all_records と同じく数値化し、足りない列は空文字で補う
+    assert records[0]["全国図鑑No"] == 25
+    assert records[1]["全国図鑑No"] == ""
+    assert backend.read_by_id("08M03")["ポケモン名"] == "ミュウ"
+    assert backend.read_by_id("missing") is None
+    assert [r["管理ID"] for r in backend.read_rows(1, 5)] == ["08M02", "08M03"]
+
+    assert backend.delete("08M02") is True
+    assert backend.delete("08M02") is False
+    assert [r["管理ID"] for r in backend.load_all()] == ["08M01", "08M03"]
+    backend.close()
+
+
+def test_sqlite_read_window_follows_cursor(tmp_path) -> None:
+    """カーソルの管理IDの次から読み込み、前方の削除でずれないこと"""
+    backend = _backend(tmp_path)
+    backend.append_rows([[f"08M{i:02d}", "ピカチュウ"] for i in range(1, 6)])
+
+    records, total, start = backend.read_window(0, 2)
+    assert [r["管理ID"] for r in records] == ["08M01", "08M02"]
+    assert (total, start) == (5, 0)
+
+    backend.delete("08M01")
+    records, total, start = backend.read_window(
+        0, 2, after_id="08M02", cursor_row=FIRST_DATA_ROW + 2
+    )
+    assert [r["管理ID"] for r in records] == ["08M03", "08M04"]
+    assert (total, start) == (4, 1)
+    backend.close()
+
+
+def test_mirror_applies_outbox_in_order(tmp_path) -> None:
+    """連続した追加をまとめ、削除との順序を保ってシートに反映すること"""
+    backend = _backend(tmp_path, mirror_enabled=True)
+    calls = []
+    append = Mock(side_effect=lambda db, rows: calls.append(("append", rows)))
+    delete = Mock(side_effect=lambda db, ids: calls.append(("delete", ids)))
+    mirror = SheetMirror(backend, append, delete, interval=3600)
+
+    backend.append_rows([["08M01", "ピカチュウ"]])
+    backend.append_rows([["08M02", "イーブイ"]])
+    backend.delete("08M01")
+    backend.append_rows([["08M03", "ミュウ"]])
+    assert backend.delete_many(["08M02", "08M03", "08X99"]) == ["08X99"]
+    assert mirror.stats()["pending"] == 6
+
+    assert mirror.drain() is True
+    assert calls == [
+        ("append", [["08M01", "ピカチュウ"], ["08M02", "イーブイ"]]),
+        ("delete", ["08M01"]),
+        ("append", [["08M03", "ミュウ"]]),
+        ("delete", ["08M02", "08M03"]),
+    ]
+    assert mirror.stats() == {"pending": 0, "last_error": None}
+    backend.close()
+
+
+def test_mirror_keeps_outbox_on_failure(tmp_path) -> None:
+    """反映に失敗した変更は残り、再起動後も続きから反映すること"""
+    backend = _backend(tmp_path, mirror_enabled=True)
+    append = Mock(side_effect=RuntimeError("429"))
+    mirror = SheetMirror(backend, append, Mock(), interval=3600)
+    backend.append_rows([["08M01", "ピカチュウ"]])
+
+    assert mirror.drain() is False
+    assert mirror.stats() == {"pending": 1, "last_error": "429"}
+    backend.close()
+
+    reopened = _backend(tmp_path, mirror_enabled=True)
+    append = Mock()
+    assert SheetMirror(reopened, append, Mock()).drain() is True
+    append.assert_called_once_with("pokemon", [["08M01", "ピカチュウ"]])
+    reopened.close()
+
+
+def test_mirror_skips_rows_already_on_sheet(tmp_path) -> None:
+    """反映済みで失敗した追加を送り直す前に、シートにある行を除くこと"""
+    backend = _backend(tmp_path, mirror_enabled=True)
+    sheet_ids: set[str] = set()
+
+    def write(db: str, rows: list) -> None:
+        sheet_ids.update(row[0] for row in rows)
+        if append.call_count == 1:
+            raise RuntimeError("500")
+
+    append = Mock(side_effect=write)
+    existing_ids = Mock(side_effect=lambda db: set(sheet_ids))
+    mirror = SheetMirror(backend, append, Mock(), existing_ids=existing_ids)
+    backend.append_rows([["08M01", "ピカチュウ"], ["08M02", "イーブイ"]])
+
+    assert mirror.drain() is False
+    backend.append_rows([["08M03", "ミュウ"]])
+    assert mirror.drain() is True
+
+    # 反映済みの2件は送らず、確認後の追加は管理IDを読み直さない
+    assert append.call_count == 2
+    assert append.call_args.args == ("pokemon", [["08M03", "ミュウ"]])
+    assert existing_ids.call_count == 2
+    backend.append_rows([["08M04", "ミュウツー"]])
+    assert mirror.drain() is True
+    assert existing_ids.call_count == 2
+    assert append.call_args.args == ("pokemon", [["08M04", "ミュウツー"]])
+    backend.close()
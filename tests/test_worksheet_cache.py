@@ -0,0 +1,77 @@
+"""
+Worksheetハンドルキャッシュのテスト
+"""
+
+from unittest.mock import Mock
+
+import gspread
+
+from api.worksheet_cache import WorksheetCache, is_stale_worksheet_error
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _mock_client() -> Mock:
+    client = Mock()
+    client.open_by_key.return_value.worksheet.side_effect = lambda name: Mock(
+        title=name
+    )
+    return client
+
+
+def test_handles_are_reused() -> None:
+    """2回目の取得ではメタデータ取得を行わないこと"""
+    cache = WorksheetCache()
+    client = _mock_client()
+
+    first = cache.get_worksheet(client, "pokemon", "sheet-id", "Sheet1")
+    second = cache.get_worksheet(client, "pokemon", "sheet-id", "Sheet1")
+
+    assert first is second
+    assert client.open_by_key.call_count == 1
+    assert client.open_by_key.return_value.worksheet.call_count == 1
+
+
+def test_ttl_expiry_and_invalidate() -> None:
+    """TTL経過後・無効化後は取り直すこと"""
+    clock = FakeClock()
+    cache = WorksheetCache(ttl=10, clock=clock)
+    client = _mock_client()
+    spreadsheet = client.open_by_key.return_value
+
+    cache.get_worksheet(client, "pokemon", "sheet-id", "Sheet1")
+    clock.now = 11
+    cache.get_worksheet(client, "pokemon", "sheet-id", "Sheet1")
+    assert spreadsheet.worksheet.call_count == 2
+
+    cache.invalidate("pokemon")
+    cache.get_worksheet(client, "pokemon", "sheet-id", "Sheet1")
+    assert spreadsheet.worksheet.call_count == 3
+
+
+def test_new_client_misses_cache() -> None:
+    """クライアントが再構築された場合はキャッシュを使わないこと"""
+    cache = WorksheetCache()
+    old_client = _mock_client()
+    new_client = _mock_client()
+
+    cache.get_worksheet(old_client, "pokemon", "sheet-id", "Sheet1")
+    cache.get_worksheet(new_client, "pokemon", "sheet-id", "Sheet1")
+
+    assert new_client.open_by_key.call_count == 1
+
+
+def test_stale_worksheet_error() -> None:
+    """削除・リネームを示す例外を判定できること"""
+    response = Mock(status_code=400)
+    response.json.return_value = {"error": {"message": "Unable to parse range"}}
+
+    assert is_stale_worksheet_error(gspread.exceptions.WorksheetNotFound("Sheet1"))
+    assert is_stale_worksheet_error(gspread.exceptions.APIError(response))
+    assert not is_stale_worksheet_error(ValueError("other"))
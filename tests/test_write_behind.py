@@ -0,0 +1,80 @@
+"""
+書き込みバッファのテスト
+"""
+
+from unittest.mock import Mock
+
+from api.write_behind import WriteBehindBuffer, WriteJournal
+
+
+def _buffer(path: str, writer: Mock) -> WriteBehindBuffer:
+    # テストでは明示的に flush() を呼ぶため、自動フラッシュは起こさない
+    return WriteBehindBuffer(
+        WriteJournal(path), writer, flush_size=100, flush_interval=3600
+    )
+
+
+def test_submit_and_flush(tmp_path) -> None:
+    """受け付けた行がまとめて書き込まれ、状態が更新されること"""
+    writer = Mock()
+    buffer = _buffer(str(tmp_path / "journal.jsonl"), writer)
+
+    first = buffer.submit("pokemon", ["08M01", "ピカチュウ"])
+    second = buffer.submit("pokemon", ["08M02", "イーブイ"])
+    assert buffer.status(first)["status"] == "pending"
+    assert buffer.stats() == {"pokemon": 2}
+
+    assert buffer.flush() is True
+
+    writer.assert_called_once()
+    db_name, items = writer.call_args[0]
+    assert db_name == "pokemon"
+    assert [item.row[0] for item in items] == ["08M01", "08M02"]
+    assert buffer.status(first)["status"] == "committed"
+    assert buffer.status(second)["status"] == "committed"
+    assert buffer.stats() == {"pokemon": 0}
+    buffer.stop()
+
+
+def test_failed_flush_keeps_rows(tmp_path) -> None:
+    """書き込みに失敗した行は待ち行列に残ること"""
+    writer = Mock(side_effect=RuntimeError("429"))
+    buffer = _buffer(str(tmp_path / "journal.jsonl"), writer)
+    ticket = buffer.submit("pokemon", ["08M01"])
+
+    assert buffer.flush() is False
+
+    status = buffer.status(ticket)
+    assert status["status"] == "pending"
+    assert "429" in status["last_error"]
+    # シートに反映済みかもしれないため、次回は管理IDを確認してから書き込む
+    assert writer.call_args[0][1][0].recovered is True
+    writer.side_effect = None
+    buffer.stop()
+    assert buffer.status(ticket)["status"] == "committed"
+
+
+def test_pending_rows_survive_restart(tmp_path) -> None:
+    """プロセスが停止しても未書き込みの行を引き継ぐこと"""
+    path = str(tmp_path / "journal.jsonl")
+    crashed = _buffer(path, Mock(side_effect=RuntimeError("down")))
+    ticket = crashed.submit("pokemon", ["08M01"])
+    crashed.submit("pokemon", ["08M02"])
+    crashed.flush()
+
+    writer = Mock()
+    restarted = _buffer(path, writer)
+    restarted.start()
+    assert restarted.status(ticket)["status"] == "pending"
+    restarted.flush()
+
+    items = writer.call_args[0][1]
+    assert [item.row[0] for item in items] == ["08M01", "08M02"]
+    assert all(item.recovered for item in items)
+    restarted.stop()
+
+    # 書き込み済みの行は再度引き継がれない
+    again = _buffer(path, Mock())
+    again.start()
+    assert again.stats() == {}
+    again.stop()